@@ -18,6 +18,40 @@ def init_app(app):
         from app.models import User
         return User.query.get(int(user_id))
     
+    # Size the product listing cache
+    from app.cache import product_listing_cache
+    product_listing_cache.configure(
+        maxsize=app.config.get('PRODUCT_CACHE_SIZE', 512),
+        ttl=app.config.get('PRODUCT_CACHE_TTL', 30)
+    )
+    
+    # Place and size the rendered PDF cache
+    from app.pdf_cache import pdf_cache
+    pdf_cache.configure(
+        directory=app.config.get('PDF_CACHE_DIR'),
+        max_bytes=app.config.get('PDF_CACHE_MAX_BYTES')
+    )
+    
+    # Size the process pool PDF exports are rendered in
+    from app.pdf_export import pdf_render_pool
+    pdf_render_pool.configure(workers=app.config.get('PDF_EXPORT_WORKERS', 1))
+    
+    # Size the background email pool and run its tasks in this app's context
+    from app.executor import email_executor
+    email_executor.configure(
+        max_workers=app.config.get('BACKGROUND_WORKERS', 4),
+        max_queue=app.config.get('BACKGROUND_QUEUE_SIZE', 100)
+    )
+    email_executor.init_app(app)
+    
     # Initialize email service
     from email_service import init_email_service
-    init_email_service(app.config.get('BREVO_API_KEY')) 
\ No newline at end of file
+    init_email_service(
+        app.config.get('BREVO_API_KEY'),
+        sender_email=app.config.get('BREVO_SENDER_EMAIL'),
+        sender_name=app.config.get('BREVO_SENDER_NAME'),
+        base_url=app.config.get('BREVO_API_URL'),
+        connect_timeout=app.config.get('BREVO_CONNECT_TIMEOUT', 3.05),
+        read_timeout=app.config.get('BREVO_READ_TIMEOUT', 10),
+        max_retries=app.config.get('BREVO_MAX_RETRIES', 3)
+    ) 
\ No newline at end of file
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe in-process cache with per-entry expiry and least-recently-used eviction"""
+
+    def __init__(self, maxsize=512, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self, maxsize=None, ttl=None):
+        """Change the size limit or lifetime of entries and drop what is cached"""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, key, default=None):
+        """Return the cached value for a key, or default if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Cache a value, evicting the least recently used entries when full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate=None):
+        """Drop every entry, or only those whose key satisfies the predicate; returns the number dropped"""
+        with self._lock:
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [key for key in self._entries if predicate(key)]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+            self.invalidations += 1
+            return removed
+
+    def stats(self):
+        """Counters for monitoring the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+# (etag, serialized body) of /api/products responses keyed by branch first, then the listing filters
+product_listing_cache = TTLCache()
+
+# Listing generations, bumped by every invalidation: one for all branches and one per branch.
+# A listing computed while its branch was invalidated is not cached.
+_listing_generations_lock = threading.Lock()
+_all_branches_generation = 0
+_branch_generations = {}
+
+
+def product_listing_cache_key(branch_id, category_id, search, subcategory_id=None, limit=None, offset=0):
+    """Cache key for a branch product listing; searches are case-insensitive"""
+    return (branch_id, category_id, subcategory_id, (search or '').strip().lower(), limit, offset)
+
+
+def _generation(branch_id):
+    """Current generation of a branch's listings; call with _listing_generations_lock held"""
+    return _all_branches_generation, _branch_generations.get(branch_id, 0)
+
+
+def product_listing_generation(branch_id):
+    """Generation of a branch's product listings; take it before computing a listing to cache"""
+    with _listing_generations_lock:
+        return _generation(branch_id)
+
+
+def cache_product_listing(key, generation, value):
+    """Cache a listing unless its branch was invalidated after generation was taken; returns whether it was cached"""
+    with _listing_generations_lock:
+        if _generation(key[0]) != generation:
+            return False
+        product_listing_cache.set(key, value)
+        return True
+
+
+def invalidate_product_listings(branch_ids=None):
+    """Drop cached product listings of the given branches, or of every branch"""
+    global _all_branches_generation
+    with _listing_generations_lock:
+        if branch_ids is None:
+            _all_branches_generation += 1
+            return product_listing_cache.invalidate()
+        branch_ids = {int(branch_id) for branch_id in branch_ids if branch_id is not None}
+        for branch_id in branch_ids:
+            _branch_generations[branch_id] = _branch_generations.get(branch_id, 0) + 1
+        return product_listing_cache.invalidate(lambda key: key[0] in branch_ids)
@@ -0,0 +1,155 @@
+import atexit
+import queue
+import threading
+import time
+
+
+class BackgroundExecutor:
+    """
+    Bounded pool of worker threads for fire-and-forget work such as sending emails
+
+    Tasks run inside their own application context, so they get their own
+    database session; pass them ids rather than ORM objects from the request.
+    Submitting waits up to submit_timeout seconds for room in the queue and is
+    rejected after that, so a slow email provider cannot pile up unbounded
+    work. Queued tasks are drained when the process exits.
+    """
+
+    def __init__(self, max_workers=4, max_queue=100, submit_timeout=1.0, name='background'):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.submit_timeout = submit_timeout
+        self.name = name
+        self.app = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._accepting = True
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def init_app(self, app):
+        """Run tasks in the given app's context"""
+        self.app = app
+
+    def configure(self, max_workers=None, max_queue=None):
+        """Change the pool size or queue bound; only possible before the first task is submitted"""
+        with self._lock:
+            if self._threads:
+                return
+            if max_workers is not None:
+                self.max_workers = max_workers
+            if max_queue is not None:
+                self.max_queue = max_queue
+                self._queue = queue.Queue(maxsize=max_queue)
+
+    def _start(self):
+        """Start the worker threads on first use"""
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.max_workers):
+                thread = threading.Thread(target=self._work, name=f'{self.name}-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.shutdown)
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs); returns False if the task was rejected"""
+        if not self._accepting or self.app is None:
+            with self._lock:
+                self.rejected += 1
+            return False
+        self._start()
+        try:
+            self._queue.put((fn, args, kwargs, time.monotonic()), timeout=self.submit_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            print(f"Warning: {self.name} queue is full, dropping {getattr(fn, '__name__', fn)}")
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _work(self):
+        from app import db
+
+        while True:
+            task = self._queue.get()
+            if task is None:
+                self._queue.task_done()
+                return
+            fn, args, kwargs, queued_at = task
+            failed = False
+            with self.app.app_context():
+                try:
+                    fn(*args, **kwargs)
+                except Exception as e:
+                    failed = True
+                    db.session.rollback()
+                    print(f"Warning: {self.name} task {getattr(fn, '__name__', fn)} failed: {str(e)}")
+                finally:
+                    db.session.remove()
+            latency = time.monotonic() - queued_at
+            with self._lock:
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+            self._queue.task_done()
+
+    def drain(self, timeout=None):
+        """Wait until every queued task has run; returns False if the timeout passed first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout=30):
+        """Stop accepting tasks, finish the queued ones and stop the workers"""
+        self._accepting = False
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return True
+        drained = self.drain(timeout)
+        for _ in threads:
+            try:
+                self._queue.put(None, timeout=1)
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(timeout=1)
+        if not drained:
+            print(f"Warning: {self.name} shut down with {self._queue.qsize()} tasks still queued")
+        return drained
+
+    def stats(self):
+        """Counters for monitoring the pool"""
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                'workers': self.max_workers,
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_latency_ms': round(self.total_latency / finished * 1000, 1) if finished else 0.0,
+                'max_latency_ms': round(self.max_latency * 1000, 1)
+            }
+
+
+# Emails sent from requests (e.g. password change alerts); invoice and receipt
+# emails go through the durable job queue in app.jobs instead
+email_executor = BackgroundExecutor(name='email')
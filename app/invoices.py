@@ -0,0 +1,104 @@
+from decimal import Decimal
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import joinedload
+
+from app.models import Order, OrderItem, BranchProduct
+
+
+class InvoiceLine(NamedTuple):
+    """One invoiced order item, with prices as Decimals"""
+    item_id: int
+    product_name: str
+    quantity: Decimal
+    original_price: Decimal
+    negotiated_price: Optional[Decimal]
+    unit_price: Decimal
+    total: Decimal
+
+
+class InvoiceData(NamedTuple):
+    """
+    Everything an invoice shows, as read-only plain data
+
+    Built once per order by build_invoice and consumed by the A4 and thermal
+    PDF renderers, the order page and the invoice email. Being a tuple it
+    has no per-instance __dict__, can't be changed after it is built, pickles
+    for the export workers and serializes deterministically for PDF cache keys.
+    """
+    invoice_number: str
+    order_id: int
+    customer_name: str
+    customer_email: str
+    customer_phone: str
+    branch: str
+    order_date: str
+    order_time: str
+    order_items: Tuple[InvoiceLine, ...]
+    subtotal: Decimal
+
+
+def invoice_order_options():
+    """Eager loads for everything build_invoice reads from an order"""
+    return (
+        joinedload(Order.order_items).joinedload(OrderItem.branch_product).joinedload(BranchProduct.catalog_product),
+        joinedload(Order.user),
+        joinedload(Order.branch),
+        joinedload(Order.ordertype)
+    )
+
+
+def load_invoice_order(order_id):
+    """An order with its items, their products, user, branch and order type, in a single query; 404 if missing"""
+    return Order.query.options(*invoice_order_options()).get_or_404(order_id)
+
+
+def invoice_line(item):
+    """InvoiceLine for an order item; the unit price is OrderItem.unit_price"""
+    if item.product_name:
+        product_name = item.product_name
+    elif item.branch_product and item.branch_product.catalog_product:
+        product_name = item.branch_product.catalog_product.name
+    else:
+        product_name = "Manual Item"
+
+    if item.original_price is not None:
+        original_price = Decimal(str(item.original_price))
+    elif item.branch_product and item.branch_product.sellingprice is not None:
+        original_price = Decimal(str(item.branch_product.sellingprice))
+    else:
+        original_price = Decimal('0.00')
+
+    quantity = Decimal(str(item.quantity))
+    unit_price = item.unit_price
+    return InvoiceLine(
+        item_id=item.id,
+        product_name=product_name,
+        quantity=quantity,
+        original_price=original_price,
+        negotiated_price=Decimal(str(item.negotiated_price)) if item.negotiated_price else None,
+        unit_price=unit_price,
+        total=quantity * unit_price
+    )
+
+
+def build_invoice(order, invoice_number=None):
+    """
+    InvoiceData for an order, load it with load_invoice_order to avoid per-item queries
+
+    invoice_number defaults to the order's INV-000123 number, which the order
+    pages use; stored invoices pass their own number.
+    """
+    lines = tuple(invoice_line(item) for item in sorted(order.order_items, key=lambda item: item.id))
+    return InvoiceData(
+        invoice_number=invoice_number or f"INV-{order.id:06d}",
+        order_id=order.id,
+        customer_name=f"{order.user.firstname} {order.user.lastname}",
+        customer_email=order.user.email,
+        customer_phone=order.user.phone or 'N/A',
+        branch=order.branch.name,
+        order_date=order.created_at.strftime('%B %d, %Y'),
+        order_time=order.created_at.strftime('%I:%M %p'),
+        order_items=lines,
+        subtotal=sum((line.total for line in lines), Decimal('0.00'))
+    )
@@ -0,0 +1,167 @@
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, or_
+from app import db
+from app.models import Job, Invoice, Receipt, Order, Payment
+
+
+# Job kind -> handler(payload); handlers raise to have the job retried
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register a function as the handler of a job kind"""
+    def register(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+def enqueue_job(kind, payload=None, max_attempts=None, commit=True):
+    """
+    Queue a job for the background worker and return it
+
+    With commit=False the job is only added to the session, so it is committed
+    (or rolled back) together with the records it refers to.
+    """
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        status='pending',
+        attempts=0,
+        max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 5),
+        run_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    if commit:
+        db.session.commit()
+    else:
+        db.session.flush()
+    return job
+
+
+def job_owner_id(job):
+    """
+    Id of the user whose order or payment queued a job, or None
+
+    An invoice_email job belongs to the user who placed the invoiced order, a
+    receipt_email job to the user who recorded the payment.
+    """
+    if job.kind == 'invoice_email':
+        return db.session.scalar(
+            select(Order.userid).join(Invoice, Invoice.orderid == Order.id)
+            .where(Invoice.id == job.payload.get('invoice_id'))
+        )
+    if job.kind == 'receipt_email':
+        return db.session.scalar(
+            select(Payment.userid).join(Receipt, Receipt.paymentid == Payment.id)
+            .where(Receipt.id == job.payload.get('receipt_id'))
+        )
+    return None
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying after the given number of failed attempts"""
+    base = current_app.config.get('JOB_BACKOFF_SECONDS', 30)
+    delay = min(base * 2 ** (attempts - 1), current_app.config.get('JOB_BACKOFF_MAX_SECONDS', 3600))
+    # Jitter so jobs that failed together do not all retry together
+    return delay + random.uniform(0, base)
+
+
+def claim_next_job(worker_id):
+    """
+    Claim the next due job and return it, or None when there is nothing to do
+
+    The job is picked and marked running in one UPDATE ... RETURNING; on
+    PostgreSQL the candidate row is locked with SKIP LOCKED so concurrent
+    workers pick different jobs instead of waiting on each other. Running jobs
+    whose lease expired (their worker died) are picked up again.
+    """
+    now = datetime.utcnow()
+    lease_expired = now - timedelta(seconds=current_app.config.get('JOB_LEASE_SECONDS', 300))
+    candidate = (
+        select(Job.id)
+        .where(or_(
+            (Job.status == 'pending') & (Job.run_at <= now),
+            (Job.status == 'running') & (Job.locked_at < lease_expired)
+        ))
+        .order_by(Job.run_at, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    job_id = db.session.execute(
+        update(Job)
+        .where(Job.id == candidate)
+        .values(status='running', locked_at=now, locked_by=worker_id, attempts=Job.attempts + 1)
+        .returning(Job.id)
+    ).scalar()
+    db.session.commit()
+    return db.session.get(Job, job_id) if job_id else None
+
+
+def run_job(job):
+    """Run a claimed job and record whether it completed, will be retried or failed"""
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        handler(job.payload or {})
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job.id)
+        job.last_error = str(e)
+        job.locked_at = None
+        job.locked_by = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            print(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempts: {str(e)}")
+        else:
+            job.status = 'pending'
+            job.run_at = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+            print(f"Warning: Job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying: {str(e)}")
+        db.session.commit()
+        return False
+
+    job.status = 'completed'
+    job.last_error = None
+    job.locked_at = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def run_pending_jobs(worker_id=None, limit=None):
+    """Run due jobs until none are left (or limit jobs ran); returns the number run"""
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def run_worker(poll_interval=None):
+    """Process jobs forever, polling the jobs table when it is empty"""
+    poll_interval = poll_interval or current_app.config.get('JOB_POLL_INTERVAL', 2)
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    print(f"Job worker {worker_id} started")
+    while True:
+        try:
+            if not run_pending_jobs(worker_id):
+                time.sleep(poll_interval)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: Job worker error: {str(e)}")
+            time.sleep(poll_interval)
+        finally:
+            db.session.remove()
@@ -212,9 +212,20 @@ class Order(db.Model):
     approvalstatus = db.Column(db.Boolean, default=False)
     approved_at = db.Column(db.DateTime, nullable=True)
     payment_status = db.Column(db.String, default='pending')  # pending, paid, failed, refunded
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False, default=0.00)  # Sum of item totals, kept in sync by OrderService
+    item_count = db.Column(db.Integer, nullable=False, default=0)  # Number of order items
 
     order_items = db.relationship('OrderItem', backref='order', lazy=True)
     payments = db.relationship('Payment', backref='order', lazy=True)
+    
+    def calculate_totals(self):
+        """Recalculate total_amount and item_count based on items"""
+        from decimal import Decimal
+        total_amount = Decimal('0.00')
+        for item in self.order_items:
+            total_amount += Decimal(str(item.quantity)) * item.unit_price
+        self.total_amount = total_amount
+        self.item_count = len(self.order_items)
 
 class OrderItem(db.Model):
     __tablename__ = 'orderitems'
@@ -233,6 +244,18 @@ class OrderItem(db.Model):
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(EAT), onupdate=lambda: datetime.now(EAT))
 
     branch_product = db.relationship("BranchProduct", back_populates="order_items")
+    
+    @property
+    def unit_price(self):
+        """Price used for calculation: final price, then original price, then product selling price"""
+        from decimal import Decimal
+        if self.final_price is not None:
+            return Decimal(str(self.final_price))
+        if self.original_price is not None:
+            return Decimal(str(self.original_price))
+        if self.branch_product and self.branch_product.sellingprice is not None:
+            return Decimal(str(self.branch_product.sellingprice))
+        return Decimal('0.00')
 
 
 class Payment(db.Model):
@@ -269,6 +292,28 @@ class Invoice(db.Model):
     order = db.relationship('Order', backref='invoices', lazy=True)
 
 
+class DocumentCounter(db.Model):
+    __tablename__ = 'document_counters'
+    name = db.Column(db.String, primary_key=True)  # Counter scope, e.g. INV-YYYYMMDD
+    value = db.Column(db.Integer, nullable=False, default=0)  # Last number handed out
+
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String, nullable=False)  # Handler name, e.g. 'invoice_email'
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String, nullable=False, default='pending', index=True)  # pending, running, completed, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # UTC; not picked up before this
+    locked_at = db.Column(db.DateTime, nullable=True)  # UTC time a worker claimed it
+    locked_by = db.Column(db.String, nullable=True)
+    last_error = db.Column(db.String, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(EAT))
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
 class Receipt(db.Model):
     __tablename__ = 'receipts'
     id = db.Column(db.Integer, primary_key=True)
@@ -450,33 +495,55 @@ class Quotation(db.Model):
     creator = db.relationship('User', backref='quotations_created')
     branch = db.relationship('Branch', backref='quotations')
     
+    def _amounts(self):
+        """
+        (discount, subtotal after discount, VAT) for the current subtotal and settings
+        
+        Cached on the instance and recomputed only when subtotal, discount or
+        VAT settings change, since templates read these amounts several times.
+        """
+        from decimal import Decimal
+        key = (self.subtotal, self.discount_percentage, self.include_vat, self.vat_rate)
+        cached = self.__dict__.get('_amounts_cache')
+        if cached is None or cached[0] != key:
+            subtotal = Decimal(str(self.subtotal or 0))
+            discount = Decimal('0.00')
+            if self.discount_percentage and self.subtotal:
+                discount = subtotal * (Decimal(str(self.discount_percentage)) / Decimal('100'))
+            after_discount = subtotal - discount
+            vat = Decimal('0.00')
+            if self.include_vat:
+                vat = after_discount * (Decimal(str(self.vat_rate)) / Decimal('100'))
+            cached = (key, (discount, after_discount, vat))
+            self._amounts_cache = cached
+        return cached[1]
+    
     @property
     def discount_amount(self):
         """Calculate discount amount based on subtotal and discount_percentage"""
-        from decimal import Decimal
-        if self.discount_percentage and self.subtotal:
-            return Decimal(str(self.subtotal)) * (Decimal(str(self.discount_percentage)) / Decimal('100'))
-        return Decimal('0.00')
+        return self._amounts()[0]
     
     @property
     def subtotal_after_discount(self):
         """Calculate subtotal after discount"""
-        from decimal import Decimal
-        return Decimal(str(self.subtotal)) - self.discount_amount
+        return self._amounts()[1]
     
     @property
     def vat_amount(self):
         """Calculate VAT amount based on subtotal after discount and vat_rate"""
-        from decimal import Decimal
-        if self.include_vat:
-            return self.subtotal_after_discount * (Decimal(str(self.vat_rate)) / Decimal('100'))
-        return Decimal('0.00')
+        return self._amounts()[2]
     
     def calculate_totals(self):
         """Recalculate subtotal and total_amount based on items"""
         from decimal import Decimal
         self.subtotal = sum(item.total_price for item in self.items) if self.items else Decimal('0.00')
         self.total_amount = self.subtotal_after_discount + self.vat_amount
+    
+    def apply_items_delta(self, delta):
+        """Add delta, the change in the items' total prices, to subtotal and update total_amount without reading the items"""
+        from decimal import Decimal
+        self.subtotal = Decimal(str(self.subtotal or 0)) + delta
+        self.total_amount = self.subtotal_after_discount + self.vat_amount
 
 
 class QuotationItem(db.Model):
@@ -506,9 +573,10 @@ class ProductCatalog(db.Model):
     name = db.Column(db.String, nullable=False)
     productcode = db.Column(db.String, nullable=True)
     image_url = db.Column(db.String, nullable=True)
-    subcategory_id = db.Column(db.Integer, nullable=True)
+    subcategory_id = db.Column(db.Integer, db.ForeignKey('sub_category.id'), nullable=True, index=True)
 
     branch_products = db.relationship("BranchProduct", back_populates="catalog_product")
+    subcategory = db.relationship("SubCategory", backref="catalog_products")
 
 
 class BranchProduct(db.Model):
@@ -519,7 +587,7 @@ class BranchProduct(db.Model):
     catalog_id = db.Column(db.Integer, db.ForeignKey('product_catalog.id'), nullable=False, index=True)
     buyingprice = db.Column(db.Numeric(10, 2), nullable=True)
     sellingprice = db.Column(db.Numeric(10, 2), nullable=True)
-    stock = db.Column(db.Integer, nullable=True)
+    stock = db.Column(db.Numeric(10, 3), nullable=True)  # Support up to 3 decimal places
     display = db.Column(db.Boolean, default=True, index=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(EAT))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(EAT), onupdate=lambda: datetime.now(EAT))
@@ -0,0 +1,95 @@
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import DocumentCounter
+
+
+def _upsert_counter(session, name, start):
+    """Create the counter at start, or increment it if it already exists, returning the new value"""
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        insert = postgresql.insert(DocumentCounter)
+    elif dialect == 'sqlite':
+        insert = sqlite.insert(DocumentCounter)
+    else:
+        raise NotImplementedError(f'Document numbering is not supported on {dialect}')
+    
+    statement = insert.values(name=name, value=start).on_conflict_do_update(
+        index_elements=[DocumentCounter.name],
+        set_={'value': DocumentCounter.value + 1}
+    ).returning(DocumentCounter.value)
+    return session.execute(statement).scalar_one()
+
+
+def allocate_number(name, seed=None, session=None):
+    """
+    Atomically take the next number of a counter
+    
+    The increment is a single UPDATE ... RETURNING that row-locks the counter until
+    the surrounding transaction ends, so concurrent callers wait for each other
+    instead of reading the same value. Allocate in the same transaction that
+    inserts the numbered document: a rollback then returns the number as well,
+    which keeps the sequence free of gaps.
+    
+    seed is called only when the counter does not exist yet and returns the last
+    number already in use, so counters pick up after documents created before
+    the counter was introduced.
+    """
+    session = session or db.session
+    value = session.execute(
+        update(DocumentCounter)
+        .where(DocumentCounter.name == name)
+        .values(value=DocumentCounter.value + 1)
+        .returning(DocumentCounter.value)
+    ).scalar()
+    if value is not None:
+        return value
+    
+    start = (seed() if seed else 0) + 1
+    return _upsert_counter(session, name, start)
+
+
+def last_sequence_in_use(column, prefix, session=None):
+    """Highest trailing sequence number among values of column that start with prefix"""
+    session = session or db.session
+    values = session.query(column).filter(column.like(f'{prefix}%')).all()
+    sequences = [int(value.rsplit('-', 1)[-1]) for (value,) in values if value.rsplit('-', 1)[-1].isdigit()]
+    return max(sequences, default=0)
+
+
+# Round keys of the quotation number permutation. Changing them reorders numbers
+# that were already handed out and can repeat them, so they are fixed here.
+_PERMUTATION_KEYS = (0x9e3, 0x5a1, 0xc47, 0x3d9)
+_HALF_BITS = 12
+
+
+def _feistel(value, half_bits=_HALF_BITS):
+    """Bijective scramble of an integer of 2 * half_bits bits"""
+    mask = (1 << half_bits) - 1
+    left, right = value >> half_bits, value & mask
+    for key in _PERMUTATION_KEYS:
+        mixed = ((right * 0x2c9) ^ key ^ (right >> 3)) & mask
+        left, right = right, left ^ mixed
+    return (left << half_bits) | right
+
+
+def _permute_below(value, limit, half_bits=_HALF_BITS):
+    """Scramble a value below limit to another value below limit by cycle-walking the Feistel network"""
+    value = _feistel(value, half_bits)
+    while value >= limit:
+        value = _feistel(value, half_bits)
+    return value
+
+
+def permute_sequence(value, digits=7):
+    """
+    Map a sequence number to a non-sequential number of the given width, one to one
+    
+    Values below 10**digits are scrambled with a Feistel network and cycle-walked
+    back into range, so distinct inputs always give distinct outputs. Larger
+    values are returned unchanged; they are wider than any scrambled value.
+    """
+    limit = 10 ** digits
+    if value >= limit or limit > (1 << (2 * _HALF_BITS)):
+        return value
+    return _permute_below(value, limit)
@@ -0,0 +1,154 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, or_
+from app import db
+
+
+def encode_cursor(values, direction='after'):
+    """Encode keyset values into an opaque, URL-safe cursor token"""
+    encoded_values = []
+    for value in values:
+        if isinstance(value, datetime):
+            encoded_values.append({'dt': value.isoformat()})
+        elif isinstance(value, Decimal):
+            encoded_values.append({'dec': str(value)})
+        else:
+            encoded_values.append(value)
+    payload = json.dumps({'d': direction, 'v': encoded_values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token into (direction, values); returns (None, None) for invalid tokens"""
+    if not token:
+        return None, None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        values = []
+        for value in payload['v']:
+            if isinstance(value, dict) and 'dt' in value:
+                values.append(datetime.fromisoformat(value['dt']))
+            elif isinstance(value, dict) and 'dec' in value:
+                values.append(Decimal(value['dec']))
+            elif value is None or isinstance(value, (str, int, float)):
+                values.append(value)
+            else:
+                # Only scalars can be compared with the sort key columns
+                return None, None
+        direction = payload.get('d', 'after')
+        if direction not in ('after', 'before'):
+            return None, None
+        return direction, values
+    except (ValueError, KeyError, TypeError, InvalidOperation):
+        return None, None
+
+
+def _keyset_filter(columns, values, forward, descending):
+    """Build the row comparison (a, b) > (x, y) / (a, b) < (x, y) for the keyset boundary"""
+    greater = forward != descending
+    clauses = []
+    for index, column in enumerate(columns):
+        equal_prefix = [columns[i] == values[i] for i in range(index)]
+        comparison = column > values[index] if greater else column < values[index]
+        clauses.append(and_(*equal_prefix, comparison))
+    return or_(*clauses)
+
+
+def count_rows(query, approximate=False):
+    """Count the rows of a query; on PostgreSQL an approximate count uses the planner estimate"""
+    query = query.order_by(None)
+    if approximate and db.engine.dialect.name == 'postgresql':
+        try:
+            compiled = query.statement.compile(dialect=db.engine.dialect)
+            result = db.session.connection().exec_driver_sql(
+                'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params
+            ).scalar()
+            plan = json.loads(result) if isinstance(result, str) else result
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            print(f"Warning: Could not estimate row count, falling back to COUNT: {str(e)}")
+    return query.count()
+
+
+class KeysetPagination:
+    """One page of a cursor (keyset) paginated query"""
+
+    is_keyset = True
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None, total_is_estimate=False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+
+def keyset_paginate(query, order_columns, key, cursor=None, per_page=20, descending=False,
+                    with_total=False, approximate_total=False):
+    """
+    Paginate a query by seeking past the last seen row instead of using OFFSET
+
+    Args:
+        query: Query to paginate (without ORDER BY)
+        order_columns: Columns forming a unique sort key, e.g. (Order.created_at, Order.id)
+        key: Callable returning the sort key values for a result row
+        cursor: Cursor token from a previous page, or None for the first page
+        per_page: Number of rows per page
+        descending: Sort the key columns in descending order
+        with_total: Also count the matching rows
+        approximate_total: Use an estimated count where the database supports it
+
+    Returns:
+        KeysetPagination: The page of rows with cursors for the neighbouring pages
+    """
+    direction, values = decode_cursor(cursor)
+    if values is not None and len(values) != len(order_columns):
+        direction, values = None, None
+    forward = direction != 'before'
+
+    total = count_rows(query, approximate_total) if with_total else None
+
+    if values is not None:
+        query = query.filter(_keyset_filter(order_columns, values, forward, descending))
+
+    reverse_order = descending == forward
+    ordering = [column.desc() if reverse_order else column.asc() for column in order_columns]
+    rows = query.order_by(*ordering).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    next_cursor = None
+    prev_cursor = None
+    if rows:
+        if (forward and has_more) or not forward:
+            next_cursor = encode_cursor(key(rows[-1]), 'after')
+        if (forward and values is not None) or (not forward and has_more):
+            prev_cursor = encode_cursor(key(rows[0]), 'before')
+
+    return KeysetPagination(rows, per_page, next_cursor, prev_cursor, total,
+                            total_is_estimate=approximate_total and db.engine.dialect.name == 'postgresql')
+
+
+def keyset_options(args):
+    """
+    Read the cursor pagination options from request arguments
+
+    ?paging=cursor (or any ?cursor=...) switches a listing to keyset pagination;
+    ?total=approx (default), exact or none controls how the total is counted.
+
+    Returns:
+        tuple: (use_keyset, cursor, with_total, approximate_total)
+    """
+    cursor = args.get('cursor')
+    use_keyset = args.get('paging') == 'cursor' or bool(cursor)
+    total_mode = args.get('total', 'approx')
+    return use_keyset, cursor, total_mode != 'none', total_mode == 'approx'
@@ -0,0 +1,177 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from io import BytesIO
+
+
+def _template_version():
+    """Fingerprint of the PDF layout code, styles and letterhead, so cached PDFs go stale when any changes"""
+    digest = hashlib.sha256()
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in (os.path.join(app_dir, 'pdf_utils.py'), os.path.join(app_dir, 'pdf_theme.py'),
+                 os.path.join(app_dir, '..', 'static', 'logo.png')):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class PDFCache:
+    """
+    On-disk cache of rendered PDFs with a size limit and least-recently-used eviction
+
+    Files are named <kind>-<document id>-<hash>.pdf, where the hash covers
+    everything the PDF is rendered from plus the layout version, so an edited
+    document never matches its old PDF. Reads bump a file's modification time,
+    which eviction uses as its recency.
+    """
+
+    def __init__(self, directory=None, max_bytes=200 * 1024 * 1024):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'abz-pdf-cache')
+        self.max_bytes = max_bytes
+        self.version = _template_version()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, directory=None, max_bytes=None):
+        """Change where PDFs are stored or how much space they may take"""
+        if directory:
+            self.directory = directory
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+
+    def key(self, inputs):
+        """Content hash of a document's render inputs"""
+        payload = json.dumps({'version': self.version, 'inputs': inputs}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, kind, document_id, key):
+        return os.path.join(self.directory, f'{kind}-{document_id}-{key}.pdf')
+
+    def get_or_render(self, kind, document_id, inputs, render):
+        """
+        Return (pdf bytes, etag) for these inputs, rendering the PDF first on a miss
+
+        render(buffer) writes the PDF into an in-memory buffer; the bytes are
+        served straight from memory and written to the cache once, through a
+        temporary file moved into place so readers never see a partial PDF.
+        """
+        key = self.key(inputs)
+        path = self._path(kind, document_id, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+            return data, key
+        except FileNotFoundError:
+            pass
+
+        buffer = BytesIO()
+        render(buffer)
+        data = buffer.getvalue()
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self.misses += 1
+        self._evict(keep=path)
+        return data, key
+
+    def _evict(self, keep=None):
+        """Remove the least recently used PDFs until the cache fits in max_bytes"""
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.pdf')):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def invalidate(self, kind, document_id):
+        """Drop every cached PDF of a document; returns the number removed"""
+        removed = 0
+        for path in glob.glob(os.path.join(self.directory, f'{kind}-{document_id}-*.pdf')):
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def stats(self):
+        """Counters and disk usage for monitoring the cache"""
+        paths = glob.glob(os.path.join(self.directory, '*.pdf'))
+        size = 0
+        for path in paths:
+            try:
+                size += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'files': len(paths),
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+
+pdf_cache = PDFCache()
+
+
+def quotation_pdf_inputs(quotation, user):
+    """Everything create_quotation_pdf_a4 renders from a quotation and the user generating it"""
+    return {
+        'quotation_number': quotation.quotation_number,
+        'customer_name': quotation.customer_name,
+        'created_at': quotation.created_at,
+        'valid_until': quotation.valid_until,
+        'branch': quotation.branch.name if quotation.branch else None,
+        'show_quantity_in_pdf': getattr(quotation, 'show_quantity_in_pdf', True),
+        'discount_percentage': quotation.discount_percentage,
+        'include_vat': quotation.include_vat,
+        'vat_rate': quotation.vat_rate,
+        'notes': quotation.notes,
+        'items': [{
+            'product_name': item.product_name,
+            'catalog_name': item.branch_product.catalog_product.name
+                            if item.branch_product and item.branch_product.catalog_product else None,
+            'quantity': item.quantity,
+            'unit': getattr(item, 'unit', None),
+            'unit_price': item.unit_price,
+            'price_unit': getattr(item, 'price_unit', None)
+        } for item in quotation.items],
+        'user': [user.firstname, user.lastname]
+    }
@@ -0,0 +1,255 @@
+import atexit
+import multiprocessing
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.orm import selectinload
+
+from app.invoices import build_invoice
+from app.models import Invoice, Order, OrderItem, Quotation, QuotationItem, BranchProduct
+from app.pdf_utils import create_invoice_pdf_a4, create_quotation_pdf_a4, create_merged_pdf_a4, render_pdf
+
+EXPORT_KINDS = ('invoices', 'quotations')
+EXPORT_FORMATS = ('zip', 'merged')
+
+
+def parse_export_date(value):
+    """A YYYY-MM-DD filter date, or None if empty; raises ValueError otherwise"""
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+def export_query(kind, start_date=None, end_date=None, branch_id=None, user=None):
+    """
+    Invoices or quotations to export, oldest first
+
+    start_date and end_date are inclusive dates; a non-admin user only gets
+    invoices of their own orders and quotations they created.
+    """
+    if kind == 'invoices':
+        query = Invoice.query.join(Order, Invoice.orderid == Order.id).options(
+            selectinload(Invoice.order).selectinload(Order.order_items)
+            .selectinload(OrderItem.branch_product).selectinload(BranchProduct.catalog_product),
+            selectinload(Invoice.order).selectinload(Order.user),
+            selectinload(Invoice.order).selectinload(Order.branch)
+        )
+        model, branch_column, owner_column = Invoice, Order.branchid, Order.userid
+    elif kind == 'quotations':
+        query = Quotation.query.options(
+            selectinload(Quotation.items).selectinload(QuotationItem.branch_product)
+            .selectinload(BranchProduct.catalog_product),
+            selectinload(Quotation.branch),
+            selectinload(Quotation.creator)
+        )
+        model, branch_column, owner_column = Quotation, Quotation.branch_id, Quotation.created_by
+    else:
+        raise ValueError(f"Unknown export kind: {kind}")
+
+    if start_date:
+        query = query.filter(model.created_at >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        query = query.filter(model.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    if branch_id:
+        query = query.filter(branch_column == branch_id)
+    if user is not None and user.role != 'admin':
+        query = query.filter(owner_column == user.id)
+    return query.order_by(model.created_at.asc(), model.id.asc())
+
+
+def invoice_document(invoice):
+    """('invoice', invoice_data, user_data) for an invoice, as plain data that can be sent to another process"""
+    order = invoice.order
+    user_data = {'firstname': order.user.firstname, 'lastname': order.user.lastname, 'email': order.user.email}
+    return 'invoice', build_invoice(order, invoice.invoice_number), user_data
+
+
+def quotation_document(quotation):
+    """('quotation', quotation, user) with plain copies of what create_quotation_pdf_a4 reads"""
+    items = [SimpleNamespace(
+        product_name=item.product_name,
+        branch_product=SimpleNamespace(catalog_product=SimpleNamespace(name=item.branch_product.catalog_product.name))
+                       if item.branch_product and item.branch_product.catalog_product else None,
+        quantity=item.quantity,
+        unit=item.unit,
+        unit_price=item.unit_price,
+        price_unit=item.price_unit
+    ) for item in quotation.items]
+    snapshot = SimpleNamespace(
+        quotation_number=quotation.quotation_number,
+        customer_name=quotation.customer_name,
+        created_at=quotation.created_at,
+        valid_until=quotation.valid_until,
+        branch=SimpleNamespace(name=quotation.branch.name) if quotation.branch else None,
+        show_quantity_in_pdf=quotation.show_quantity_in_pdf,
+        discount_percentage=quotation.discount_percentage,
+        include_vat=quotation.include_vat,
+        vat_rate=quotation.vat_rate,
+        notes=quotation.notes,
+        items=items
+    )
+    creator = SimpleNamespace(firstname=quotation.creator.firstname, lastname=quotation.creator.lastname)
+    return 'quotation', snapshot, creator
+
+
+def document_filename(kind, data):
+    """Name of a document's PDF inside an export archive"""
+    if kind == 'invoice':
+        return f"invoice_{data.invoice_number}.pdf"
+    return f"quotation_{data.quotation_number}.pdf"
+
+
+def render_document(document):
+    """Render one ('invoice' | 'quotation', data, user_data) document to PDF bytes"""
+    kind, data, user_data = document
+    renderer = create_invoice_pdf_a4 if kind == 'invoice' else create_quotation_pdf_a4
+    return document_filename(kind, data), render_pdf(renderer, data, user_data)
+
+
+def iter_documents(kind, query, batch_size=100):
+    """Plain-data documents for the rows of export_query(kind, ...), fetched in batches"""
+    to_document = invoice_document if kind == 'invoices' else quotation_document
+    for row in query.yield_per(batch_size):
+        yield to_document(row)
+
+
+def _spawn_pool(workers):
+    # Spawn, never fork: the web process runs threads (the email pool), and a
+    # child forked while one of them holds a lock would wait on it forever
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+class RenderPool:
+    """
+    The process pool a web process renders export PDFs in
+
+    The pool is started on first use and kept for later exports, so a process
+    never runs more than `workers` render processes however many exports are
+    requested. One export uses it at a time: acquire() returns False while
+    another export holds it, and the caller turns the request away.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()
+
+    def configure(self, workers=None):
+        """Change the pool size; only possible before the pool is started"""
+        with self._lock:
+            if self._executor is None and workers is not None:
+                self.workers = workers
+
+    def acquire(self):
+        """Reserve the pool for one export; False if another export is using it"""
+        return self._busy.acquire(blocking=False)
+
+    def release(self):
+        """Hand the pool back after an export"""
+        self._busy.release()
+
+    def executor(self):
+        """The pool's ProcessPoolExecutor, started on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = _spawn_pool(self.workers)
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def shutdown(self):
+        """Stop the render processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def render_documents(documents, workers=1, window=None, pool=None):
+    """
+    Yield (filename, pdf bytes) for each document, in order
+
+    ReportLab holds the GIL while it renders, so with workers > 1 documents are
+    rendered in a process pool: pool's shared one if given (its size overrides
+    workers), otherwise one started for this export. At most window documents
+    (default two per worker) are queued or rendered but not yet consumed,
+    which bounds memory no matter how many documents are exported.
+    """
+    if pool is not None:
+        workers = pool.workers
+    if workers <= 1:
+        for document in documents:
+            yield render_document(document)
+        return
+
+    window = window or workers * 2
+    executor = pool.executor() if pool is not None else _spawn_pool(workers)
+    pending = deque()
+    try:
+        for document in documents:
+            pending.append(executor.submit(render_document, document))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        if pool is None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            # Leave the shared pool idle for the next export
+            for future in pending:
+                future.cancel()
+            wait(pending)
+
+
+class _ChunkWriter:
+    """Write-only file object collecting what zipfile writes until it is taken"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip_chunks(files):
+    """Stream a ZIP archive of (filename, bytes) pairs, one file at a time"""
+    writer = _ChunkWriter()
+    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in files:
+            info = zipfile.ZipInfo(filename, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, data)
+            yield writer.take()
+    yield writer.take()
+
+
+def with_progress(files, total, progress, every=1):
+    """Pass files through, calling progress(done, total) after every `every` files and at the end"""
+    done = 0
+    for item in files:
+        yield item
+        done += 1
+        if progress and (done % every == 0 or done == total):
+            progress(done, total)
+
+
+def merged_pdf(documents):
+    """One PDF with every document on its own pages"""
+    return render_pdf(create_merged_pdf_a4, documents)
+
+
+# Renders the ZIP exports of this web process; sized from PDF_EXPORT_WORKERS
+pdf_render_pool = RenderPool()
@@ -0,0 +1,259 @@
+import copy
+import os
+import threading
+
+from reportlab.lib import colors
+from reportlab.lib.colors import black
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader, _digester
+from reportlab.pdfbase import pdfdoc
+from reportlab.platypus import Flowable, TableStyle
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static', 'logo.png')
+
+# Largest size the logo is printed at (the A4 letterhead) and the resolution it is kept at
+LOGO_MAX_SIZE = (1.5 * inch, 1 * inch)
+LOGO_DPI = 300
+
+# Standard PDF fonts, built into every viewer, so there is nothing to register or embed
+FONT = 'Helvetica'
+FONT_BOLD = 'Helvetica-Bold'
+
+
+class LogoAsset:
+    """
+    The letterhead logo, decoded, scaled to LOGO_DPI and encoded as a PDF image once
+
+    Canvas.drawImage compresses and ASCII85-encodes an image for every document
+    it is drawn into, which is most of the time spent rendering an invoice. The
+    encoded image stream is built here once; embed() registers a copy of it in a
+    document so the following drawImage call finds it and reuses it.
+    """
+
+    def __init__(self, path, max_size=LOGO_MAX_SIZE, dpi=LOGO_DPI):
+        from PIL import Image as PILImage
+
+        image = PILImage.open(path)
+        image.load()
+        width, height = image.size
+        scale = max(max_size[0] * dpi / 72 / width, max_size[1] * dpi / 72 / height)
+        if scale < 1:
+            image = image.resize((round(width * scale), round(height * scale)), PILImage.LANCZOS)
+
+        self.reader = ImageReader(image)
+        rgb = self.reader.getRGBData()
+        alpha = self.reader._dataA
+        # Same name Canvas.drawImage gives this image with mask='auto'
+        self.name = _digester(rgb + (alpha.getRGBData() if alpha else b'auto'))
+        xobject = pdfdoc.PDFImageXObject(self.name, self.reader, mask='auto')
+        xobject.name = self.name
+        self._smask = xobject.__dict__.pop('_smask', None)
+        self._xobject = xobject
+
+    def embed(self, canv):
+        """Add the pre-encoded image to the canvas's document unless it is already there"""
+        doc = canv._doc
+        reg_name = doc.getXObjectName(self.name)
+        if doc.idToObject.get(reg_name) is not None:
+            return
+        image = copy.copy(self._xobject)
+        canv._setXObjects(image)
+        doc.Reference(image, reg_name)
+        doc.addForm(self.name, image)
+        if self._smask is not None:
+            mask_reg_name = doc.getXObjectName(self._smask.name)
+            if doc.idToObject.get(mask_reg_name) is None:
+                smask = copy.copy(self._smask)
+                canv._setXObjects(smask)
+                image.smask = doc.Reference(smask, mask_reg_name)
+            else:
+                image.smask = pdfdoc.PDFObjectReference(mask_reg_name)
+
+
+class LogoFlowable(Flowable):
+    """Draws a LogoAsset at the given size"""
+
+    def __init__(self, logo, width, height, hAlign='CENTER'):
+        Flowable.__init__(self)
+        self.logo = logo
+        self.drawWidth = width
+        self.drawHeight = height
+        self.hAlign = hAlign
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.logo.embed(self.canv)
+        self.canv.drawImage(self.logo.reader, 0, 0, self.drawWidth, self.drawHeight, mask='auto')
+
+
+class PDFTheme:
+    """
+    Paragraph styles, table styles and the logo shared by every PDF renderer
+
+    Built once per process instead of once per document. Renderers only read
+    the styles, so they can be shared between threads; derive a new
+    ParagraphStyle from one rather than changing it. The logo is loaded on
+    first use, so processes that never render a PDF never decode it.
+    """
+
+    def __init__(self, logo_path=LOGO_PATH):
+        self.logo_path = logo_path
+        self._logo = None
+        self._logo_loaded = False
+        self._lock = threading.Lock()
+
+        styles = getSampleStyleSheet()
+        self.thermal = self._thermal_styles(styles)
+        self.a4 = self._a4_styles(styles)
+        self.tables = self._table_styles()
+
+    @staticmethod
+    def _thermal_styles(styles):
+        """Styles of the 80mm thermal receipt and quotation - all bold"""
+        def bold(name, fontSize, alignment, spaceAfter, **extra):
+            return ParagraphStyle(name, parent=styles['Normal'], fontSize=fontSize, textColor=black,
+                                  alignment=alignment, spaceAfter=spaceAfter, fontName=FONT_BOLD, **extra)
+
+        thermal = {
+            'header': bold('Header', 12, TA_CENTER, 6),
+            'tagline': bold('Tagline', 7, TA_CENTER, 5),
+            'contact': bold('Contact', 6, TA_CENTER, 2),
+            'divider': bold('Divider', 6, TA_CENTER, 6, spaceBefore=6),
+            'label': bold('Label', 6, TA_LEFT, 1),
+            'value': bold('Value', 6, TA_LEFT, 1),
+            'total': bold('Total', 9, TA_CENTER, 5),
+            'footer': bold('Footer', 6, TA_CENTER, 2),
+        }
+        # Smaller product names that wrap to multiple lines
+        thermal['product'] = ParagraphStyle('ProductName', parent=thermal['value'], fontSize=5,
+                                            spaceAfter=1, spaceBefore=1, leading=6)
+        thermal['total_centered'] = ParagraphStyle('TotalCentered', parent=thermal['value'], alignment=TA_CENTER,
+                                                   fontSize=9, spaceAfter=5, spaceBefore=5)
+        return thermal
+
+    @staticmethod
+    def _a4_styles(styles):
+        """Styles of the A4 quotation and invoice"""
+        def cell(name, alignment):
+            return ParagraphStyle(name, parent=styles['Normal'], fontSize=11, spaceAfter=0, spaceBefore=0,
+                                  leading=13, alignment=alignment, fontName=FONT)
+
+        a4 = {
+            'title': ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, spaceAfter=30,
+                                    alignment=1, textColor=colors.HexColor('#2c3e50')),
+            'heading': ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=16, spaceAfter=20,
+                                      textColor=colors.HexColor('#34495e')),
+            'normal': ParagraphStyle('CustomNormal', parent=styles['Normal'], fontSize=11, spaceAfter=12),
+            # Table cells that allow wrapping
+            'product_name': cell('ProductName', 0),
+            'center': cell('CenterText', 1),
+            'right': cell('RightText', 2),
+        }
+        # Slightly indented OR between the payment methods
+        a4['indented_or'] = ParagraphStyle('IndentedOR', parent=a4['normal'], alignment=0, leftIndent=50,
+                                           spaceAfter=6, spaceBefore=6)
+        return a4
+
+    @staticmethod
+    def _table_styles():
+        items_header = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), FONT_BOLD),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ]
+        items_body = [
+            ('FONTNAME', (0, 1), (-1, -1), FONT),
+            ('FONTSIZE', (0, 1), (-1, -1), 11),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4a5568')),
+        ]
+        # Alternating row colors
+        items_rows = [
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f7fafc')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#f7fafc'), colors.white]),
+        ]
+        quotation_items = (
+            items_header[:1] + [('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke)] + items_header[1:]
+            + [('VALIGN', (0, 0), (-1, 0), 'MIDDLE')]
+            + items_body + [('VALIGN', (0, 1), (-1, -1), 'TOP')]  # wrapped text starts at the top
+            + items_rows
+        )
+        padding = [
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ]
+        return {
+            # Clean table for thermal printing
+            'thermal_items': TableStyle([
+                ('FONTNAME', (0, 0), (-1, -1), FONT_BOLD),
+                ('FONTSIZE', (0, 0), (-1, -1), 6),
+                ('TEXTCOLOR', (0, 0), (-1, -1), black),
+                ('ALIGN', (0, 0), (0, -1), 'LEFT'),    # Product name left
+                ('ALIGN', (1, 0), (1, -1), 'CENTER'),  # Quantity center
+                ('ALIGN', (2, 0), (3, -1), 'RIGHT'),   # Prices right
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+                ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ]),
+            'letterhead': TableStyle([
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('LEFTPADDING', (0, 0), (0, 0), 0),
+                ('RIGHTPADDING', (1, 0), (1, 0), 0),
+            ]),
+            # Yellow line under the letterhead
+            'separator': TableStyle([
+                ('BACKGROUND', (0, 0), (0, 0), colors.HexColor('#f4b942')),
+            ]),
+            'quotation_items': TableStyle(quotation_items + [
+                ('ALIGN', (0, 1), (0, -1), 'LEFT'),    # Product Name left
+                ('ALIGN', (1, 1), (1, -1), 'CENTER'),  # Quantity center
+                ('ALIGN', (2, 1), (3, -1), 'RIGHT'),   # Prices right
+            ] + padding),
+            'quotation_items_no_quantity': TableStyle(quotation_items + [
+                ('ALIGN', (0, 1), (0, -1), 'LEFT'),    # Product Name left
+                ('ALIGN', (1, 1), (2, -1), 'RIGHT'),   # Prices right
+            ] + padding),
+            'invoice_items': TableStyle(
+                items_header[:1] + [('TEXTCOLOR', (0, 0), (-1, 0), colors.white)] + items_header[1:]
+                + items_body + items_rows + [
+                    ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+                    ('ALIGN', (1, 1), (1, -1), 'CENTER'),
+                    ('ALIGN', (2, 1), (3, -1), 'RIGHT'),
+                ] + padding[:2]
+            ),
+            'invoice_total': TableStyle([
+                ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+                ('FONTNAME', (0, 0), (-1, -1), FONT_BOLD),
+                ('FONTSIZE', (0, 0), (-1, -1), 12),
+                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4a5568')),
+                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#e2e8f0')),
+            ]),
+        }
+
+    @property
+    def logo(self):
+        """The LogoAsset, or None if the logo file is missing or unreadable"""
+        if not self._logo_loaded:
+            with self._lock:
+                if not self._logo_loaded:
+                    try:
+                        if os.path.exists(self.logo_path):
+                            self._logo = LogoAsset(self.logo_path)
+                    except Exception as e:
+                        print(f"Warning: Could not load logo: {e}")
+                    self._logo_loaded = True
+        return self._logo
+
+    def logo_image(self, width, height, hAlign='CENTER'):
+        """A flowable drawing the logo at width x height, or None without a logo"""
+        logo = self.logo
+        return LogoFlowable(logo, width, height, hAlign) if logo else None
+
+
+pdf_theme = PDFTheme()
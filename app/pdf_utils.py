@@ -1,5 +1,4 @@
 from reportlab.lib.pagesizes import A4, letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, mm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
@@ -8,6 +7,8 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.colors import black, white
 import os
 from datetime import datetime
+from io import BytesIO
+from app.pdf_theme import pdf_theme
 
 def format_currency(amount):
     """
@@ -51,14 +52,13 @@ def format_quantity(quantity):
         # Has decimal part, return with 2 decimal places
         return f"{quantity:.2f}"
 
-def create_receipt_pdf(invoice_data, user_data, output_path):
+def create_receipt_pdf(invoice_data, user_data, output_path, theme=None):
     """
     Create a professional thermal receipt (80mm width)
+    invoice_data is an app.invoices.InvoiceData
     output_path can be a file path (string) or BytesIO object
     """
     # Create custom page size for 80mm thermal receipt
-    from reportlab.lib.units import mm
-    
     # 80mm = 226.77 points
     receipt_width = 80 * 2.83465
     
@@ -78,109 +78,25 @@ def create_receipt_pdf(invoice_data, user_data, output_path):
         bottomMargin=8*mm
     )
     
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Professional thermal receipt styles (optimized for 80mm) - ALL BOLD
-    header_style = ParagraphStyle(
-        'Header',
-        parent=styles['Normal'],
-        fontSize=12,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=6,
-        fontName='Helvetica-Bold'
-    )
-    
-    tagline_style = ParagraphStyle(
-        'Tagline',
-        parent=styles['Normal'],
-        fontSize=7,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=5,
-        fontName='Helvetica-Bold'
-    )
-    
-    contact_style = ParagraphStyle(
-        'Contact',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=2,
-        fontName='Helvetica-Bold'
-    )
-    
-    divider_style = ParagraphStyle(
-        'Divider',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=6,
-        spaceBefore=6,
-        fontName='Helvetica-Bold'
-    )
-    
-    label_style = ParagraphStyle(
-        'Label',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_LEFT,
-        spaceAfter=1,
-        fontName='Helvetica-Bold'
-    )
-    
-    value_style = ParagraphStyle(
-        'Value',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_LEFT,
-        spaceAfter=1,
-        fontName='Helvetica-Bold'
-    )
-    
-    total_style = ParagraphStyle(
-        'Total',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=5,
-        fontName='Helvetica-Bold'
-    )
-    
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=2,
-        fontName='Helvetica-Bold'
-    )
+    # Shared thermal styles (optimized for 80mm) - ALL BOLD
+    theme = theme or pdf_theme
+    header_style = theme.thermal['header']
+    tagline_style = theme.thermal['tagline']
+    contact_style = theme.thermal['contact']
+    divider_style = theme.thermal['divider']
+    label_style = theme.thermal['label']
+    value_style = theme.thermal['value']
+    total_style = theme.thermal['total']
+    footer_style = theme.thermal['footer']
     
     # Build the story (content)
     story = []
     
-    # Company header with logo
-    from reportlab.platypus import Image
-    from reportlab.lib.units import mm
-    
-    # Add company logo
-    try:
-        logo_path = os.path.join(os.path.dirname(__file__), '..', 'static', 'logo.png')
-        if os.path.exists(logo_path):
-            # Logo size: 18mm x 18mm (scaled proportionally)
-            logo = Image(logo_path, width=18*mm, height=18*mm)
-            logo.hAlign = 'CENTER'
-            story.append(logo)
-            story.append(Spacer(1, 4))
-    except Exception as e:
-        print(f"Warning: Could not load logo: {e}")
+    # Company header with logo, 18mm x 18mm
+    logo = theme.logo_image(18*mm, 18*mm)
+    if logo:
+        story.append(logo)
+        story.append(Spacer(1, 4))
     
     # Company name and tagline
     story.append(Paragraph("ABZ HARDWARE", header_style))
@@ -197,7 +113,7 @@ def create_receipt_pdf(invoice_data, user_data, output_path):
     story.append(Paragraph("─" * 30, divider_style))
     
     # Items table - clean and simple
-    if invoice_data.get('order_items'):
+    if invoice_data.order_items:
         # Simple table without borders for thermal printing
         table_data = []
         
@@ -210,28 +126,13 @@ def create_receipt_pdf(invoice_data, user_data, output_path):
         ])
         
         # Add items
-        for item in invoice_data['order_items']:
-            product_name = item.get('product_name', 'N/A')
-            quantity = item.get('quantity', 0)
-            unit_price = item.get('unit_price', 0)
-            total = item.get('total', 0)
-            
-            # Create product name paragraph that can wrap to multiple lines
-            # Use smaller font size for product names to fit more text
-            product_style = ParagraphStyle(
-                'ProductName',
-                parent=value_style,
-                fontSize=5,  # Smaller font size for product names
-                spaceAfter=1,
-                spaceBefore=1,
-                leading=6  # Line spacing for multi-line text
-            )
-            
+        for item in invoice_data.order_items:
             table_data.append([
-                Paragraph(product_name, product_style),
-                Paragraph(format_quantity(quantity), value_style),
-                Paragraph(format_currency(unit_price).replace('KSh ', ''), value_style),
-                Paragraph(format_currency(total).replace('KSh ', ''), value_style)
+                # Smaller product names that can wrap to multiple lines
+                Paragraph(item.product_name, theme.thermal['product']),
+                Paragraph(format_quantity(item.quantity), value_style),
+                Paragraph(format_currency(item.unit_price).replace('KSh ', ''), value_style),
+                Paragraph(format_currency(item.total).replace('KSh ', ''), value_style)
             ])
         
         # Create table with optimized widths for 80mm
@@ -240,18 +141,7 @@ def create_receipt_pdf(invoice_data, user_data, output_path):
         table = Table(table_data, colWidths=[100, 30, 45, 45])  # Total: 220 points
         
         # Clean table style for thermal printing
-        table_style = TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),  # All text bold
-            ('FONTSIZE', (0, 0), (-1, -1), 6),
-            ('TEXTCOLOR', (0, 0), (-1, -1), black),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),    # Product name left
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),  # Quantity center
-            ('ALIGN', (2, 0), (3, -1), 'RIGHT'),   # Prices right
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-            ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ])
-        
-        table.setStyle(table_style)
+        table.setStyle(theme.tables['thermal_items'])
         story.append(table)
     
     story.append(Spacer(1, 8))
@@ -260,7 +150,7 @@ def create_receipt_pdf(invoice_data, user_data, output_path):
     story.append(Paragraph("─" * 30, divider_style))
     
     # Total amount - prominent display
-    story.append(Paragraph(f"TOTAL: {format_currency(invoice_data.get('subtotal', 0))}", total_style))
+    story.append(Paragraph(f"TOTAL: {format_currency(invoice_data.subtotal)}", total_style))
     
     story.append(Spacer(1, 8))
     
@@ -268,9 +158,9 @@ def create_receipt_pdf(invoice_data, user_data, output_path):
     story.append(Paragraph("─" * 30, divider_style))
     
     # Receipt details below total
-    story.append(Paragraph(f"Order: #{invoice_data.get('order_id', 'N/A')}", label_style))
-    story.append(Paragraph(f"Date: {invoice_data.get('order_date', 'N/A')} at {invoice_data.get('order_time', 'N/A')}", label_style))
-    story.append(Paragraph(f"Branch: {invoice_data.get('branch', 'N/A')}", label_style))
+    story.append(Paragraph(f"Order: #{invoice_data.order_id}", label_style))
+    story.append(Paragraph(f"Date: {invoice_data.order_date} at {invoice_data.order_time}", label_style))
+    story.append(Paragraph(f"Branch: {invoice_data.branch}", label_style))
     story.append(Paragraph(f"Served by: {user_data.get('firstname', 'N/A')}", label_style))
     
     story.append(Spacer(1, 10))
@@ -285,6 +175,15 @@ def create_receipt_pdf(invoice_data, user_data, output_path):
     
     return output_path
 
+def render_pdf(renderer, *args):
+    """
+    Render a PDF entirely in memory and return its bytes
+    renderer is one of the create_*_pdf functions, called with args and a BytesIO as output_path
+    """
+    buffer = BytesIO()
+    renderer(*args, buffer)
+    return buffer.getvalue()
+
 def generate_receipt_filename(invoice_number):
     """Generate a filename for the receipt"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -293,83 +192,47 @@ def generate_receipt_filename(invoice_number):
 def generate_invoice_pdf(invoice_id):
     """
     Generate PDF invoice data for email attachments
-    Returns BytesIO object for email attachment
+    Returns the PDF as bytes for email attachment
     """
-    from io import BytesIO
-    from app.models import Invoice, Order, OrderItem, BranchProduct, User, Branch
+    from app.models import Invoice
+    from app.invoices import load_invoice_order, build_invoice
     
-    # Get invoice and related data
     invoice = Invoice.query.get_or_404(invoice_id)
-    order = Order.query.get_or_404(invoice.orderid)
-    
-    # Prepare invoice data
-    invoice_data = {
-        'invoice_number': invoice.invoice_number,
-        'order_id': order.id,
-        'customer_name': f"{order.user.firstname} {order.user.lastname}",
-        'customer_email': order.user.email,
-        'customer_phone': getattr(order.user, 'phone', 'N/A'),
-        'branch': order.branch.name,
-        'order_date': order.created_at.strftime('%B %d, %Y'),
-        'order_time': order.created_at.strftime('%I:%M %p'),
-        'order_items': [],
-        'subtotal': 0
-    }
+    order = load_invoice_order(invoice.orderid)
     
-    # Calculate totals and prepare items
-    for item in order.order_items:
-        # Use final_price for calculations (includes negotiated prices)
-        if item.final_price is not None:
-            final_price = float(item.final_price)
-        elif item.branch_productid and item.branch_product and item.branch_product.sellingprice is not None:
-            final_price = float(item.branch_product.sellingprice)
-        else:
-            final_price = 0.0
-        
-        item_total = item.quantity * final_price
-        invoice_data['subtotal'] += item_total
-        
-        # Get product name - use product_name field if available, otherwise fall back to branch_product.catalog_product.name
-        if item.product_name:
-            product_name = item.product_name
-        elif item.branch_productid and item.branch_product:
-            product_name = item.branch_product.catalog_product.name
-        else:
-            product_name = "Manual Item"
-        
-        invoice_data['order_items'].append({
-            'product_name': product_name,
-            'quantity': item.quantity,
-            'unit_price': final_price,
-            'total': item_total
-        })
-    
-    # Prepare user data
     user_data = {
         'firstname': order.user.firstname,
         'lastname': order.user.lastname,
         'email': order.user.email
     }
     
-    # Create BytesIO object for email attachment
-    pdf_buffer = BytesIO()
+    return render_pdf(create_receipt_pdf, build_invoice(order, invoice.invoice_number), user_data)
+
+def generate_receipt_pdf(receipt_id):
+    """
+    Generate PDF receipt data for email attachments
+    Returns the thermal receipt of the receipt's order as bytes
+    """
+    from app.models import Receipt
+    from app.invoices import load_invoice_order, build_invoice
     
-    # Generate PDF to BytesIO
-    create_receipt_pdf(invoice_data, user_data, pdf_buffer)
+    receipt = Receipt.query.get_or_404(receipt_id)
+    order = load_invoice_order(receipt.orderid)
     
-    # Reset buffer position
-    pdf_buffer.seek(0)
+    user_data = {
+        'firstname': order.user.firstname,
+        'lastname': order.user.lastname,
+        'email': order.user.email
+    }
     
-    return pdf_buffer
+    return render_pdf(create_receipt_pdf, build_invoice(order, receipt.receipt_number), user_data)
 
-def create_quotation_pdf(quotation, user_data, output_path):
+def create_quotation_pdf(quotation, user_data, output_path, theme=None):
     """
     Create a professional quotation PDF (80mm width)
     output_path can be a file path (string) or BytesIO object
     """
     # Create custom page size for 80mm thermal receipt
-    from reportlab.lib.units import mm
-    
     # 80mm = 226.77 points
     receipt_width = 80 * 2.83465
     
@@ -389,109 +252,24 @@ def create_quotation_pdf(quotation, user_data, output_path):
         bottomMargin=8*mm
     )
     
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Professional quotation styles (optimized for 80mm) - ALL BOLD
-    header_style = ParagraphStyle(
-        'Header',
-        parent=styles['Normal'],
-        fontSize=12,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=6,
-        fontName='Helvetica-Bold'
-    )
-    
-    tagline_style = ParagraphStyle(
-        'Tagline',
-        parent=styles['Normal'],
-        fontSize=7,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=5,
-        fontName='Helvetica-Bold'
-    )
-    
-    contact_style = ParagraphStyle(
-        'Contact',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=2,
-        fontName='Helvetica-Bold'
-    )
-    
-    divider_style = ParagraphStyle(
-        'Divider',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=6,
-        spaceBefore=6,
-        fontName='Helvetica-Bold'
-    )
-    
-    label_style = ParagraphStyle(
-        'Label',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_LEFT,
-        spaceAfter=1,
-        fontName='Helvetica-Bold'
-    )
-    
-    value_style = ParagraphStyle(
-        'Value',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_LEFT,
-        spaceAfter=1,
-        fontName='Helvetica-Bold'
-    )
-    
-    total_style = ParagraphStyle(
-        'Total',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=5,
-        fontName='Helvetica-Bold'
-    )
-    
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=6,
-        textColor=black,
-        alignment=TA_CENTER,
-        spaceAfter=2,
-        fontName='Helvetica-Bold'
-    )
+    # Shared thermal styles (optimized for 80mm) - ALL BOLD
+    theme = theme or pdf_theme
+    header_style = theme.thermal['header']
+    tagline_style = theme.thermal['tagline']
+    contact_style = theme.thermal['contact']
+    divider_style = theme.thermal['divider']
+    label_style = theme.thermal['label']
+    value_style = theme.thermal['value']
+    footer_style = theme.thermal['footer']
     
     # Build the story (content)
     story = []
     
-    # Company header with logo
-    from reportlab.platypus import Image
-    from reportlab.lib.units import mm
-    
-    # Add company logo
-    try:
-        logo_path = os.path.join(os.path.dirname(__file__), '..', 'static', 'logo.png')
-        if os.path.exists(logo_path):
-            # Logo size: 18mm x 18mm (scaled proportionally)
-            logo = Image(logo_path, width=18*mm, height=18*mm)
-            logo.hAlign = 'CENTER'
-            story.append(logo)
-            story.append(Spacer(1, 4))
-    except Exception as e:
-        print(f"Warning: Could not load logo: {e}")
+    # Company header with logo, 18mm x 18mm
+    logo = theme.logo_image(18*mm, 18*mm)
+    if logo:
+        story.append(logo)
+        story.append(Spacer(1, 4))
     
     # Company name and tagline
     story.append(Paragraph("ABZ HARDWARE", header_style))
@@ -531,19 +309,9 @@ def create_quotation_pdf(quotation, user_data, output_path):
             unit_price = item.unit_price
             total = item.unit_price * item.quantity
             
-            # Create product name paragraph that can wrap to multiple lines
-            # Use smaller font size for product names to fit more text
-            product_style = ParagraphStyle(
-                'ProductName',
-                parent=value_style,
-                fontSize=5,  # Smaller font size for product names
-                spaceAfter=1,
-                spaceBefore=1,
-                leading=6  # Line spacing for multi-line text
-            )
-            
             table_data.append([
-                Paragraph(product_name, product_style),
+                # Smaller product names that can wrap to multiple lines
+                Paragraph(product_name, theme.thermal['product']),
                 Paragraph(format_quantity(quantity), value_style),
                 Paragraph(format_currency(unit_price).replace('KSh ', ''), value_style),
                 Paragraph(format_currency(total).replace('KSh ', ''), value_style)
@@ -555,18 +323,7 @@ def create_quotation_pdf(quotation, user_data, output_path):
         table = Table(table_data, colWidths=[100, 30, 45, 45])  # Total: 220 points
         
         # Clean table style for thermal printing
-        table_style = TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),  # All text bold
-            ('FONTSIZE', (0, 0), (-1, -1), 6),
-            ('TEXTCOLOR', (0, 0), (-1, -1), black),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),    # Product name left
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),  # Quantity center
-            ('ALIGN', (2, 0), (3, -1), 'RIGHT'),   # Prices right
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-            ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ])
-        
-        table.setStyle(table_style)
+        table.setStyle(theme.tables['thermal_items'])
         story.append(table)
     
     story.append(Spacer(1, 8))
@@ -575,15 +332,7 @@ def create_quotation_pdf(quotation, user_data, output_path):
     story.append(Paragraph("─" * 30, divider_style))
     
     # Total amount - prominent display (centered)
-    total_centered_style = ParagraphStyle(
-        'TotalCentered',
-        parent=value_style,
-        alignment=TA_CENTER,  # Center the total horizontally
-        fontSize=9,  # Keep the larger font size for prominence
-        spaceAfter=5,
-        spaceBefore=5
-    )
-    story.append(Paragraph(f"TOTAL: {format_currency(quotation.total_amount)}", total_centered_style))
+    story.append(Paragraph(f"TOTAL: {format_currency(quotation.total_amount)}", theme.thermal['total_centered']))
     
     story.append(Spacer(1, 8))
     
@@ -607,15 +356,19 @@ def create_quotation_pdf(quotation, user_data, output_path):
     
     return output_path 
 
-def create_quotation_pdf_a4(quotation, user_data, output_path):
+def create_quotation_pdf_a4(quotation, user_data, output_path, theme=None):
     """
     Create a professional quotation PDF (A4 size)
     output_path can be a file path (string) or BytesIO object
     """
-    from reportlab.lib.pagesizes import A4
+    doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=18)
+    doc.build(quotation_a4_elements(quotation, user_data, theme))
+    return output_path
+
+def quotation_a4_elements(quotation, user_data, theme=None):
+    """Flowables of an A4 quotation, shared by create_quotation_pdf_a4 and merged exports"""
     from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
     from reportlab.lib.units import inch
     from datetime import datetime
     import pytz
@@ -623,70 +376,27 @@ def create_quotation_pdf_a4(quotation, user_data, output_path):
     # Set timezone to East Africa Time
     EAT = pytz.timezone('Africa/Nairobi')
     
-    # Create PDF buffer
-    if isinstance(output_path, str):
-        # If output_path is a string, create a file
-        doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=18)
-    else:
-        # If output_path is BytesIO, use it directly
-        doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=18)
-    
     # Container for the 'Flowable' objects
     elements = []
     
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=1,  # Center alignment
-        textColor=colors.HexColor('#2c3e50')
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=20,
-        textColor=colors.HexColor('#34495e')
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=12
-    )
+    # Shared A4 styles
+    theme = theme or pdf_theme
+    title_style = theme.a4['title']
+    heading_style = theme.a4['heading']
+    normal_style = theme.a4['normal']
     
     # Recreate the ABZ Hardware letterhead manually
     
-    # Try to load the logo for the left side
-    try:
-        logo_path = os.path.join(os.path.dirname(__file__), '..', 'static', 'logo.png')
-        if os.path.exists(logo_path):
-            logo_image = Image(logo_path, width=1.5*inch, height=1*inch)
-            logo_cell = logo_image
-        else:
-            # Fallback to text if logo not found
-            logo_cell = Paragraph('''
+    # Logo for the left side, with a text fallback if it is missing
+    logo_cell = theme.logo_image(1.5*inch, 1*inch)
+    if logo_cell is None:
+        logo_cell = Paragraph('''
             <para align=left>
             <b><font size=24 color="#1a365d">🔧ABZ</font></b><br/>
             <b><font size=16 color="#f4b942">HARDWARE</font></b><br/>
             <b><font size=14 color="#1a365d">LIMITED</font></b>
             </para>
             ''', normal_style)
-    except Exception as e:
-        print(f"Error loading logo: {e}")
-        # Fallback to text if logo fails to load
-        logo_cell = Paragraph('''
-        <para align=left>
-        <b><font size=24 color="#1a365d">🔧ABZ</font></b><br/>
-        <b><font size=16 color="#f4b942">HARDWARE</font></b><br/>
-        <b><font size=14 color="#1a365d">LIMITED</font></b>
-        </para>
-        ''', normal_style)
     
     # Create the letterhead table for proper layout
     letterhead_data = [[
@@ -707,11 +417,7 @@ def create_quotation_pdf_a4(quotation, user_data, output_path):
     
     # Create letterhead table
     letterhead_table = Table(letterhead_data, colWidths=[3.5*inch, 3.5*inch])
-    letterhead_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (0, 0), 0),
-        ('RIGHTPADDING', (1, 0), (1, 0), 0),
-    ]))
+    letterhead_table.setStyle(theme.tables['letterhead'])
     
     elements.append(letterhead_table)
     elements.append(Spacer(1, 10))
@@ -719,9 +425,7 @@ def create_quotation_pdf_a4(quotation, user_data, output_path):
     # Add the colored line separator (yellow and dark blue)
     separator_data = [[""]]
     separator_table = Table(separator_data, colWidths=[7*inch], rowHeights=[0.05*inch])
-    separator_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, 0), colors.HexColor('#f4b942')),  # Yellow color
-    ]))
+    separator_table.setStyle(theme.tables['separator'])  # Yellow color
     
     elements.append(separator_table)
     elements.append(Spacer(1, 30))
@@ -761,39 +465,10 @@ def create_quotation_pdf_a4(quotation, user_data, output_path):
         else:
             data = [['Product Name', 'Unit Price', 'Total Price']]
         
-        # Create styles for table cells that allow wrapping
-        product_name_style = ParagraphStyle(
-            'ProductName',
-            parent=styles['Normal'],
-            fontSize=11,
-            spaceAfter=0,
-            spaceBefore=0,
-            leading=13,  # Line spacing for multi-line text
-            alignment=0,  # Left alignment
-            fontName='Helvetica'
-        )
-        
-        center_style = ParagraphStyle(
-            'CenterText',
-            parent=styles['Normal'],
-            fontSize=11,
-            spaceAfter=0,
-            spaceBefore=0,
-            leading=13,
-            alignment=1,  # Center alignment
-            fontName='Helvetica'
-        )
-        
-        right_style = ParagraphStyle(
-            'RightText',
-            parent=styles['Normal'],
-            fontSize=11,
-            spaceAfter=0,
-            spaceBefore=0,
-            leading=13,
-            alignment=2,  # Right alignment
-            fontName='Helvetica'
-        )
+        # Table cells that allow wrapping
+        product_name_style = theme.a4['product_name']
+        center_style = theme.a4['center']
+        right_style = theme.a4['right']
         
         for item in quotation.items:
             # Get product name - use product_name field if available, otherwise fall back to branch_product.catalog_product.name
@@ -838,68 +513,11 @@ def create_quotation_pdf_a4(quotation, user_data, output_path):
         # Create table with appropriate columns
         if show_quantity:
             table = Table(data, colWidths=[3.5*inch, 1*inch, 1.5*inch, 1.5*inch])
-            table.setStyle(TableStyle([
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-                
-                # Data rows
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 11),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4a5568')),
-                ('VALIGN', (0, 1), (-1, -1), 'TOP'),  # Vertical alignment for wrapped text
-                
-                # Alternating row colors
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f7fafc')),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#f7fafc'), colors.white]),
-                
-                # Alignment adjustments
-                ('ALIGN', (0, 1), (0, -1), 'LEFT'),    # Product Name left
-                ('ALIGN', (1, 1), (1, -1), 'CENTER'),  # Quantity center
-                ('ALIGN', (2, 1), (3, -1), 'RIGHT'),   # Prices right
-                
-                # Padding
-                ('TOPPADDING', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ]))
+            table.setStyle(theme.tables['quotation_items'])
         else:
             # Without quantity column - 3 columns only
             table = Table(data, colWidths=[4*inch, 1.75*inch, 1.75*inch])
-            table.setStyle(TableStyle([
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-                
-                # Data rows
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 11),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4a5568')),
-                ('VALIGN', (0, 1), (-1, -1), 'TOP'),  # Vertical alignment for wrapped text
-                
-                # Alternating row colors
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f7fafc')),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#f7fafc'), colors.white]),
-                
-                # Alignment adjustments
-                ('ALIGN', (0, 1), (0, -1), 'LEFT'),    # Product Name left
-                ('ALIGN', (1, 1), (2, -1), 'RIGHT'),   # Prices right
-                
-                # Padding
-                ('TOPPADDING', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ]))
+            table.setStyle(theme.tables['quotation_items_no_quantity'])
         
         elements.append(table)
         elements.append(Spacer(1, 30))
@@ -987,19 +605,21 @@ def create_quotation_pdf_a4(quotation, user_data, output_path):
     elements.append(Spacer(1, 50))
     elements.append(Paragraph(footer_text, normal_style))
     
-    # Build PDF
-    doc.build(elements)
-    
-    return output_path 
+    return elements
 
-def create_invoice_pdf_a4(invoice_data, user_data, output_path):
+def create_invoice_pdf_a4(invoice_data, user_data, output_path, theme=None):
     """
     Create a professional invoice PDF (A4 size) that looks exactly like the quotation
+    invoice_data is an app.invoices.InvoiceData
     """
-    from reportlab.lib.pagesizes import A4
+    doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=18)
+    doc.build(invoice_a4_elements(invoice_data, user_data, theme))
+    return output_path
+
+def invoice_a4_elements(invoice_data, user_data, theme=None):
+    """Flowables of an A4 invoice, shared by create_invoice_pdf_a4 and merged exports"""
     from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
     from reportlab.lib.units import inch
     from datetime import datetime
     import pytz
@@ -1007,63 +627,25 @@ def create_invoice_pdf_a4(invoice_data, user_data, output_path):
     # Set timezone to East Africa Time
     EAT = pytz.timezone('Africa/Nairobi')
     
-    # Create PDF buffer
-    if isinstance(output_path, str):
-        doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=18)
-    else:
-        doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=18)
-    
     # Container for the 'Flowable' objects
     elements = []
     
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=1,  # Center alignment
-        textColor=colors.HexColor('#2c3e50')
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=20,
-        textColor=colors.HexColor('#34495e')
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=12
-    )
+    # Shared A4 styles
+    theme = theme or pdf_theme
+    title_style = theme.a4['title']
+    heading_style = theme.a4['heading']
+    normal_style = theme.a4['normal']
     
-    # Try to load the logo
-    try:
-        logo_path = os.path.join(os.path.dirname(__file__), '..', 'static', 'logo.png')
-        if os.path.exists(logo_path):
-            logo_image = Image(logo_path, width=1.5*inch, height=1*inch)
-            logo_cell = logo_image
-        else:
-            logo_cell = Paragraph('''
+    # Logo, with a text fallback if it is missing
+    logo_cell = theme.logo_image(1.5*inch, 1*inch)
+    if logo_cell is None:
+        logo_cell = Paragraph('''
             <para align=left>
             <b><font size=24 color="#1a365d">🔧ABZ</font></b><br/>
             <b><font size=16 color="#f4b942">HARDWARE</font></b><br/>
             <b><font size=14 color="#1a365d">LIMITED</font></b>
             </para>
             ''', normal_style)
-    except:
-        logo_cell = Paragraph('''
-        <para align=left>
-        <b><font size=24 color="#1a365d">🔧ABZ</font></b><br/>
-        <b><font size=16 color="#f4b942">HARDWARE</font></b><br/>
-        <b><font size=14 color="#1a365d">LIMITED</font></b>
-        </para>
-        ''', normal_style)
     
     # Create letterhead table
     letterhead_data = [[
@@ -1080,11 +662,7 @@ def create_invoice_pdf_a4(invoice_data, user_data, output_path):
     ]]
     
     letterhead_table = Table(letterhead_data, colWidths=[3.5*inch, 3.5*inch])
-    letterhead_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (0, 0), 0),
-        ('RIGHTPADDING', (1, 0), (1, 0), 0),
-    ]))
+    letterhead_table.setStyle(theme.tables['letterhead'])
     
     elements.append(letterhead_table)
     elements.append(Spacer(1, 10))
@@ -1092,9 +670,7 @@ def create_invoice_pdf_a4(invoice_data, user_data, output_path):
     # Add colored line separator
     separator_data = [[""]]
     separator_table = Table(separator_data, colWidths=[7*inch], rowHeights=[0.05*inch])
-    separator_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, 0), colors.HexColor('#f4b942')),
-    ]))
+    separator_table.setStyle(theme.tables['separator'])
     
     elements.append(separator_table)
     elements.append(Spacer(1, 30))
@@ -1105,79 +681,42 @@ def create_invoice_pdf_a4(invoice_data, user_data, output_path):
     
     # Invoice Details
     invoice_details = f"""
-    <b>Invoice Number:</b> {invoice_data.get('invoice_number', 'N/A')}<br/>
-    <b>Order Number:</b> {invoice_data.get('order_id', 'N/A')}<br/>
-    <b>Date & Time:</b> {invoice_data.get('order_date', 'N/A')} at {invoice_data.get('order_time', 'N/A')}<br/>
-    <b>Branch:</b> {invoice_data.get('branch', 'N/A')}<br/>
+    <b>Invoice Number:</b> {invoice_data.invoice_number}<br/>
+    <b>Order Number:</b> {invoice_data.order_id}<br/>
+    <b>Date & Time:</b> {invoice_data.order_date} at {invoice_data.order_time}<br/>
+    <b>Branch:</b> {invoice_data.branch}<br/>
     """
     elements.append(Paragraph(invoice_details, normal_style))
     elements.append(Spacer(1, 5))
     
     # Items Table
-    if invoice_data.get('order_items'):
+    if invoice_data.order_items:
         elements.append(Paragraph("ITEMS INVOICED", heading_style))
         
         data = [['Product Name', 'Quantity', 'Unit Price', 'Total Price']]
         
-        # Create a style for product names that allows wrapping
-        product_name_style = ParagraphStyle(
-            'ProductName',
-            parent=styles['Normal'],
-            fontSize=11,
-            spaceAfter=0,
-            spaceBefore=0,
-            leading=13,  # Line spacing for multi-line text
-            alignment=0,  # Left alignment
-            fontName='Helvetica'
-        )
+        # Product names can wrap
+        product_name_style = theme.a4['product_name']
         
-        for item in invoice_data['order_items']:
-            product_name = item.get('product_name', 'N/A')
-            quantity = item.get('quantity', 0)
-            unit_price = item.get('unit_price', 0)
-            total_price = item.get('total', 0)
-            
+        for item in invoice_data.order_items:
             data.append([
-                Paragraph((product_name or 'N/A').upper(), product_name_style),
-                format_quantity(quantity),
-                format_currency(unit_price),
-                format_currency(total_price)
+                Paragraph(item.product_name.upper(), product_name_style),
+                format_quantity(item.quantity),
+                format_currency(item.unit_price),
+                format_currency(item.total)
             ])
         
         table = Table(data, colWidths=[3.5*inch, 1*inch, 1.5*inch, 1.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 11),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4a5568')),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f7fafc')),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#f7fafc'), colors.white]),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-            ('ALIGN', (1, 1), (1, -1), 'CENTER'),
-            ('ALIGN', (2, 1), (3, -1), 'RIGHT'),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        table.setStyle(theme.tables['invoice_items'])
         
         elements.append(table)
         elements.append(Spacer(1, 30))
     
     # Total Amount
-    if invoice_data.get('subtotal'):
-        total_data = [['Total Amount:', format_currency(invoice_data['subtotal'])]]
+    if invoice_data.subtotal:
+        total_data = [['Total Amount:', format_currency(invoice_data.subtotal)]]
         total_table = Table(total_data, colWidths=[2*inch, 2*inch])
-        total_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4a5568')),
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#e2e8f0')),
-        ]))
+        total_table.setStyle(theme.tables['invoice_total'])
         
         elements.append(total_table)
         elements.append(Spacer(1, 30))
@@ -1189,14 +728,7 @@ def create_invoice_pdf_a4(invoice_data, user_data, output_path):
     elements.append(Paragraph("<b>Paybill:</b> Business No: 247247, Account No: 483484", normal_style))
     
     # Slightly indented OR
-    or_style = ParagraphStyle(
-        'IndentedOR',
-        parent=normal_style,
-        alignment=0,  # Left alignment
-        leftIndent=50,  # Indent 50 points to the right
-        spaceAfter=6,
-        spaceBefore=6
-    )
+    or_style = theme.a4['indented_or']
     elements.append(Paragraph("<b>OR</b>", or_style))
     
     # Send Money method
@@ -1215,6 +747,26 @@ def create_invoice_pdf_a4(invoice_data, user_data, output_path):
     elements.append(Spacer(1, 50))
     elements.append(Paragraph(footer_text, normal_style))
     
-    # Build PDF
+    return elements
+
+def create_merged_pdf_a4(documents, output_path, theme=None):
+    """
+    Render several A4 invoices and quotations as pages of one PDF
+    documents yields ('invoice', invoice_data, user_data) or ('quotation', quotation, user_data);
+    each document starts on a new page and the logo is embedded once
+    """
+    from reportlab.platypus import PageBreak
+    
+    theme = theme or pdf_theme
+    elements = []
+    for kind, data, user_data in documents:
+        if elements:
+            elements.append(PageBreak())
+        if kind == 'invoice':
+            elements.extend(invoice_a4_elements(data, user_data, theme))
+        else:
+            elements.extend(quotation_a4_elements(data, user_data, theme))
+    
+    doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=18)
     doc.build(elements)
-    return output_path
\ No newline at end of file
+    return output_path
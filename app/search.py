@@ -0,0 +1,199 @@
+import re
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, or_, case, func, select, text, literal, literal_column
+from app import db
+from app.models import ProductCatalog, BranchProduct
+
+
+FTS_TABLE = 'product_catalog_fts'
+
+# Numbers and numeric ranges such as "250", "99.50", "100-200" or "100..200"
+_NUMBER = r'\d+(?:\.\d+)?'
+_NUMERIC_SEARCH = re.compile(rf'^({_NUMBER})(?:\s*(?:-|\.\.)\s*({_NUMBER}))?$')
+
+# Search backend detected for the current database: 'trigram', 'fts5' or 'like'
+_search_backend = None
+
+
+def ensure_product_search_index():
+    """
+    Create the product search index for the current database
+
+    PostgreSQL gets pg_trgm GIN indexes on product_catalog.name and productcode.
+    SQLite gets an FTS5 table over product names, kept in sync by triggers.
+    Returns the search backend in use afterwards.
+    """
+    global _search_backend
+    dialect = db.engine.dialect.name
+
+    try:
+        if dialect == 'postgresql':
+            db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            db.session.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_product_catalog_name_trgm
+                ON product_catalog USING gin (name gin_trgm_ops)
+            """))
+            db.session.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_product_catalog_productcode_trgm
+                ON product_catalog USING gin (productcode gin_trgm_ops)
+            """))
+            db.session.commit()
+            _search_backend = 'trigram'
+        elif dialect == 'sqlite':
+            exists = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first()
+            db.session.execute(text(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+                USING fts5(name, content='product_catalog', content_rowid='id')
+            """))
+            db.session.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON product_catalog BEGIN
+                    INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+                END
+            """))
+            db.session.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON product_catalog BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+                END
+            """))
+            db.session.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON product_catalog BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+                    INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+                END
+            """))
+            if not exists:
+                # Index the rows that were already in the catalog
+                db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            db.session.commit()
+            _search_backend = 'fts5'
+        else:
+            _search_backend = 'like'
+    except Exception:
+        db.session.rollback()
+        _search_backend = None
+        raise
+
+    return _search_backend
+
+
+def get_search_backend():
+    """Return the search backend for the current database, detecting it on first use"""
+    global _search_backend
+    if _search_backend is None:
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            installed = db.session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+            _search_backend = 'trigram' if installed else 'like'
+        elif dialect == 'sqlite':
+            exists = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first()
+            _search_backend = 'fts5' if exists else 'like'
+        else:
+            _search_backend = 'like'
+    return _search_backend
+
+
+def parse_numeric_search(search):
+    """
+    Parse a numeric search into an inclusive-exclusive (low, high) range
+
+    A plain number covers every value that rounds down to it at the precision it
+    was typed with, so "250" matches 250.00 to 250.99 and "99.5" matches 99.50 to
+    99.59. "100-200" and "100..200" match 100 up to and including 200.
+    Returns None for searches that are not numeric.
+    """
+    match = _NUMERIC_SEARCH.match(search.strip())
+    if not match:
+        return None
+    try:
+        low = Decimal(match.group(1))
+        if match.group(2) is not None:
+            high = Decimal(match.group(2))
+            if high < low:
+                low, high = high, low
+            return low, high + Decimal('0.01')
+        step = Decimal(1).scaleb(low.as_tuple().exponent)
+        return low, low + step
+    except InvalidOperation:
+        return None
+
+
+def _escape_like(term):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _fts_query(search):
+    """Build an FTS5 query that prefix-matches every word of the search"""
+    words = re.findall(r'\w+', search)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _name_filter(search, backend):
+    """Match product names with the search backend of the current database"""
+    if backend == 'fts5':
+        fts_query = _fts_query(search)
+        if not fts_query:
+            return ProductCatalog.name.ilike(f'%{_escape_like(search)}%', escape='\\')
+        matching_ids = select(literal_column('rowid')).select_from(text(FTS_TABLE)).where(
+            literal_column(FTS_TABLE).match(fts_query)
+        )
+        return ProductCatalog.id.in_(matching_ids)
+    # pg_trgm GIN indexes serve ILIKE '%term%' directly
+    return ProductCatalog.name.ilike(f'%{_escape_like(search)}%', escape='\\')
+
+
+def product_search_filter(search):
+    """
+    Filter clause for a product search across name, code, prices and stock
+
+    Names are matched through the search index, codes by prefix, and numeric
+    searches additionally as value ranges on prices and stock.
+    """
+    search = (search or '').strip()
+    if not search:
+        return None
+
+    backend = get_search_backend()
+    clauses = [
+        _name_filter(search, backend),
+        ProductCatalog.productcode.ilike(f'{_escape_like(search)}%', escape='\\')
+    ]
+
+    value_range = parse_numeric_search(search)
+    if value_range:
+        low, high = value_range
+        for column in (BranchProduct.buyingprice, BranchProduct.sellingprice, BranchProduct.stock):
+            clauses.append(and_(column >= low, column < high))
+
+    return or_(*clauses)
+
+
+def product_search_rank(search):
+    """
+    Relevance expression for ordering product search results, best first
+
+    Exact code matches rank above code prefixes, which rank above names that
+    start with the search. On PostgreSQL trigram similarity breaks the ties.
+    """
+    search = (search or '').strip()
+    if not search:
+        return literal(0)
+
+    escaped = _escape_like(search)
+    rank = case(
+        (func.lower(ProductCatalog.productcode) == search.lower(), 3),
+        (ProductCatalog.productcode.ilike(f'{escaped}%', escape='\\'), 2),
+        (ProductCatalog.name.ilike(f'{escaped}%', escape='\\'), 1),
+        else_=0
+    )
+
+    if get_search_backend() == 'trigram':
+        rank = rank + func.similarity(ProductCatalog.name, search)
+
+    return rank
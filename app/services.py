@@ -1,9 +1,19 @@
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from sqlalchemy import func, case, or_, select, update, insert, delete, bindparam, literal, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.security import generate_password_hash
 from app import db
-from app.models import Order, Payment, Invoice, Receipt, StockTransaction, PasswordReset, User, OrderItem, OrderType, BranchProduct
+from app.models import Order, Payment, Invoice, Receipt, StockTransaction, PasswordReset, User, OrderItem, OrderType, BranchProduct, ProductCatalog, SubCategory, Category, Branch
 from app.utils import create_invoice_for_order, create_receipt_for_payment
-from app.pdf_utils import generate_invoice_pdf
+from app.pagination import keyset_paginate
+from app.search import product_search_filter
+from app.cache import invalidate_product_listings
+from app.numbering import allocate_number, permute_sequence
+from app.jobs import enqueue_job, job_handler
+from app.executor import email_executor
+from app.pdf_cache import pdf_cache
+from app.pdf_utils import generate_invoice_pdf, generate_receipt_pdf
 from email_service import get_email_service
 
 
@@ -12,35 +22,40 @@ class OrderService:
     
     @staticmethod
     def approve_order(order_id, current_user, item_branch_selections=None):
-        """Approve an order and update stock"""
+        """
+        Approve an order and update stock
+        
+        The invoice is created with the approval and its PDF and email are left
+        to a background job. Returns (success, message, job_id).
+        """
         order = Order.query.get_or_404(order_id)
         if not order.approvalstatus:
-            order.approvalstatus = True
-            order.approved_at = datetime.utcnow()
+            is_online = 'online' in order.ordertype.name.lower()
             
             # For online orders, require branch selections for each item
-            if 'online' in order.ordertype.name.lower():
+            if is_online:
                 if not item_branch_selections:
-                    return False, 'Branch selections are required for online orders'
+                    return False, 'Branch selections are required for online orders', None
                 
                 # Validate that all items have branch selections
                 for item in order.order_items:
                     if not item.branch_productid or not item.branch_product:
-                        return False, f"Branch selection required for manual item: {item.product_name or 'Unknown'}"
+                        return False, f"Branch selection required for manual item: {item.product_name or 'Unknown'}", None
                     if str(item.id) not in item_branch_selections:
-                        return False, f"Branch selection required for {item.branch_product.catalog_product.name if item.branch_product else 'Unknown Product'}"
+                        return False, f"Branch selection required for {item.branch_product.catalog_product.name if item.branch_product else 'Unknown Product'}", None
             
-            # Update stock for each item
+            # Resolve the branch product each item is fulfilled from
+            fulfilments = []
             for item in order.order_items:
                 # Skip stock updates for manual items (they don't have products to update stock for)
                 if not item.branch_productid or not item.branch_product:
                     continue
                     
-                if 'online' in order.ordertype.name.lower() and item_branch_selections:
+                if is_online and item_branch_selections:
                     # For online orders, reduce stock from the selected branch for this item
                     selected_branch_id = item_branch_selections.get(str(item.id))
                     if not selected_branch_id:
-                        return False, f'Branch selection required for {item.branch_product.catalog_product.name}'
+                        return False, f'Branch selection required for {item.branch_product.catalog_product.name}', None
                     
                     # Find the product in the selected branch
                     product_in_branch = BranchProduct.query.filter_by(
@@ -49,102 +64,239 @@ class OrderService:
                     ).first()
                     
                     if not product_in_branch:
-                        return False, f"Product {item.branch_product.catalog_product.name if item.branch_product else 'Unknown'} not available in selected branch"
-                    
-                    # Check stock availability (allow zero stock sales with warning)
-                    if product_in_branch.stock < item.quantity:
-                        # Allow the order but log a warning about insufficient stock
-                        print(f"Warning: Ordering {item.quantity} units of {item.branch_product.catalog_product.name if item.branch_product else 'Unknown'} from branch {product_in_branch.branch.name} but only {product_in_branch.stock} available in stock")
-                        # You could also add this to a warnings log or notification system
+                        return False, f"Product {item.branch_product.catalog_product.name if item.branch_product else 'Unknown'} not available in selected branch", None
                     
-                    # Update stock from the selected branch
-                    previous_stock = product_in_branch.stock
-                    product_in_branch.stock -= item.quantity
-                    new_stock = product_in_branch.stock
-                    
-                    # Log if stock goes negative (backorder situation)
-                    if new_stock < 0:
-                        print(f"Warning: Product {item.branch_product.catalog_product.name if item.branch_product else 'Unknown'} stock in branch {product_in_branch.branch.name} is now negative ({new_stock}) after order approval")
-                    
-                    # Create stock transaction record for the selected branch product
-                    stock_transaction = StockTransaction(
-                        productid=product_in_branch.id,
-                        userid=current_user.id,
-                        transaction_type='remove',
-                        quantity=item.quantity,
-                        previous_stock=previous_stock,
-                        new_stock=new_stock,
-                        notes=f"Order #{order.id} approved - {item.branch_product.catalog_product.name if item.branch_product else 'Unknown'} fulfilled from branch {product_in_branch.branch.name}" + (' (backorder)' if new_stock < 0 else '')
-                    )
-                    db.session.add(stock_transaction)
+                    notes = f"Order #{order.id} approved - {item.branch_product.catalog_product.name} fulfilled from branch {product_in_branch.branch.name}"
+                    fulfilments.append((product_in_branch, item.quantity, notes))
                 else:
                     # For non-online orders, reduce stock from the original product
-                    branch_product = item.branch_product
-                    previous_stock = branch_product.stock
-                    branch_product.stock -= item.quantity
-                    new_stock = branch_product.stock
-                    
-                    # Log if stock goes negative (backorder situation)
-                    if new_stock < 0:
-                        print(f"Warning: Product {branch_product.catalog_product.name} stock is now negative ({new_stock}) after order approval")
-                        # You could add this to a backorder tracking system
-                    
-                    # Create stock transaction record
-                    stock_transaction = StockTransaction(
-                        productid=branch_product.id,
-                        userid=current_user.id,
-                        transaction_type='remove',
-                        quantity=item.quantity,
-                        previous_stock=previous_stock,
-                        new_stock=new_stock,
-                        notes=f'Order #{order.id} approved' + (' (backorder)' if new_stock < 0 else '')
-                    )
-                    db.session.add(stock_transaction)
+                    fulfilments.append((item.branch_product, item.quantity, f'Order #{order.id} approved'))
+            
+            # Claim the order first so a concurrent approval cannot deduct its stock again
+            claimed = db.session.execute(
+                update(Order)
+                .where(Order.id == order.id, Order.approvalstatus == False)
+                .values(approvalstatus=True, approved_at=datetime.utcnow())
+            ).rowcount
+            if not claimed:
+                db.session.rollback()
+                return False, 'Order is already approved.', None
+            
+            # Update stock for each item; rows are locked in id order so that two
+            # multi-item approvals cannot deadlock on each other's products
+            stocked_branch_ids = set()
+            for branch_product, quantity, notes in sorted(fulfilments, key=lambda fulfilment: fulfilment[0].id):
+                previous_stock, new_stock, branch_id = StockService.adjust_stock(branch_product.id, -quantity)
+                stocked_branch_ids.add(branch_id)
+                
+                # Log if stock goes negative (backorder situation)
+                if new_stock < 0:
+                    print(f"Warning: Product {branch_product.catalog_product.name} stock in branch {branch_product.branch.name} is now negative ({new_stock}) after order approval")
+                
+                # Create stock transaction record
+                stock_transaction = StockTransaction(
+                    productid=branch_product.id,
+                    userid=current_user.id,
+                    transaction_type='remove',
+                    quantity=quantity,
+                    previous_stock=previous_stock,
+                    new_stock=new_stock,
+                    notes=notes + (' (backorder)' if new_stock < 0 else '')
+                )
+                db.session.add(stock_transaction)
             
             db.session.commit()
+            invalidate_product_listings(stocked_branch_ids)
             
-            # Generate and send PDF invoice
+            # Create the invoice now; rendering and emailing it is queued for the worker
+            job = None
             try:
-                # Check if invoice exists, if not create one
                 invoice = Invoice.query.filter_by(orderid=order.id).first()
                 if not invoice:
-                    # Calculate total amount for the order
-                    total_amount = 0
-                    for item in order.order_items:
-                        if item.final_price is not None:
-                            item_price = float(item.final_price)
-                        elif item.original_price is not None:
-                            item_price = float(item.original_price)
-                        elif item.productid and item.product and item.product.sellingprice is not None:
-                            item_price = float(item.product.sellingprice)
-                        else:
-                            item_price = 0.0
-                        total_amount += item.quantity * item_price
-                    
-                    # Create invoice for the order
-                    invoice = create_invoice_for_order(order, total_amount)
-                    print(f"Created invoice {invoice.invoice_number} for order {order.id}")
+                    # Create invoice for the order from its materialized total
+                    invoice = create_invoice_for_order(order, float(order.total_amount or 0), commit=False)
+                    db.session.flush()
+                job = enqueue_job('invoice_email', {'invoice_id': invoice.id}, commit=False)
+                db.session.commit()
+                print(f"Queued invoice {invoice.invoice_number} for order {order.id} as job {job.id}")
+            except Exception as e:
+                db.session.rollback()
+                job = None
+                print(f"Warning: Could not create invoice for order {order.id}: {str(e)}")
+            
+            return True, 'Order approved successfully! The invoice will be emailed to you shortly.', job.id if job else None
+        return False, 'Order is already approved.', None
+    
+    @staticmethod
+    def send_invoice_email(order, invoice):
+        """Render an order's invoice PDF and email it to the order's user; raises if it was not sent"""
+        pdf_data = generate_invoice_pdf(invoice.id)
+        email_service = get_email_service()
+        if not email_service:
+            raise RuntimeError(f'Email service not available for sending invoice PDF to {order.user.email}')
+        email_result = email_service.send_invoice_email(
+            to_email=order.user.email,
+            user_name=f"{order.user.firstname} {order.user.lastname}",
+            order_id=order.id,
+            invoice_number=invoice.invoice_number,
+            pdf_attachment=pdf_data
+        )
+        if not email_result['success']:
+            raise RuntimeError(f"Could not send invoice PDF to {order.user.email}: {email_result.get('error', 'Unknown error')}")
+    
+    @staticmethod
+    def bulk_approve_orders(order_ids, current_user, branch_selections=None):
+        """
+        Approve many orders with set-based stock deduction
+        
+        branch_selections maps order ids to the {item_id: branch_id} selections
+        online orders need. Orders and the branch products they draw from are
+        loaded with one query each, stock is deducted with one UPDATE for all
+        products, and the ledger is written with one multi-row insert. Invoices
+        are created afterwards in one more transaction, together with the jobs
+        that email them. Returns {order_id: (success, message, job_id)}.
+        """
+        branch_selections = {str(order_id): selections for order_id, selections in (branch_selections or {}).items()}
+        order_ids = sorted({int(order_id) for order_id in order_ids})
+        results = {order_id: (False, 'Order not found', None) for order_id in order_ids}
+        
+        orders = Order.query.filter(Order.id.in_(order_ids)).options(
+            joinedload(Order.ordertype),
+            joinedload(Order.user),
+            selectinload(Order.order_items)
+                .joinedload(OrderItem.branch_product)
+                .joinedload(BranchProduct.catalog_product)
+        ).order_by(Order.id).all()
+        
+        # Preload the branch products selected for online order items in one query
+        selected_pairs = set()
+        for order in orders:
+            selections = branch_selections.get(str(order.id)) or {}
+            if 'online' in order.ordertype.name.lower():
+                for item in order.order_items:
+                    if item.branch_product and selections.get(str(item.id)):
+                        selected_pairs.add((item.branch_product.catalog_id, int(selections[str(item.id)])))
+        products_by_branch = {}
+        if selected_pairs:
+            for branch_product in BranchProduct.query.options(joinedload(BranchProduct.branch)).filter(
+                tuple_(BranchProduct.catalog_id, BranchProduct.branchid).in_(selected_pairs)
+            ):
+                products_by_branch[(branch_product.catalog_id, branch_product.branchid)] = branch_product
+        
+        # Work out which branch product each item draws from
+        fulfilments = {}
+        for order in orders:
+            if order.approvalstatus:
+                results[order.id] = (False, 'Order is already approved.', None)
+                continue
+            
+            is_online = 'online' in order.ordertype.name.lower()
+            selections = branch_selections.get(str(order.id)) or {}
+            order_fulfilments = []
+            error = None
+            for item in order.order_items:
+                if not item.branch_productid or not item.branch_product:
+                    if is_online:
+                        error = f"Branch selection required for manual item: {item.product_name or 'Unknown'}"
+                        break
+                    continue
                 
-                # Generate PDF and send email
-                pdf_data = generate_invoice_pdf(invoice.id)
-                email_service = get_email_service()
-                if email_service:
-                    email_result = email_service.send_invoice_email(
-                        to_email=order.user.email,
-                        user_name=f"{order.user.firstname} {order.user.lastname}",
-                        order_id=order.id,
-                        invoice_number=invoice.invoice_number,
-                        pdf_attachment=pdf_data.getvalue()
-                    )
-                    if not email_result['success']:
-                        print(f"Warning: Could not send invoice PDF to {order.user.email}: {email_result.get('error', 'Unknown error')}")
+                if is_online:
+                    selected_branch_id = selections.get(str(item.id))
+                    if not selected_branch_id:
+                        error = f'Branch selection required for {item.branch_product.catalog_product.name}'
+                        break
+                    product_in_branch = products_by_branch.get((item.branch_product.catalog_id, int(selected_branch_id)))
+                    if not product_in_branch:
+                        error = f'Product {item.branch_product.catalog_product.name} not available in selected branch'
+                        break
+                    notes = f"Order #{order.id} approved - {item.branch_product.catalog_product.name} fulfilled from branch {product_in_branch.branch.name}"
+                    order_fulfilments.append((product_in_branch.id, item.quantity, notes))
                 else:
-                    print(f"Warning: Email service not available for sending invoice PDF to {order.user.email}")
-            except Exception as e:
-                print(f"Warning: Could not generate or send invoice PDF for order {order.id}: {str(e)}")
-
-            return True, 'Order approved successfully! Invoice has been generated and sent to your email.'
-        return False, 'Order is already approved.'
+                    order_fulfilments.append((item.branch_product.id, item.quantity, f'Order #{order.id} approved'))
+            
+            if error:
+                results[order.id] = (False, error, None)
+            else:
+                fulfilments[order.id] = order_fulfilments
+        
+        if not fulfilments:
+            return results
+        
+        try:
+            # Claim the orders; any approved concurrently are left out
+            approved_at = datetime.utcnow()
+            claimed_ids = set(db.session.scalars(
+                update(Order)
+                .where(Order.id.in_(fulfilments.keys()), Order.approvalstatus == False)
+                .values(approvalstatus=True, approved_at=approved_at)
+                .returning(Order.id),
+                execution_options={'synchronize_session': 'fetch'}
+            ))
+            for order_id in list(fulfilments):
+                if order_id not in claimed_ids:
+                    results[order_id] = (False, 'Order is already approved.', None)
+                    del fulfilments[order_id]
+            
+            # Deduct the summed quantities of every product in one statement
+            deltas = {}
+            for order_fulfilments in fulfilments.values():
+                for product_id, quantity, _ in order_fulfilments:
+                    deltas[product_id] = deltas.get(product_id, Decimal('0')) - Decimal(str(quantity))
+            adjusted = StockService.apply_stock_deltas(deltas)
+            
+            # Replay the deductions in order id order to build the ledger
+            running_stock = {product_id: previous for product_id, (previous, _, _) in adjusted.items()}
+            transactions = []
+            for order_id in sorted(fulfilments):
+                for product_id, quantity, notes in fulfilments[order_id]:
+                    previous_stock = running_stock[product_id]
+                    new_stock = previous_stock - Decimal(str(quantity))
+                    running_stock[product_id] = new_stock
+                    transactions.append({
+                        'productid': product_id,
+                        'userid': current_user.id,
+                        'transaction_type': 'remove',
+                        'quantity': quantity,
+                        'previous_stock': previous_stock,
+                        'new_stock': new_stock,
+                        'notes': notes + (' (backorder)' if new_stock < 0 else '')
+                    })
+            if transactions:
+                db.session.execute(insert(StockTransaction), transactions)
+            
+            db.session.commit()
+            invalidate_product_listings({branch_id for _, _, branch_id in adjusted.values()})
+            
+        except Exception as e:
+            db.session.rollback()
+            raise e
+        
+        for order_id in fulfilments:
+            results[order_id] = (True, 'Order approved successfully!', None)
+        
+        # Invoices are created after the stock is committed, in one transaction
+        # with the jobs that render and email them
+        try:
+            invoices = {invoice.orderid: invoice for invoice in Invoice.query.filter(
+                Invoice.orderid.in_(fulfilments.keys())
+            )}
+            orders = Order.query.filter(
+                Order.id.in_(fulfilments.keys()), Order.id.notin_(invoices.keys())
+            ).order_by(Order.id).all()
+            for order in orders:
+                invoices[order.id] = create_invoice_for_order(order, float(order.total_amount or 0), commit=False)
+            db.session.flush()
+            jobs = {order_id: enqueue_job('invoice_email', {'invoice_id': invoice.id}, commit=False)
+                    for order_id, invoice in sorted(invoices.items())}
+            db.session.commit()
+            for order_id, job in jobs.items():
+                results[order_id] = (True, 'Order approved successfully!', job.id)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: Could not create invoices for bulk approval: {str(e)}")
+        
+        return results
     
     @staticmethod
     def reject_order(order_id):
@@ -271,6 +423,9 @@ class OrderService:
                     db.session.add(order_item)
                     total_amount += final_price * quantity
             
+            order.total_amount = round(total_amount, 2)
+            order.item_count = len(items_data)
+            
             db.session.commit()
             
             # Create invoice for the order
@@ -392,9 +547,12 @@ class OrderService:
                 db.session.add(order_item)
             
             # Update order
+            order.total_amount = round(total_amount, 2)
+            order.item_count = len(items_data)
             order.updated_at = datetime.utcnow()
             
             db.session.commit()
+            pdf_cache.invalidate('invoice', order.id)
             return True, f'Order #{order.id} updated successfully'
             
         except Exception as e:
@@ -411,49 +569,32 @@ class OrderService:
             if order_item.order.approvalstatus:
                 return False, 'Cannot negotiate prices for approved orders'
             
-            # Check if there are any actual changes
-            if order_item.final_price is not None:
-                current_price = float(order_item.final_price)
-            elif order_item.productid and order_item.product and order_item.product.sellingprice is not None:
-                # Regular product with selling price
-                current_price = float(order_item.product.sellingprice)
-            elif order_item.original_price is not None:
-                # Manual item or fallback to original price
-                current_price = float(order_item.original_price)
-            else:
-                return False, 'Item has no valid price'
+            # Compare against the price the order total was computed with
+            current_price = order_item.unit_price
+            new_price = Decimal(str(new_price))
             current_notes = order_item.negotiation_notes or ''
             
             # Check if price or notes have actually changed
-            price_changed = abs(float(new_price) - current_price) > 0.01  # Allow for small floating point differences
+            price_changed = abs(new_price - current_price) > Decimal('0.01')
             notes_changed = notes.strip() != current_notes.strip()
             
             if not price_changed and not notes_changed:
                 return True, 'No changes made to this item'
             
             # Update the negotiated price
-            order_item.negotiated_price = float(new_price)
-            order_item.final_price = float(new_price)
+            order_item.negotiated_price = new_price
+            order_item.final_price = new_price
             order_item.negotiation_notes = notes
             order_item.updated_at = datetime.utcnow()
             
-            # Recalculate order total
+            # Apply the price change to the materialized order total
             order = order_item.order
-            total_amount = 0
-            for item in order.order_items:
-                if item.final_price is not None:
-                    item_price = float(item.final_price)
-                elif item.productid and item.product and item.product.sellingprice is not None:
-                    # Regular product with selling price
-                    item_price = float(item.product.sellingprice)
-                elif item.original_price is not None:
-                    # Manual item or fallback to original price
-                    item_price = float(item.original_price)
-                else:
-                    item_price = 0.0
-                total_amount += item.quantity * item_price
+            price_delta = new_price - current_price
+            order.total_amount = Decimal(str(order.total_amount or 0)) + price_delta * Decimal(str(order_item.quantity))
+            total_amount = float(order.total_amount)
             
             db.session.commit()
+            pdf_cache.invalidate('invoice', order.id)
             
             return True, f'Price negotiated successfully. New total: KSh{total_amount:.2f}'
             
@@ -462,12 +603,234 @@ class OrderService:
             raise e
 
 
+    @staticmethod
+    def _computed_totals_query():
+        """Per-order item totals and counts computed from the order items"""
+        return db.session.query(
+            OrderItem.orderid.label('orderid'),
+            func.coalesce(func.sum(
+                OrderItem.quantity * func.coalesce(OrderItem.final_price, OrderItem.original_price, BranchProduct.sellingprice, 0)
+            ), 0).label('total_amount'),
+            func.count(OrderItem.id).label('item_count')
+        ).outerjoin(
+            BranchProduct, OrderItem.branch_productid == BranchProduct.id
+        ).group_by(OrderItem.orderid)
+    
+    @staticmethod
+    def backfill_order_totals():
+        """Recompute total_amount and item_count for every order in one statement"""
+        try:
+            total_subquery = select(
+                func.coalesce(func.sum(
+                    OrderItem.quantity * func.coalesce(OrderItem.final_price, OrderItem.original_price, BranchProduct.sellingprice, 0)
+                ), 0)
+            ).select_from(OrderItem).outerjoin(
+                BranchProduct, OrderItem.branch_productid == BranchProduct.id
+            ).where(OrderItem.orderid == Order.id).scalar_subquery()
+            
+            count_subquery = select(func.count(OrderItem.id)).where(
+                OrderItem.orderid == Order.id
+            ).scalar_subquery()
+            
+            result = db.session.execute(
+                update(Order).values(total_amount=total_subquery, item_count=count_subquery)
+            )
+            db.session.commit()
+            return result.rowcount
+            
+        except Exception as e:
+            db.session.rollback()
+            raise e
+    
+    @staticmethod
+    def find_inconsistent_order_totals(tolerance=0.01):
+        """List orders whose materialized totals differ from their items"""
+        computed = OrderService._computed_totals_query().subquery()
+        computed_total = func.coalesce(computed.c.total_amount, 0)
+        computed_count = func.coalesce(computed.c.item_count, 0)
+        
+        rows = db.session.query(
+            Order.id,
+            Order.total_amount,
+            Order.item_count,
+            computed_total.label('computed_total'),
+            computed_count.label('computed_count')
+        ).outerjoin(
+            computed, computed.c.orderid == Order.id
+        ).filter(
+            or_(
+                func.abs(func.coalesce(Order.total_amount, 0) - computed_total) > tolerance,
+                func.coalesce(Order.item_count, 0) != computed_count
+            )
+        ).order_by(Order.id).all()
+        
+        return [{
+            'order_id': row.id,
+            'total_amount': float(row.total_amount or 0),
+            'item_count': row.item_count or 0,
+            'computed_total': float(row.computed_total or 0),
+            'computed_count': int(row.computed_count or 0)
+        } for row in rows]
+
+
+class OrderListingService:
+    """Service class for the paginated order listing"""
+    
+    @staticmethod
+    def walk_in_orders_query(user_id, status=''):
+        """Query for a user's walk-in orders with every relationship the listing needs eagerly loaded"""
+        query = Order.query.join(OrderType).filter(
+            OrderType.name.ilike('%walk%'),
+            Order.userid == user_id
+        )
+        
+        if status == 'pending':
+            query = query.filter(Order.approvalstatus == False)
+        elif status == 'approved':
+            query = query.filter(Order.approvalstatus == True)
+        
+        return query.options(
+            joinedload(Order.user),
+            joinedload(Order.ordertype),
+            joinedload(Order.branch),
+            selectinload(Order.order_items)
+                .joinedload(OrderItem.branch_product)
+                .joinedload(BranchProduct.catalog_product)
+        )
+    
+    @staticmethod
+    def get_walk_in_orders_page(user_id, status='', page=1, per_page=20):
+        """Get one page of walk-in orders as plain rows plus the total order count"""
+        query = OrderListingService.walk_in_orders_query(user_id, status)
+        total = query.order_by(None).count()
+        orders = query.order_by(Order.created_at.desc(), Order.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        return [OrderListingService.order_row(order, user_id) for order in orders], total
+    
+    @staticmethod
+    def get_walk_in_orders_keyset_page(user_id, status='', cursor=None, per_page=20,
+                                       with_total=False, approximate_total=False):
+        """Get one cursor-paginated page of walk-in orders, newest first"""
+        pagination = keyset_paginate(
+            OrderListingService.walk_in_orders_query(user_id, status),
+            (Order.created_at, Order.id),
+            key=lambda order: (order.created_at, order.id),
+            cursor=cursor,
+            per_page=per_page,
+            descending=True,
+            with_total=with_total,
+            approximate_total=approximate_total
+        )
+        pagination.items = [OrderListingService.order_row(order, user_id) for order in pagination.items]
+        return pagination
+    
+    @staticmethod
+    def order_row(order, user_id=None):
+        """Convert an order with loaded relationships into a plain listing row"""
+        items = []
+        for item in order.order_items:
+            # Get product name - use product_name field if available, otherwise fall back to catalog name
+            if item.product_name:
+                product_name = item.product_name
+            elif item.branch_productid and item.branch_product:
+                product_name = item.branch_product.catalog_product.name
+            else:
+                product_name = "Manual Item"
+            
+            # Get product price - use original_price if available, otherwise fall back to selling price
+            if item.original_price is not None:
+                product_price = item.original_price
+            elif item.branch_productid and item.branch_product and item.branch_product.sellingprice is not None:
+                product_price = item.branch_product.sellingprice
+            else:
+                product_price = 0.0
+            
+            items.append({
+                'id': item.id,
+                'product_name': product_name,
+                'quantity': item.quantity,
+                'price': product_price
+            })
+        
+        return {
+            'id': order.id,
+            'customer_name': f"{order.user.firstname} {order.user.lastname}",
+            'order_type': order.ordertype.name,
+            'branch': order.branch.name,
+            'status': 'Approved' if order.approvalstatus else 'Pending',
+            'created_at': order.created_at.strftime('%Y-%m-%d %H:%M'),
+            'approved_at': order.approved_at.strftime('%Y-%m-%d %H:%M') if order.approved_at else None,
+            'items': items,
+            'item_count': order.item_count,
+            'total_amount': float(order.total_amount or 0),
+            'created_by_me': order.userid == user_id
+        }
+
+
+class DashboardService:
+    """Service class for dashboard summary statistics"""
+    
+    @staticmethod
+    def _walk_in_orders_filter(user_id):
+        """Filter clauses selecting the walk-in orders created by a user"""
+        return (
+            Order.ordertypeid == OrderType.id,
+            OrderType.name.ilike('%walk%'),
+            Order.userid == user_id
+        )
+    
+    @staticmethod
+    def get_walk_in_stats(user_id):
+        """Get order counts and approved revenue for a user's walk-in orders"""
+        row = db.session.query(
+            func.count(Order.id),
+            func.coalesce(func.sum(case((Order.approvalstatus == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Order.approvalstatus == True, Order.total_amount), else_=0)), 0)
+        ).filter(*DashboardService._walk_in_orders_filter(user_id)).one()
+        
+        total_orders, completed_orders = int(row[0]), int(row[1])
+        return {
+            'total_orders': total_orders,
+            'pending_orders': total_orders - completed_orders,
+            'total_revenue': float(row[2] or 0),
+            'completed_orders': completed_orders
+        }
+    
+    @staticmethod
+    def get_recent_orders(user_id, limit=5):
+        """Get the most recent walk-in orders of a user with their totals"""
+        rows = db.session.query(
+            Order.id,
+            Order.approvalstatus,
+            Order.created_at,
+            Order.total_amount,
+            User.firstname,
+            User.lastname
+        ).join(
+            User, Order.userid == User.id
+        ).filter(
+            *DashboardService._walk_in_orders_filter(user_id)
+        ).order_by(Order.created_at.desc(), Order.id.desc()).limit(limit).all()
+        
+        return [{
+            'id': row.id,
+            'customer_name': f"{row.firstname} {row.lastname}",
+            'status': 'Approved' if row.approvalstatus else 'Pending',
+            'created_at': row.created_at.strftime('%Y-%m-%d %H:%M'),
+            'total_amount': float(row.total_amount or 0)
+        } for row in rows]
+
+
 class PaymentService:
     """Service class for payment-related operations"""
     
     @staticmethod
     def process_payment(order_id, data, current_user):
-        """Process a payment for an order"""
+        """
+        Process a payment for an order
+        
+        The receipt is created with the payment and its PDF and email are left to
+        a background job. Returns (success, payment_id, reference_number, job_id).
+        """
         try:
             order = Order.query.get_or_404(order_id)
             
@@ -499,18 +862,8 @@ class PaymentService:
             
             # Calculate balance and create receipt (keep this synchronous for immediate feedback)
             try:
-                # Calculate total order amount
-                total_amount = 0
-                for item in order.order_items:
-                    if item.final_price is not None:
-                        item_price = float(item.final_price)
-                    elif item.original_price is not None:
-                        item_price = float(item.original_price)
-                    elif item.productid and item.product and item.product.sellingprice is not None:
-                        item_price = float(item.product.sellingprice)
-                    else:
-                        item_price = 0.0
-                    total_amount += item.quantity * item_price
+                # Total order amount is materialized on the order
+                total_amount = order.total_amount or 0
                 
                 # Calculate previous balance (total amount minus previous payments)
                 previous_payments = Payment.query.filter_by(
@@ -521,66 +874,81 @@ class PaymentService:
                 previous_balance = float(total_amount) - float(previous_payments)
                 remaining_balance = previous_balance - float(amount)
                 
-                # Create receipt
-                receipt = create_receipt_for_payment(payment, previous_balance, remaining_balance)
-                
-                # Send email asynchronously (don't wait for it)
-                import threading
-                def send_receipt_email_async():
-                    try:
-                        from app.pdf_utils import generate_receipt_pdf
-                        from email_service import get_email_service
-                        
-                        pdf_buffer = generate_receipt_pdf(receipt.id)
-                        email_service = get_email_service()
-                        
-                        if email_service:
-                            email_result = email_service.send_receipt_email(
-                                to_email=order.user.email,
-                                user_name=f"{order.user.firstname} {order.user.lastname}",
-                                order_id=order.id,
-                                receipt_number=receipt.receipt_number,
-                                payment_amount=float(receipt.payment_amount),
-                                pdf_attachment=pdf_buffer.getvalue()
-                            )
-                            if not email_result['success']:
-                                print(f"Warning: Could not send receipt PDF to {order.user.email}: {email_result.get('error', 'Unknown error')}")
-                        else:
-                            print(f"Warning: Email service not available for sending receipt PDF to {order.user.email}")
-                            
-                    except Exception as e:
-                        print(f"Warning: Could not send receipt email for payment {payment.id}: {str(e)}")
-                
-                # Start email sending in background thread
-                email_thread = threading.Thread(target=send_receipt_email_async)
-                email_thread.daemon = True
-                email_thread.start()
+                # Create the receipt; rendering and emailing it is queued for the worker
+                receipt = create_receipt_for_payment(payment, previous_balance, remaining_balance, commit=False)
+                db.session.flush()
+                job = enqueue_job('receipt_email', {'receipt_id': receipt.id}, commit=False)
+                db.session.commit()
                 
             except Exception as e:
+                db.session.rollback()
+                job = None
                 print(f"Warning: Could not create receipt for payment {payment.id}: {str(e)}")
             
-            return True, payment.id, reference_number
+            return True, payment.id, reference_number, job.id if job else None
             
         except Exception as e:
             db.session.rollback()
             raise e
-
+    
+    @staticmethod
+    def send_receipt_email(receipt):
+        """Render a receipt PDF and email it to the order's user; raises if it was not sent"""
+        order = receipt.order
+        pdf_data = generate_receipt_pdf(receipt.id)
+        email_service = get_email_service()
+        if not email_service:
+            raise RuntimeError(f'Email service not available for sending receipt PDF to {order.user.email}')
+        email_result = email_service.send_receipt_email(
+            to_email=order.user.email,
+            user_name=f"{order.user.firstname} {order.user.lastname}",
+            order_id=order.id,
+            receipt_number=receipt.receipt_number,
+            payment_amount=float(receipt.payment_amount),
+            pdf_attachment=pdf_data
+        )
+        if not email_result['success']:
+            raise RuntimeError(f"Could not send receipt PDF to {order.user.email}: {email_result.get('error', 'Unknown error')}")
 
 class StockService:
     """Service class for stock-related operations"""
     
+    @staticmethod
+    def adjust_stock(product_id, delta, minimum=None):
+        """
+        Atomically change the stock of a branch product by delta
+        
+        Runs as a single UPDATE ... SET stock = stock + :delta RETURNING stock, which
+        row-locks the product until the transaction ends, so concurrent changes
+        queue up instead of overwriting each other. With minimum set, the update
+        only applies if the resulting stock stays at or above it.
+        Returns (previous_stock, new_stock, branch_id), or None if no row was updated.
+        """
+        delta_param = bindparam('delta', delta, type_=db.Numeric(10, 3))
+        new_stock = func.coalesce(BranchProduct.stock, 0) + delta_param
+        
+        statement = update(BranchProduct).where(BranchProduct.id == product_id)
+        if minimum is not None:
+            statement = statement.where(new_stock >= minimum)
+        
+        row = db.session.execute(
+            statement.values(stock=new_stock).returning(BranchProduct.stock, BranchProduct.branchid)
+        ).first()
+        if row is None:
+            return None
+        return row.stock - delta, row.stock, row.branchid
+    
     @staticmethod
     def add_stock(product_id, quantity, current_user, notes=None):
         """Add stock to a product"""
         try:
-            branch_product = BranchProduct.query.get_or_404(product_id)
-            
-            previous_stock = branch_product.stock
-            branch_product.stock += quantity
-            new_stock = branch_product.stock
+            adjusted = StockService.adjust_stock(product_id, quantity)
+            if adjusted is None:
+                BranchProduct.query.get_or_404(product_id)
+            previous_stock, new_stock, branch_id = adjusted
             
             stock_transaction = StockTransaction(
-                productid=branch_product.id,
+                productid=product_id,
                 userid=current_user.id,
                 transaction_type='add',
                 quantity=quantity,
@@ -591,6 +959,7 @@ class StockService:
             
             db.session.add(stock_transaction)
             db.session.commit()
+            invalidate_product_listings([branch_id])
             
             return True, new_stock
             
@@ -602,17 +971,15 @@ class StockService:
     def remove_stock(product_id, quantity, current_user, notes=None):
         """Remove stock from a product"""
         try:
-            branch_product = BranchProduct.query.get_or_404(product_id)
-            
-            if branch_product.stock is None or branch_product.stock < quantity:
+            # The stock check is part of the update, so two removals cannot both pass it
+            adjusted = StockService.adjust_stock(product_id, -quantity, minimum=0)
+            if adjusted is None:
+                BranchProduct.query.get_or_404(product_id)
                 raise ValueError('Insufficient stock')
-            
-            previous_stock = branch_product.stock
-            branch_product.stock -= quantity
-            new_stock = branch_product.stock
+            previous_stock, new_stock, branch_id = adjusted
             
             stock_transaction = StockTransaction(
-                productid=branch_product.id,
+                productid=product_id,
                 userid=current_user.id,
                 transaction_type='remove',
                 quantity=quantity,
@@ -623,6 +990,7 @@ class StockService:
             
             db.session.add(stock_transaction)
             db.session.commit()
+            invalidate_product_listings([branch_id])
             
             return True, new_stock
             
@@ -631,6 +999,194 @@ class StockService:
             raise e
 
 
+    @staticmethod
+    def parse_quantity(value):
+        """Parse a stock quantity, keeping fractions; raises ValueError unless it is a positive number"""
+        try:
+            quantity = Decimal(str(value).strip())
+        except (InvalidOperation, TypeError):
+            raise ValueError(f'Invalid quantity: {value}')
+        if not quantity.is_finite() or quantity <= 0:
+            raise ValueError('Quantity must be greater than zero')
+        return quantity
+    
+    @staticmethod
+    def apply_stock_deltas(deltas, minimum=None):
+        """
+        Change the stock of many branch products in one statement
+        
+        deltas maps branch product ids to the amount to add (negative to remove).
+        The rows are first locked in id order, so concurrent multi-product changes
+        cannot deadlock, then updated by a single UPDATE ... SET stock = stock +
+        CASE id ... END RETURNING. Products whose stock would fall below minimum
+        are left unchanged and missing from the result.
+        Returns {product_id: (previous_stock, new_stock, branch_id)}.
+        """
+        if not deltas:
+            return {}
+        product_ids = sorted(deltas)
+        
+        db.session.execute(
+            select(BranchProduct.id)
+            .where(BranchProduct.id.in_(product_ids))
+            .order_by(BranchProduct.id)
+            .with_for_update()
+        ).all()
+        
+        delta_case = case(
+            {product_id: literal(deltas[product_id], db.Numeric(10, 3)) for product_id in product_ids},
+            value=BranchProduct.id
+        )
+        new_stock = func.coalesce(BranchProduct.stock, 0) + delta_case
+        
+        statement = update(BranchProduct).where(BranchProduct.id.in_(product_ids))
+        if minimum is not None:
+            statement = statement.where(new_stock >= minimum)
+        
+        rows = db.session.execute(
+            statement.values(stock=new_stock).returning(BranchProduct.id, BranchProduct.stock, BranchProduct.branchid),
+            execution_options={'synchronize_session': 'fetch'}
+        ).all()
+        return {row.id: (row.stock - deltas[row.id], row.stock, row.branchid) for row in rows}
+    
+    @staticmethod
+    def bulk_adjust(lines, current_user, notes=None):
+        """
+        Validate and apply many stock additions and removals in one transaction
+        
+        Each line has a product_id, a quantity and an action of 'add' (default) or
+        'remove', plus optional notes. Either every line is applied or none is.
+        Returns (success, results) with one result per line, in input order.
+        """
+        results = []
+        parsed_lines = []
+        if not lines:
+            return False, results
+        
+        for line_number, line in enumerate(lines, start=1):
+            result = {'line': line_number, 'product_id': None, 'success': False}
+            results.append(result)
+            try:
+                if not isinstance(line, dict):
+                    raise ValueError('Line must be an object with product_id and quantity')
+                result['product_id'] = line.get('product_id')
+                if line.get('product_id') in (None, ''):
+                    raise ValueError('Product is required')
+                try:
+                    product_id = int(line['product_id'])
+                except (TypeError, ValueError):
+                    raise ValueError(f"Invalid product: {line['product_id']}")
+                result['product_id'] = product_id
+                if line.get('quantity') in (None, ''):
+                    raise ValueError('Quantity is required')
+                quantity = StockService.parse_quantity(line['quantity'])
+                action = (line.get('action') or 'add').strip().lower()
+                if action not in ('add', 'remove'):
+                    raise ValueError(f"Unknown action '{action}'")
+            except ValueError as e:
+                result['error'] = str(e)
+                continue
+            
+            parsed_lines.append((result, product_id, quantity, action, line.get('notes') or notes))
+        
+        # Check that every product exists with one query
+        requested_ids = {product_id for _, product_id, _, _, _ in parsed_lines}
+        existing_ids = set(db.session.scalars(
+            select(BranchProduct.id).where(BranchProduct.id.in_(requested_ids))
+        )) if requested_ids else set()
+        for result, product_id, _, _, _ in parsed_lines:
+            if product_id not in existing_ids:
+                result['error'] = 'Product not found'
+        
+        if any('error' in result for result in results):
+            return False, results
+        
+        try:
+            deltas = {}
+            for _, product_id, quantity, action, _ in parsed_lines:
+                deltas[product_id] = deltas.get(product_id, Decimal('0')) + (quantity if action == 'add' else -quantity)
+            
+            adjusted = StockService.apply_stock_deltas(deltas, minimum=0)
+            if len(adjusted) != len(deltas):
+                db.session.rollback()
+                for result, product_id, _, _, _ in parsed_lines:
+                    if product_id not in adjusted:
+                        result['error'] = 'Insufficient stock'
+                return False, results
+            
+            # Replay the lines from each product's starting stock to build the ledger
+            running_stock = {product_id: previous for product_id, (previous, _, _) in adjusted.items()}
+            transactions = []
+            for result, product_id, quantity, action, line_notes in parsed_lines:
+                previous_stock = running_stock[product_id]
+                new_stock = previous_stock + quantity if action == 'add' else previous_stock - quantity
+                running_stock[product_id] = new_stock
+                transactions.append({
+                    'productid': product_id,
+                    'userid': current_user.id,
+                    'transaction_type': action,
+                    'quantity': quantity,
+                    'previous_stock': previous_stock,
+                    'new_stock': new_stock,
+                    'notes': line_notes or f'Stock {"added" if action == "add" else "removed"} via bulk adjustment'
+                })
+                result.update(success=True, previous_stock=float(previous_stock), new_stock=float(new_stock))
+            
+            db.session.execute(insert(StockTransaction), transactions)
+            db.session.commit()
+            invalidate_product_listings({branch_id for _, _, branch_id in adjusted.values()})
+            
+            return True, results
+            
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+
+class ProductService:
+    """Service class for product listing queries"""
+    
+    @staticmethod
+    def product_rows_query(category=None, branch=None, search=None):
+        """
+        Column-only query for branch product listings
+        
+        Resolves the catalog name and code, category name and branch name of every
+        branch product in a single outer-joined SELECT.
+        """
+        category_name = func.coalesce(Category.name, 'Uncategorized')
+        query = db.session.query(
+            BranchProduct.id.label('id'),
+            ProductCatalog.name.label('name'),
+            ProductCatalog.productcode.label('productcode'),
+            ProductCatalog.image_url.label('image_url'),
+            category_name.label('category_name'),
+            Branch.name.label('branch_name'),
+            BranchProduct.buyingprice.label('buyingprice'),
+            BranchProduct.sellingprice.label('sellingprice'),
+            BranchProduct.stock.label('stock'),
+            BranchProduct.display.label('display')
+        ).select_from(BranchProduct).join(
+            ProductCatalog, BranchProduct.catalog_id == ProductCatalog.id
+        ).join(
+            Branch, BranchProduct.branchid == Branch.id
+        ).outerjoin(
+            SubCategory, ProductCatalog.subcategory_id == SubCategory.id
+        ).outerjoin(
+            Category, SubCategory.category_id == Category.id
+        )
+        
+        if category:
+            query = query.filter(Category.name == category)
+        if branch:
+            query = query.filter(Branch.name == branch)
+        search_filter = product_search_filter(search)
+        if search_filter is not None:
+            query = query.filter(search_filter)
+        
+        return query
+
+
 class AuthService:
     """Service class for authentication-related operations"""
     
@@ -688,23 +1244,8 @@ class AuthService:
             
             db.session.commit()
             
-            # Send password change alert email
-            try:
-                email_service = get_email_service()
-                if email_service:
-                    change_time = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
-                    email_result = email_service.send_password_change_alert(
-                        to_email=user.email,
-                        user_name=f"{user.firstname} {user.lastname}",
-                        change_time=change_time
-                    )
-                    
-                    if not email_result['success']:
-                        print(f"Warning: Could not send password change alert to {user.email}: {email_result.get('error', 'Unknown error')}")
-                else:
-                    print(f"Warning: Email service not available for password change alert to {user.email}")
-            except Exception as e:
-                print(f"Warning: Error sending password change alert to {user.email}: {str(e)}")
+            # Send password change alert email without holding up the request
+            email_executor.submit(AuthService.send_password_change_alert, user.id, datetime.utcnow())
             
             return True, 'Password reset successfully'
             
@@ -712,6 +1253,22 @@ class AuthService:
             db.session.rollback()
             raise e 
 
+    @staticmethod
+    def send_password_change_alert(user_id, changed_at):
+        """Email a user that their password was changed; runs on the email executor"""
+        user = db.session.get(User, user_id)
+        email_service = get_email_service()
+        if not email_service:
+            print(f"Warning: Email service not available for password change alert to {user.email}")
+            return
+        email_result = email_service.send_password_change_alert(
+            to_email=user.email,
+            user_name=f"{user.firstname} {user.lastname}",
+            change_time=changed_at.strftime('%Y-%m-%d %H:%M:%S UTC')
+        )
+        if not email_result['success']:
+            print(f"Warning: Could not send password change alert to {user.email}: {email_result.get('error', 'Unknown error')}")
+
     @staticmethod
     def delete_order(order_id, current_user):
         """Delete a pending order that is not yet approved"""
@@ -739,25 +1296,25 @@ class AuthService:
             db.session.rollback()
             return False, str(e)
 
+# Quotation item columns set from the edit form and compared to find changed items
+QUOTATION_ITEM_COLUMNS = ('product_id', 'branch_productid', 'product_name', 'quantity', 'unit', 'unit_price',
+                          'price_unit', 'total_price', 'notes')
+
+
 class QuotationService:
     """Service class for quotation-related operations"""
     
     @staticmethod
     def generate_quotation_number():
-        """Generate a unique quotation number"""
-        import random
-        import string
+        """
+        Allocate a unique quotation number
         
-        while True:
-            # Generate a random 6-digit number
-            number = ''.join(random.choices(string.digits, k=6))
-            quotation_number = f"QT-{number}"
-            
-            # Check if it already exists
-            from app.models import Quotation
-            existing = Quotation.query.filter_by(quotation_number=quotation_number).first()
-            if not existing:
-                return quotation_number
+        Numbers come from one atomic counter increment and are scrambled into
+        7 digits so they do not reveal how many quotations exist. Older random
+        numbers have 6 digits, so the two can never collide.
+        """
+        sequence = allocate_number('QT')
+        return f"QT-{permute_sequence(sequence):07d}"
     
     @staticmethod
     def create_quotation(data, current_user):
@@ -813,6 +1370,7 @@ class QuotationService:
                     quotation_item = QuotationItem(
                         quotation_id=quotation.id,
                         product_id=branch_product.id,
+                        branch_productid=branch_product.id,
                         quantity=quantity,
                         unit=item_data.get('unit'),
                         unit_price=unit_price,
@@ -855,6 +1413,99 @@ class QuotationService:
             db.session.rollback()
             raise e
     
+    @staticmethod
+    def item_lines_from_form(form):
+        """
+        Item lines from the edit form's parallel item arrays
+        
+        Each line has the id of the quotation item it edits (None for an added
+        line) and that item's columns. Rows without a quantity or unit price
+        are left out, so saving removes them.
+        """
+        line_ids = form.getlist('line_id[]')
+        item_ids = form.getlist('item_id[]')
+        item_names = form.getlist('item_name[]')
+        quantities = form.getlist('quantity[]')
+        units = form.getlist('unit[]')
+        unit_prices = form.getlist('unit_price[]')
+        price_units = form.getlist('price_unit[]')
+        notes = form.getlist('notes[]')
+        
+        def value(values, index):
+            return values[index] if index < len(values) else ''
+        
+        lines = []
+        for i in range(len(quantities)):
+            if not quantities[i] or not value(unit_prices, i):
+                continue
+            quantity = Decimal(str(quantities[i]))
+            unit_price = Decimal(str(unit_prices[i]))
+            line_id = value(line_ids, i).strip()
+            item_id = value(item_ids, i).strip()
+            item_name = value(item_names, i)
+            lines.append({
+                'id': int(line_id) if line_id else None,
+                'product_id': int(item_id) if item_id else None,
+                'branch_productid': int(item_id) if item_id else None,
+                # Regular products get their name from the product; manual items need one
+                'product_name': None if item_id else (item_name if item_name.strip() else 'Manual Item'),
+                'quantity': quantity,
+                'unit': value(units, i) or None,
+                'unit_price': unit_price,
+                'price_unit': value(price_units, i) or None,
+                'total_price': (quantity * unit_price).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+                'notes': value(notes, i) or None
+            })
+        return lines
+    
+    @staticmethod
+    def update_quotation_items(quotation, lines):
+        """
+        Save a quotation's edited item lines, writing only what changed
+        
+        A line with the id of one of the quotation's items updates it if any
+        column differs, a line without one is inserted and items left without
+        a line are deleted, each kind in one bulk statement. Subtotal and total
+        move by the change in item totals instead of re-summing every item.
+        Returns the numbers of inserted, updated and deleted items; the
+        caller commits.
+        """
+        from app.models import QuotationItem
+        
+        columns = [getattr(QuotationItem, name) for name in QUOTATION_ITEM_COLUMNS]
+        existing = {row.id: row for row in db.session.execute(
+            select(QuotationItem.id, *columns).where(QuotationItem.quotation_id == quotation.id)
+        )}
+        
+        inserts, updates = [], []
+        delta = Decimal('0.00')
+        for line in lines:
+            values = {name: line[name] for name in QUOTATION_ITEM_COLUMNS}
+            current = existing.pop(line['id'], None) if line['id'] is not None else None
+            if current is None:
+                inserts.append(dict(values, quotation_id=quotation.id))
+                delta += values['total_price']
+            elif any(getattr(current, name) != values[name] for name in QUOTATION_ITEM_COLUMNS):
+                updates.append(dict(values, id=current.id))
+                delta += values['total_price'] - current.total_price
+        
+        # Whatever is left in existing was removed from the form
+        deleted_ids = list(existing)
+        delta -= sum((row.total_price for row in existing.values()), Decimal('0.00'))
+        
+        if inserts:
+            db.session.execute(insert(QuotationItem), inserts)
+        if updates:
+            db.session.execute(update(QuotationItem), updates)
+        if deleted_ids:
+            db.session.execute(
+                delete(QuotationItem).where(QuotationItem.id.in_(deleted_ids)),
+                execution_options={'synchronize_session': False}
+            )
+        
+        quotation.apply_items_delta(delta)
+        return len(inserts), len(updates), len(deleted_ids)
+    
     @staticmethod
     def update_quotation_status(quotation_id, status):
         """Update quotation status"""
@@ -867,4 +1518,24 @@ class QuotationService:
             return True, f'Quotation status updated to {status}'
         except Exception as e:
             db.session.rollback()
-            raise e 
\ No newline at end of file
+            raise e 
+
+
+# Background job handlers, run by worker.py
+
+@job_handler('invoice_email')
+def invoice_email_job(payload):
+    """Render and email an invoice"""
+    invoice = db.session.get(Invoice, payload['invoice_id'])
+    if invoice is None:
+        raise LookupError(f"Invoice {payload['invoice_id']} not found")
+    OrderService.send_invoice_email(invoice.order, invoice)
+
+
+@job_handler('receipt_email')
+def receipt_email_job(payload):
+    """Render and email a receipt"""
+    receipt = db.session.get(Receipt, payload['receipt_id'])
+    if receipt is None:
+        raise LookupError(f"Receipt {payload['receipt_id']} not found")
+    PaymentService.send_receipt_email(receipt)
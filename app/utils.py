@@ -1,48 +1,45 @@
+import csv
+import hashlib
+import json
+import zlib
+from io import StringIO
 from datetime import datetime, timedelta
+from flask import Response, request
 from app import db
 from app.models import Invoice, Receipt
+from app.numbering import allocate_number, last_sequence_in_use
 
 
 def generate_invoice_number():
-    """Generate a unique invoice number in format INV-YYYYMMDD-XXXX"""
+    """Allocate the next invoice number in format INV-YYYYMMDD-XXXX"""
     today = datetime.utcnow().strftime('%Y%m%d')
+    prefix = f'INV-{today}-'
     
-    # Get the last invoice number for today
-    last_invoice = Invoice.query.filter(
-        Invoice.invoice_number.like(f'INV-{today}-%')
-    ).order_by(Invoice.invoice_number.desc()).first()
-    
-    if last_invoice:
-        # Extract the sequence number and increment
-        last_sequence = int(last_invoice.invoice_number.split('-')[-1])
-        new_sequence = last_sequence + 1
-    else:
-        new_sequence = 1
+    # Today's counter starts after any invoices numbered before it existed
+    sequence = allocate_number(
+        f'INV-{today}',
+        seed=lambda: last_sequence_in_use(Invoice.invoice_number, prefix)
+    )
     
-    return f'INV-{today}-{new_sequence:04d}'
+    return f'{prefix}{sequence:04d}'
 
 
 def generate_receipt_number():
-    """Generate a unique receipt number in format RCP-YYYYMMDD-XXXX"""
+    """Allocate the next receipt number in format RCP-YYYYMMDD-XXXX"""
     today = datetime.utcnow().strftime('%Y%m%d')
+    prefix = f'RCP-{today}-'
     
-    # Get the last receipt number for today
-    last_receipt = Receipt.query.filter(
-        Receipt.receipt_number.like(f'RCP-{today}-%')
-    ).order_by(Receipt.receipt_number.desc()).first()
-    
-    if last_receipt:
-        # Extract the sequence number and increment
-        last_sequence = int(last_receipt.receipt_number.split('-')[-1])
-        new_sequence = last_sequence + 1
-    else:
-        new_sequence = 1
+    # Today's counter starts after any receipts numbered before it existed
+    sequence = allocate_number(
+        f'RCP-{today}',
+        seed=lambda: last_sequence_in_use(Receipt.receipt_number, prefix)
+    )
     
-    return f'RCP-{today}-{new_sequence:04d}'
+    return f'{prefix}{sequence:04d}'
 
 
-def create_invoice_for_order(order, total_amount):
-    """Create an invoice for a given order"""
+def create_invoice_for_order(order, total_amount, commit=True):
+    """Create an invoice for a given order; with commit=False it is only added to the session"""
     try:
         print(f"Creating invoice for order {order.id} with total amount {total_amount}")
         
@@ -63,6 +60,8 @@ def create_invoice_for_order(order, total_amount):
         
         print(f"Created invoice object: {invoice.invoice_number}")
         db.session.add(invoice)
+        if not commit:
+            return invoice
         db.session.commit()
         print(f"Successfully saved invoice {invoice.invoice_number} to database")
         
@@ -73,8 +72,8 @@ def create_invoice_for_order(order, total_amount):
         raise e
 
 
-def create_receipt_for_payment(payment, previous_balance, remaining_balance):
-    """Create a receipt for a given payment"""
+def create_receipt_for_payment(payment, previous_balance, remaining_balance, commit=True):
+    """Create a receipt for a given payment; with commit=False it is only added to the session"""
     receipt_number = generate_receipt_number()
     
     receipt = Receipt(
@@ -91,34 +90,80 @@ def create_receipt_for_payment(payment, previous_balance, remaining_balance):
     )
     
     db.session.add(receipt)
-    db.session.commit()
+    if commit:
+        db.session.commit()
     return receipt
 
 
-def send_password_change_alert(user_email, user_name):
-    """Send password change alert email to user"""
-    try:
-        from email_service import get_email_service
-        email_service = get_email_service()
-        
-        if email_service:
-            change_time = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
-            email_result = email_service.send_password_change_alert(
-                to_email=user_email,
-                user_name=user_name,
-                change_time=change_time
-            )
-            
-            if email_result['success']:
-                print(f"✅ Password change alert sent to {user_email}")
-                return True
-            else:
-                print(f"❌ Failed to send password change alert to {user_email}: {email_result.get('error', 'Unknown error')}")
-                return False
-        else:
-            print(f"⚠️ Email service not available for password change alert to {user_email}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Error sending password change alert to {user_email}: {str(e)}")
-        return False 
\ No newline at end of file
+def iter_delimited_chunks(header, rows, delimiter=',', rows_per_chunk=500):
+    """Yield CSV/TSV text in chunks of rows_per_chunk rows without building the whole file"""
+    buffer = StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter)
+    writer.writerow(header)
+    
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    
+    remaining = buffer.getvalue()
+    if remaining:
+        yield remaining
+
+
+def iter_gzip_chunks(chunks, encoding='utf-8'):
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode(encoding))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def json_etag(body):
+    """Strong ETag for a serialized JSON body"""
+    return hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+def conditional_json_response(payload=None, body=None, etag=None, max_age=0):
+    """
+    JSON response that honors If-None-Match with 304 Not Modified
+    
+    Pass either the payload to serialize or an already serialized body and its
+    ETag. With max_age 0 clients must revalidate on every use; otherwise they may
+    reuse the response for max_age seconds first.
+    """
+    if body is None:
+        body = json.dumps(payload)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag or json_etag(body))
+    response.cache_control.private = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def send_pdf(data, etag=None, download_name=None):
+    """
+    Serve PDF bytes from memory with Content-Length, byte ranges and ETag revalidation
+    
+    The ETag is the cache's content hash, so clients revalidate on every use
+    but only download the PDF again after the document changed. Range requests
+    (PDF viewers fetching pages on demand, resumed downloads) get 206 Partial Content.
+    """
+    response = Response(data, mimetype='application/pdf')
+    if download_name:
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    if etag:
+        response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-email render time from the compiled templates and when parsing each time
+
+"Before" loads, parses and compiles invoice.html for every email, as an
+environment without a template cache does. "After" renders the template
+compiled once at import by email_service.
+
+    python benchmark_email_templates.py                # 2,000 emails each way
+    python benchmark_email_templates.py --count 500
+"""
+
+import sys
+import os
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from email_service import EMAIL_TEMPLATE_DIR, render_email_template
+
+
+CONTEXT = {'user_name': 'Ann', 'order_id': 42, 'invoice_number': 'INV-20240101-0001', 'now': datetime.now()}
+
+
+def time_renders(count, render):
+    """Average seconds per email rendered with render()"""
+    started = time.perf_counter()
+    for _ in range(count):
+        render()
+    return (time.perf_counter() - started) / count
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[sys.argv.index('--count') + 1]) if '--count' in sys.argv else 2000
+
+    uncached = Environment(loader=FileSystemLoader(EMAIL_TEMPLATE_DIR), autoescape=select_autoescape(['html']),
+                           cache_size=0)
+    before = time_renders(count, lambda: uncached.get_template('invoice.html').render(**CONTEXT))
+    after = time_renders(count, lambda: render_email_template('invoice.html', **CONTEXT))
+    print(f"{count} invoice emails")
+    print(f"  before (parsed per email): {before * 1e6:.0f} µs per email")
+    print(f"  after (compiled once):     {after * 1e6:.0f} µs per email")
+    print(f"  {before / after:.1f}x faster")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-document invoice render time with and without the shared PDF theme
+
+"Before" builds a new PDFTheme for every invoice, which redoes what each
+renderer used to do on every call: build the sample stylesheet and every
+ParagraphStyle/TableStyle, and read, decode and encode static/logo.png.
+"After" renders with the process-wide theme.
+
+    python benchmark_pdf_rendering.py              # 1,000 invoices each way
+    python benchmark_pdf_rendering.py --count 100
+"""
+
+import sys
+import os
+import time
+from decimal import Decimal
+from io import BytesIO
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.invoices import InvoiceData, InvoiceLine
+from app.pdf_theme import PDFTheme, pdf_theme
+from app.pdf_utils import create_invoice_pdf_a4
+
+
+def sample_invoice(number):
+    """An invoice with a handful of items, similar to a typical walk-in order"""
+    items = tuple(InvoiceLine(
+        item_id=index,
+        product_name=f'Product {index}',
+        quantity=Decimal(index + 1),
+        original_price=Decimal('150.00'),
+        negotiated_price=None,
+        unit_price=Decimal('150.00'),
+        total=Decimal('150.00') * (index + 1)
+    ) for index in range(6))
+    return InvoiceData(
+        invoice_number=f'INV-{number:06d}',
+        order_id=number,
+        customer_name='Walk-in Customer',
+        customer_email='walk-in@example.com',
+        customer_phone='N/A',
+        branch='Gikomba',
+        order_date='January 01, 2025',
+        order_time='10:00 AM',
+        order_items=items,
+        subtotal=sum(item.total for item in items)
+    )
+
+
+def time_renders(count, theme_for):
+    """Average seconds per invoice rendered with theme_for(number)"""
+    user_data = {'firstname': 'Bench', 'lastname': 'Mark'}
+    started = time.perf_counter()
+    for number in range(count):
+        create_invoice_pdf_a4(sample_invoice(number), user_data, BytesIO(), theme=theme_for(number))
+    return (time.perf_counter() - started) / count
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[sys.argv.index('--count') + 1]) if '--count' in sys.argv else 1000
+
+    # Warm up imports and the shared theme's logo outside the timings
+    time_renders(1, lambda number: pdf_theme)
+
+    before = time_renders(count, lambda number: PDFTheme())
+    after = time_renders(count, lambda number: pdf_theme)
+    print(f"{count} invoices")
+    print(f"  before (theme built per document): {before * 1000:.1f} ms per invoice")
+    print(f"  after (shared theme):              {after * 1000:.1f} ms per invoice")
+    print(f"  {before / after:.1f}x faster")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: quotation number allocation cost with no quotations and with 900k
+
+The old allocator picked random 6-digit numbers and retried until one was
+free, so it slowed down as the table filled. The counter-based allocator
+should cost one UPDATE ... RETURNING per number however many quotations
+exist. Runs against a private in-memory SQLite database.
+
+    python benchmark_quotation_numbers.py                        # 900,000 existing, 1,000 allocations
+    python benchmark_quotation_numbers.py --existing 100000 --allocations 500
+"""
+
+import sys
+import os
+import random
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+from app import db
+from app.models import Quotation
+from app.services import QuotationService
+from config import config
+
+
+def create_benchmark_app():
+    """An app with a private in-memory database"""
+    benchmark_app = Flask(__name__)
+    benchmark_app.config.from_object(config['testing'])
+    benchmark_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(benchmark_app)
+    return benchmark_app
+
+
+def time_allocations(count):
+    """Allocate count quotation numbers; returns seconds and statements per allocation"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        started = time.perf_counter()
+        for _ in range(count):
+            QuotationService.generate_quotation_number()
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    db.session.commit()
+    return elapsed / count, len(statements) / count
+
+
+def insert_legacy_quotations(count, batch_size=50000):
+    """Quotations numbered the old random 6-digit way, filling count of the 10**6 numbers"""
+    numbers = random.sample(range(10 ** 6), count)
+    for start in range(0, count, batch_size):
+        db.session.execute(insert(Quotation), [{
+            'quotation_number': f'QT-{number:06d}',
+            'customer_name': 'Benchmark',
+            'created_by': 1,
+            'branch_id': 1
+        } for number in numbers[start:start + batch_size]])
+    db.session.commit()
+
+
+if __name__ == '__main__':
+    existing = int(sys.argv[sys.argv.index('--existing') + 1]) if '--existing' in sys.argv else 900000
+    allocations = int(sys.argv[sys.argv.index('--allocations') + 1]) if '--allocations' in sys.argv else 1000
+
+    with create_benchmark_app().app_context():
+        db.create_all()
+        # Warm up the counter row and statement cache outside the timings
+        QuotationService.generate_quotation_number()
+        db.session.commit()
+
+        empty_seconds, empty_statements = time_allocations(allocations)
+        insert_legacy_quotations(existing)
+        full_seconds, full_statements = time_allocations(allocations)
+
+    print(f"{allocations} allocations")
+    for label, seconds, statements in (('no quotations', empty_seconds, empty_statements),
+                                       (f'{existing} quotations', full_seconds, full_statements)):
+        print(f"  {label + ':':<20} {seconds * 1000:.3f} ms, {statements:.1f} statements per number")
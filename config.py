@@ -18,6 +18,10 @@ class Config:
     BREVO_API_KEY = os.environ.get('BREVO_API_KEY')
     BREVO_SENDER_EMAIL = os.environ.get('BREVO_SENDER_EMAIL') or 'noreply@abzhardware.com'
     BREVO_SENDER_NAME = os.environ.get('BREVO_SENDER_NAME') or 'ABZ Hardware'
+    BREVO_API_URL = os.environ.get('BREVO_API_URL') or 'https://api.brevo.com/v3'
+    BREVO_CONNECT_TIMEOUT = float(os.environ.get('BREVO_CONNECT_TIMEOUT') or 3.05)
+    BREVO_READ_TIMEOUT = float(os.environ.get('BREVO_READ_TIMEOUT') or 10)
+    BREVO_MAX_RETRIES = int(os.environ.get('BREVO_MAX_RETRIES') or 3)
     
     # Application settings
     APP_NAME = 'ABZ Sales Portal'
@@ -26,6 +30,30 @@ class Config:
     # Password reset settings
     PASSWORD_RESET_EXPIRY_HOURS = 24
     
+    # Product listing cache for /api/products
+    PRODUCT_CACHE_TTL = int(os.environ.get('PRODUCT_CACHE_TTL') or 30)
+    PRODUCT_CACHE_SIZE = int(os.environ.get('PRODUCT_CACHE_SIZE') or 512)
+    
+    # Rendered invoice/quotation PDFs (app.pdf_cache); defaults to a folder in the temp directory
+    PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR')
+    PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES') or 200 * 1024 * 1024)
+    
+    # Batch PDF exports (app.pdf_export): render processes per export, and the
+    # most documents one merged PDF may hold since it is assembled in memory
+    PDF_EXPORT_WORKERS = int(os.environ.get('PDF_EXPORT_WORKERS') or min(4, os.cpu_count() or 1))
+    PDF_EXPORT_MAX_MERGED = int(os.environ.get('PDF_EXPORT_MAX_MERGED') or 200)
+    
+    # Background jobs (invoice/receipt PDFs and emails), run by worker.py
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS') or 5)
+    JOB_BACKOFF_SECONDS = int(os.environ.get('JOB_BACKOFF_SECONDS') or 30)
+    JOB_BACKOFF_MAX_SECONDS = int(os.environ.get('JOB_BACKOFF_MAX_SECONDS') or 3600)
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS') or 300)
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL') or 2)
+    
+    # Thread pool for emails sent from requests (app.executor)
+    BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS') or 4)
+    BACKGROUND_QUEUE_SIZE = int(os.environ.get('BACKGROUND_QUEUE_SIZE') or 100)
+    
     @staticmethod
     def init_app(app):
         pass
@@ -41,7 +69,7 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///:memory:'
 
 config = {
     'development': DevelopmentConfig,
@@ -1,11 +1,40 @@
 import requests
+import base64
 import json
 import os
 from datetime import datetime
 from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+# Brevo accepts at most this many messageVersions per batch request
+BATCH_SIZE = 1000
+
+# Email bodies live in templates/emails and share the base.html layout. The
+# environment never checks the files for changes, and every template is
+# compiled once here, so a send only renders.
+EMAIL_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'emails')
+email_templates = Environment(
+    loader=FileSystemLoader(EMAIL_TEMPLATE_DIR),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False
+)
+EMAIL_TEMPLATES = {name: email_templates.get_template(name)
+                   for name in email_templates.list_templates() if name != 'base.html'}
+
+
+def render_email_template(name: str, **context) -> str:
+    """Render a compiled email template; now is available to every template"""
+    context.setdefault('now', datetime.now())
+    return EMAIL_TEMPLATES[name].render(**context).strip()
+
 
 class BrevoEmailService:
-    def __init__(self, api_key: str = None, sender_email: str = None, sender_name: str = None):
+    def __init__(self, api_key: str = None, sender_email: str = None, sender_name: str = None,
+                 base_url: str = None, session: requests.Session = None,
+                 connect_timeout: float = 3.05, read_timeout: float = 10, max_retries: int = 3,
+                 backoff_factor: float = 0.5, pool_size: int = 10):
         """
         Initialize Brevo email service
         
@@ -13,21 +42,60 @@ class BrevoEmailService:
             api_key: Brevo API key. If not provided, will try to get from environment variable BREVO_API_KEY
             sender_email: Sender email address. If not provided, will use BREVO_SENDER_EMAIL env var
             sender_name: Sender name. If not provided, will use BREVO_SENDER_NAME env var
+            base_url: API root, e.g. a local stub server in tests. Defaults to BREVO_API_URL or Brevo's v3 API
+            session: HTTP transport to send with. Defaults to a pooled keep-alive requests.Session
+            connect_timeout: Seconds to wait for a connection to the API
+            read_timeout: Seconds to wait for the API to answer a request
+            max_retries: Retries on connection errors and 429/5xx responses, with exponential backoff
+            backoff_factor: Base of the exponential backoff between retries, in seconds
+            pool_size: Connections kept open to the API
         """
-        print(os.getenv('BREVO_API_KEY'))
-        self.api_key = os.getenv('BREVO_API_KEY')
+        self.api_key = api_key or os.getenv('BREVO_API_KEY')
         if not self.api_key:
             raise ValueError("Brevo API key is required. Set BREVO_API_KEY environment variable or pass api_key parameter.")
         
         self.sender_email = sender_email or os.getenv('BREVO_SENDER_EMAIL', 'noreply@abzhardware.com')
         self.sender_name = sender_name or os.getenv('BREVO_SENDER_NAME', 'ABZ Hardware')
         
-        self.base_url = "https://api.brevo.com/v3"
+        self.base_url = (base_url or os.getenv('BREVO_API_URL') or "https://api.brevo.com/v3").rstrip('/')
         self.headers = {
             'accept': 'application/json',
             'content-type': 'application/json',
             'api-key': self.api_key
         }
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = session or self._create_session(max_retries, backoff_factor, pool_size)
+    
+    @staticmethod
+    def _create_session(max_retries: int, backoff_factor: float, pool_size: int) -> requests.Session:
+        """
+        Pooled session that retries connection failures and 429/5xx responses
+        
+        Read timeouts are not retried: Brevo may already have accepted the email,
+        and a retry would send it twice. Retry-After is not honoured so a rate
+        limited send cannot stall its worker; the job queue retries it later.
+        """
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['POST']),
+            backoff_factor=backoff_factor,
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    @staticmethod
+    def _attachment(name: str, content: bytes) -> list:
+        """Brevo attachment list for a single file"""
+        return [{"name": name, "content": base64.b64encode(content).decode('ascii')}]
     
     def send_password_reset_email(self, to_email: str, reset_url: str, user_name: str) -> dict:
         """
@@ -151,13 +219,7 @@ class BrevoEmailService:
         
         # Add attachment if provided
         if pdf_attachment:
-            import base64
-            email_data["attachment"] = [
-                {
-                    "name": f"invoice_{invoice_number}.pdf",
-                    "content": base64.b64encode(pdf_attachment).decode('utf-8')
-                }
-            ]
+            email_data["attachment"] = self._attachment(f"invoice_{invoice_number}.pdf", pdf_attachment)
         
         return self._send_email(email_data)
     
@@ -194,16 +256,57 @@ class BrevoEmailService:
         
         # Add attachment if provided
         if pdf_attachment:
-            import base64
-            email_data["attachment"] = [
-                {
-                    "name": f"receipt_{receipt_number}.pdf",
-                    "content": base64.b64encode(pdf_attachment).decode('utf-8')
-                }
-            ]
+            email_data["attachment"] = self._attachment(f"receipt_{receipt_number}.pdf", pdf_attachment)
         
         return self._send_email(email_data)
     
+    def send_batch_email(self, subject: str, html_content: str, text_content: str, recipients: list) -> dict:
+        """
+        Send one email to many recipients with Brevo's batch API
+        
+        The content may use {{ params.name }} placeholders, filled per recipient;
+        recipients are sent in requests of up to BATCH_SIZE messageVersions.
+        
+        Args:
+            subject: Email subject
+            html_content: HTML body shared by every recipient
+            text_content: Plain text body shared by every recipient
+            recipients: List of {"email", "name", "params"} dicts; params is optional
+            
+        Returns:
+            dict: success, the message ids sent and one error per failed request
+        """
+        message_ids = []
+        errors = []
+        for start in range(0, len(recipients), BATCH_SIZE):
+            email_data = {
+                "sender": {
+                    "name": self.sender_name,
+                    "email": self.sender_email
+                },
+                "subject": subject,
+                "htmlContent": html_content,
+                "textContent": text_content,
+                "messageVersions": [
+                    {
+                        "to": [{"email": recipient["email"], "name": recipient.get("name") or recipient["email"]}],
+                        **({"params": recipient["params"]} if recipient.get("params") else {})
+                    }
+                    for recipient in recipients[start:start + BATCH_SIZE]
+                ]
+            }
+            result = self._send_email(email_data)
+            if result['success']:
+                message_ids.extend(result.get('message_ids') or [result.get('message_id')])
+            else:
+                errors.append(result['error'])
+        
+        return {
+            'success': not errors,
+            'message_ids': message_ids,
+            'errors': errors
+        }
+    
     def _send_email(self, email_data: dict) -> dict:
         """
         Send email using Brevo API
@@ -215,16 +318,19 @@ class BrevoEmailService:
             dict: API response
         """
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/smtp/email",
                 headers=self.headers,
-                data=json.dumps(email_data)
+                data=json.dumps(email_data),
+                timeout=self.timeout
             )
             
             if response.status_code == 201:
+                body = response.json() if response.content else {}
                 return {
                     'success': True,
-                    'message_id': response.json().get('messageId'),
+                    'message_id': body.get('messageId'),
+                    'message_ids': body.get('messageIds'),
                     'message': 'Email sent successfully'
                 }
             else:
@@ -241,576 +347,56 @@ class BrevoEmailService:
     
     def _get_password_reset_html(self, reset_url: str, user_name: str) -> str:
         """Generate HTML content for password reset email"""
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Password Reset - ABZ Sales Portal</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }}
-                .header {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 30px;
-                    text-align: center;
-                    border-radius: 10px 10px 0 0;
-                }}
-                .content {{
-                    background: #f9f9f9;
-                    padding: 30px;
-                    border-radius: 0 0 10px 10px;
-                }}
-                .button {{
-                    display: inline-block;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 15px 30px;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    font-weight: bold;
-                    margin: 20px 0;
-                }}
-                .footer {{
-                    text-align: center;
-                    margin-top: 30px;
-                    color: #666;
-                    font-size: 12px;
-                }}
-                .warning {{
-                    background: #fff3cd;
-                    border: 1px solid #ffeaa7;
-                    padding: 15px;
-                    border-radius: 5px;
-                    margin: 20px 0;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>ABZ Hardware</h1>
-                <p>Sales Portal - Password Reset</p>
-            </div>
-            
-            <div class="content">
-                <h2>Hello {user_name},</h2>
-                
-                <p>We received a request to reset your password for the ABZ Sales Portal. If you didn't make this request, you can safely ignore this email.</p>
-                
-                <div style="text-align: center;">
-                    <a href="{reset_url}" class="button">Reset Password</a>
-                </div>
-                
-                <div class="warning">
-                    <strong>Important:</strong> This link will expire in 24 hours for security reasons.
-                </div>
-                
-                <p>If the button above doesn't work, you can copy and paste this link into your browser:</p>
-                <p style="word-break: break-all; color: #667eea;">{reset_url}</p>
-                
-                <p>If you have any questions or need assistance, please contact your system administrator.</p>
-                
-                <p>Best regards,<br>
-                ABZ Hardware Team</p>
-            </div>
-            
-            <div class="footer">
-                <p>This email was sent from the ABZ Sales Portal. Please do not reply to this email.</p>
-                <p>&copy; {datetime.now().year} ABZ Hardware. All rights reserved.</p>
-            </div>
-        </body>
-        </html>
-        """
+        return render_email_template('password_reset.html', reset_url=reset_url, user_name=user_name)
     
     def _get_password_reset_text(self, reset_url: str, user_name: str) -> str:
         """Generate plain text content for password reset email"""
-        return f"""
-        Password Reset Request - ABZ Sales Portal
-        
-        Hello {user_name},
-        
-        We received a request to reset your password for the ABZ Sales Portal. If you didn't make this request, you can safely ignore this email.
-        
-        To reset your password, please click the following link:
-        {reset_url}
-        
-        Important: This link will expire in 24 hours for security reasons.
-        
-        If you have any questions or need assistance, please contact your system administrator.
-        
-        Best regards,
-        ABZ Hardware Team
-        
-        ---
-        This email was sent from the ABZ Sales Portal. Please do not reply to this email.
-        © {datetime.now().year} ABZ Hardware. All rights reserved.
-        """
+        return render_email_template('password_reset.txt', reset_url=reset_url, user_name=user_name)
     
     def _get_welcome_html(self, user_name: str, login_url: str) -> str:
         """Generate HTML content for welcome email"""
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Welcome to ABZ Sales Portal</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }}
-                .header {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 30px;
-                    text-align: center;
-                    border-radius: 10px 10px 0 0;
-                }}
-                .content {{
-                    background: #f9f9f9;
-                    padding: 30px;
-                    border-radius: 0 0 10px 10px;
-                }}
-                .button {{
-                    display: inline-block;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 15px 30px;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    font-weight: bold;
-                    margin: 20px 0;
-                }}
-                .footer {{
-                    text-align: center;
-                    margin-top: 30px;
-                    color: #666;
-                    font-size: 12px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>ABZ Hardware</h1>
-                <p>Sales Portal - Welcome</p>
-            </div>
-            
-            <div class="content">
-                <h2>Welcome {user_name}!</h2>
-                
-                <p>Welcome to the ABZ Sales Portal! Your account has been successfully created and you can now access the sales management system.</p>
-                
-                <div style="text-align: center;">
-                    <a href="{login_url}" class="button">Login to Portal</a>
-                </div>
-                
-                <p>With the ABZ Sales Portal, you can:</p>
-                <ul>
-                    <li>Create and manage orders</li>
-                    <li>Track inventory and stock levels</li>
-                    <li>Process payments and generate invoices</li>
-                    <li>View sales reports and analytics</li>
-                </ul>
-                
-                <p>If you have any questions or need assistance, please contact your system administrator.</p>
-                
-                <p>Best regards,<br>
-                ABZ Hardware Team</p>
-            </div>
-            
-            <div class="footer">
-                <p>This email was sent from the ABZ Sales Portal. Please do not reply to this email.</p>
-                <p>&copy; {datetime.now().year} ABZ Hardware. All rights reserved.</p>
-            </div>
-        </body>
-        </html>
-        """
+        return render_email_template('welcome.html', user_name=user_name, login_url=login_url)
     
     def _get_welcome_text(self, user_name: str, login_url: str) -> str:
         """Generate plain text content for welcome email"""
-        return f"""
-        Welcome to ABZ Sales Portal
-        
-        Hello {user_name},
-        
-        Welcome to the ABZ Sales Portal! Your account has been successfully created and you can now access the sales management system.
-        
-        Login to your account: {login_url}
-        
-        With the ABZ Sales Portal, you can:
-        - Create and manage orders
-        - Track inventory and stock levels
-        - Process payments and generate invoices
-        - View sales reports and analytics
-        
-        If you have any questions or need assistance, please contact your system administrator.
-        
-        Best regards,
-        ABZ Hardware Team
-        
-        ---
-        This email was sent from the ABZ Sales Portal. Please do not reply to this email.
-        © {datetime.now().year} ABZ Hardware. All rights reserved.
-        """
+        return render_email_template('welcome.txt', user_name=user_name, login_url=login_url)
     
     def _get_password_change_alert_html(self, user_name: str, change_time: str) -> str:
         """Generate HTML content for password change alert email"""
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Password Changed - ABZ Sales Portal</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }}
-                .header {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 30px;
-                    text-align: center;
-                    border-radius: 10px 10px 0 0;
-                }}
-                .content {{
-                    background: #f9f9f9;
-                    padding: 30px;
-                    border-radius: 0 0 10px 10px;
-                }}
-                .alert-box {{
-                    background: #fff3cd;
-                    border: 1px solid #ffeaa7;
-                    padding: 20px;
-                    border-radius: 5px;
-                    margin: 20px 0;
-                }}
-                .info-box {{
-                    background: #d1ecf1;
-                    border: 1px solid #bee5eb;
-                    padding: 15px;
-                    border-radius: 5px;
-                    margin: 20px 0;
-                }}
-                .footer {{
-                    text-align: center;
-                    margin-top: 30px;
-                    color: #666;
-                    font-size: 12px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>ABZ Hardware</h1>
-                <p>Sales Portal - Security Alert</p>
-            </div>
-            
-            <div class="content">
-                <h2>Hello {user_name},</h2>
-                
-                <div class="alert-box">
-                    <h3>🔒 Password Changed Successfully</h3>
-                    <p>Your password for the ABZ Sales Portal has been successfully changed.</p>
-                </div>
-                
-                <div class="info-box">
-                    <strong>Change Details:</strong><br>
-                    • Time: {change_time}<br>
-                    • Account: ABZ Sales Portal<br>
-                    • Action: Password Reset
-                </div>
-                
-                <p>If you did not request this password change, please contact your system administrator immediately as your account may have been compromised.</p>
-                
-                <p>For security reasons, we recommend:</p>
-                <ul>
-                    <li>Using a strong, unique password</li>
-                    <li>Not sharing your password with anyone</li>
-                    <li>Logging out when using shared computers</li>
-                    <li>Regularly updating your password</li>
-                </ul>
-                
-                <p>If you have any questions or need assistance, please contact your system administrator.</p>
-                
-                <p>Best regards,<br>
-                ABZ Hardware Team</p>
-            </div>
-            
-            <div class="footer">
-                <p>This email was sent from the ABZ Sales Portal. Please do not reply to this email.</p>
-                <p>&copy; {datetime.now().year} ABZ Hardware. All rights reserved.</p>
-            </div>
-        </body>
-        </html>
-        """
+        return render_email_template('password_change_alert.html', user_name=user_name, change_time=change_time)
     
     def _get_password_change_alert_text(self, user_name: str, change_time: str) -> str:
         """Generate text content for password change alert email"""
-        return f"""
-Dear {user_name},
-
-Your password for the ABZ Sales Portal has been changed successfully.
-
-Change Time: {change_time}
-
-If you did not make this change, please contact your system administrator immediately.
-
-Best regards,
-ABZ Hardware Team
-        """.strip()
+        return render_email_template('password_change_alert.txt', user_name=user_name, change_time=change_time)
     
     def _get_invoice_email_html(self, user_name: str, order_id: int, invoice_number: str) -> str:
         """Generate HTML content for invoice email"""
-        return f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Invoice #{invoice_number}</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .header {{
-            background-color: #007bff;
-            color: white;
-            padding: 20px;
-            text-align: center;
-            border-radius: 5px 5px 0 0;
-        }}
-        .content {{
-            background-color: #f8f9fa;
-            padding: 20px;
-            border-radius: 0 0 5px 5px;
-        }}
-        .invoice-info {{
-            background-color: white;
-            padding: 15px;
-            margin: 15px 0;
-            border-radius: 5px;
-            border-left: 4px solid #007bff;
-        }}
-        .footer {{
-            text-align: center;
-            margin-top: 20px;
-            padding-top: 20px;
-            border-top: 1px solid #ddd;
-            color: #666;
-        }}
-        .btn {{
-            display: inline-block;
-            padding: 10px 20px;
-            background-color: #007bff;
-            color: white;
-            text-decoration: none;
-            border-radius: 5px;
-            margin: 10px 5px;
-        }}
-        .btn:hover {{
-            background-color: #0056b3;
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>ABZ Hardware</h1>
-        <p>Your Invoice is Ready</p>
-    </div>
-    
-    <div class="content">
-        <p>Dear {user_name},</p>
-        
-        <p>Your invoice for Order #{order_id} has been generated and is attached to this email.</p>
-        
-        <div class="invoice-info">
-            <h3>Invoice Details</h3>
-            <p><strong>Invoice Number:</strong> {invoice_number}</p>
-            <p><strong>Order Number:</strong> #{order_id}</p>
-            <p><strong>Date:</strong> {datetime.now().strftime('%B %d, %Y')}</p>
-        </div>
-        
-        <p>Please find your invoice attached to this email. You can also view and download it from your account.</p>
-        
-        <p>If you have any questions about this invoice, please don't hesitate to contact us.</p>
-        
-        <p>Thank you for choosing ABZ Hardware!</p>
-        
-        <div class="footer">
-            <p><strong>ABZ Hardware</strong></p>
-            <p>Your trusted partner for quality hardware solutions</p>
-        </div>
-    </div>
-</body>
-</html>
-        """.strip()
+        return render_email_template('invoice.html', user_name=user_name, order_id=order_id,
+                                     invoice_number=invoice_number)
     
     def _get_invoice_email_text(self, user_name: str, order_id: int, invoice_number: str) -> str:
         """Generate text content for invoice email"""
-        return f"""
-Dear {user_name},
-
-Your invoice for Order #{order_id} has been generated and is attached to this email.
-
-Invoice Details:
-- Invoice Number: {invoice_number}
-- Order Number: #{order_id}
-- Date: {datetime.now().strftime('%B %d, %Y')}
-
-Please find your invoice attached to this email. You can also view and download it from your account.
-
-If you have any questions about this invoice, please don't hesitate to contact us.
-
-Thank you for choosing ABZ Hardware!
-
-Best regards,
-ABZ Hardware Team
-        """.strip()
-
+        return render_email_template('invoice.txt', user_name=user_name, order_id=order_id,
+                                     invoice_number=invoice_number)
+    
     def _get_receipt_email_html(self, user_name: str, order_id: int, receipt_number: str, payment_amount: float) -> str:
         """Generate HTML content for receipt email"""
-        return f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Receipt #{receipt_number}</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .header {{
-            background-color: #28a745;
-            color: white;
-            padding: 20px;
-            text-align: center;
-            border-radius: 5px 5px 0 0;
-        }}
-        .content {{
-            background-color: #f8f9fa;
-            padding: 20px;
-            border-radius: 0 0 5px 5px;
-        }}
-        .receipt-info {{
-            background-color: white;
-            padding: 15px;
-            margin: 15px 0;
-            border-radius: 5px;
-            border-left: 4px solid #28a745;
-        }}
-        .footer {{
-            text-align: center;
-            margin-top: 20px;
-            padding-top: 20px;
-            border-top: 1px solid #ddd;
-            color: #666;
-        }}
-        .btn {{
-            display: inline-block;
-            padding: 10px 20px;
-            background-color: #28a745;
-            color: white;
-            text-decoration: none;
-            border-radius: 5px;
-            margin: 10px 5px;
-        }}
-        .btn:hover {{
-            background-color: #218838;
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>ABZ Hardware</h1>
-        <p>Your Receipt is Ready</p>
-    </div>
+        return render_email_template('receipt.html', user_name=user_name, order_id=order_id,
+                                     receipt_number=receipt_number, payment_amount=payment_amount)
     
-    <div class="content">
-        <p>Dear {user_name},</p>
-        
-        <p>Your receipt for Order #{order_id} has been generated and is attached to this email.</p>
-        
-        <div class="receipt-info">
-            <h3>Receipt Details</h3>
-            <p><strong>Receipt Number:</strong> {receipt_number}</p>
-            <p><strong>Order Number:</strong> #{order_id}</p>
-            <p><strong>Payment Amount:</strong> KSh{payment_amount:.2f}</p>
-            <p><strong>Date:</strong> {datetime.now().strftime('%B %d, %Y')}</p>
-        </div>
-        
-        <p>Please find your receipt attached to this email. You can also view and download it from your account.</p>
-        
-        <p>If you have any questions about this receipt, please don't hesitate to contact us.</p>
-        
-        <p>Thank you for choosing ABZ Hardware!</p>
-        
-        <div class="footer">
-            <p><strong>ABZ Hardware</strong></p>
-            <p>Your trusted partner for quality hardware solutions</p>
-        </div>
-    </div>
-</body>
-</html>
-        """.strip()
-
     def _get_receipt_email_text(self, user_name: str, order_id: int, receipt_number: str, payment_amount: float) -> str:
         """Generate text content for receipt email"""
-        return f"""
-Dear {user_name},
-
-Your receipt for Order #{order_id} has been generated and is attached to this email.
-
-Receipt Details:
-- Receipt Number: {receipt_number}
-- Order Number: #{order_id}
-- Payment Amount: KSh{payment_amount:.2f}
-- Date: {datetime.now().strftime('%B %d, %Y')}
-
-Please find your receipt attached to this email. You can also view and download it from your account.
-
-If you have any questions about this receipt, please don't hesitate to contact us.
-
-Thank you for choosing ABZ Hardware!
-
-Best regards,
-ABZ Hardware Team
-        """.strip()
+        return render_email_template('receipt.txt', user_name=user_name, order_id=order_id,
+                                     receipt_number=receipt_number, payment_amount=payment_amount)
 
 # Global email service instance
 email_service = None
 
-def init_email_service(api_key: str = None):
-    """Initialize the global email service"""
+def init_email_service(api_key: str = None, **options):
+    """Initialize the global email service; options are passed to BrevoEmailService"""
     global email_service
     try:
-        email_service = BrevoEmailService(api_key)
+        email_service = BrevoEmailService(api_key, **options)
         print("✅ Email service initialized successfully")
     except Exception as e:
         print(f"❌ Failed to initialize email service: {str(e)}")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Export invoices or quotations as a ZIP of PDFs or one merged PDF
+
+Same filters as /exports/pdf, without the per-user restriction:
+
+    python export_pdfs.py invoices --start 2025-01-01 --end 2025-01-31 --branch 2 -o january.zip
+    python export_pdfs.py quotations --start 2025-01-06 --format merged -o quotations.pdf
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app.pdf_export import (EXPORT_KINDS, EXPORT_FORMATS, parse_export_date, export_query, iter_documents,
+                            render_documents, iter_zip_chunks, with_progress, merged_pdf)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Export invoice or quotation PDFs')
+    parser.add_argument('kind', choices=EXPORT_KINDS)
+    parser.add_argument('--start', type=parse_export_date, help='first day, YYYY-MM-DD')
+    parser.add_argument('--end', type=parse_export_date, help='last day, YYYY-MM-DD')
+    parser.add_argument('--branch', type=int, help='branch id')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='zip')
+    parser.add_argument('--workers', type=int, help='render processes (default PDF_EXPORT_WORKERS)')
+    parser.add_argument('-o', '--output', required=True, help='file to write')
+    return parser.parse_args(argv)
+
+
+def export(args):
+    """Write the export to args.output; returns the number of documents"""
+    query = export_query(args.kind, args.start, args.end, args.branch)
+    total = query.order_by(None).count()
+    if not total:
+        print(f"No {args.kind} match the filters", file=sys.stderr)
+        return 0
+
+    def report(done, total):
+        print(f"Rendered {done}/{total} {args.kind}", file=sys.stderr)
+
+    with open(args.output, 'wb') as output:
+        if args.format == 'merged':
+            output.write(merged_pdf(with_progress(iter_documents(args.kind, query), total, report, every=50)))
+        else:
+            files = render_documents(iter_documents(args.kind, query),
+                                     workers=args.workers or app.config['PDF_EXPORT_WORKERS'])
+            for chunk in iter_zip_chunks(with_progress(files, total, report, every=10)):
+                output.write(chunk)
+    return total
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    with app.app_context():
+        count = export(arguments)
+    if count:
+        print(f"Exported {count} {arguments.kind} to {arguments.output}")
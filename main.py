@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request, render_template, redirect, url_for, flash, send_file, Response
+from flask import Flask, jsonify, request, render_template, redirect, url_for, flash, send_file, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash
 import json
@@ -9,7 +9,16 @@ from datetime import datetime
 from app import init_app, db, login_manager
 from app.models import *
 from app.decorators import sales_required
-from app.services import OrderService, StockService, AuthService, QuotationService
+from app.pagination import keyset_paginate, keyset_options
+from app.search import ensure_product_search_index, product_search_filter, product_search_rank
+from app.cache import (product_listing_cache, product_listing_cache_key, product_listing_generation,
+                       cache_product_listing, invalidate_product_listings)
+from app.executor import email_executor
+from app.jobs import job_owner_id
+from app.pdf_cache import pdf_cache, quotation_pdf_inputs
+from app.invoices import load_invoice_order, build_invoice
+from app.utils import conditional_json_response, json_etag, send_pdf
+from app.services import OrderService, StockService, AuthService, QuotationService, DashboardService, OrderListingService, ProductService
 
 # Import email service and config
 from email_service import get_email_service
@@ -69,6 +78,10 @@ def format_quantity(value):
 with app.app_context():
     db.create_all()
     print("✅ All tables created successfully in PostgreSQL.")
+    try:
+        ensure_product_search_index()
+    except Exception as e:
+        print(f"Warning: Could not create product search index, falling back to LIKE search: {str(e)}")
 
 # Authentication routes
 @app.route("/login", methods=['GET', 'POST'])
@@ -103,50 +116,10 @@ def logout():
 @app.route("/dashboard")
 @login_required
 def dashboard():
-    # Get summary statistics for walk-in orders only
-    
-    # Get all walk-in orders created by current user
-    walk_in_orders = Order.query.join(OrderType).filter(
-        OrderType.name.ilike('%walk%'),  # Match any order type containing 'walk'
-        Order.userid == current_user.id
-    ).all()
-    
-    # Calculate total revenue from APPROVED walk-in orders only
-    total_revenue = 0
-    for order in walk_in_orders:
-        if order.approvalstatus:  # Only count approved orders
-            for item in order.order_items:
-                if item.final_price is not None:
-                    total_revenue += float(item.quantity) * float(item.final_price)
-                elif item.branch_product and item.branch_product.sellingprice is not None:
-                    total_revenue += float(item.quantity) * float(item.branch_product.sellingprice)
-    
-    stats = {
-        'total_orders': len(walk_in_orders),
-        'pending_orders': len([o for o in walk_in_orders if not o.approvalstatus]),
-        'total_revenue': total_revenue,
-        'completed_orders': len([o for o in walk_in_orders if o.approvalstatus])
-    }
-    
-    # Get recent walk-in orders
-    recent_orders = walk_in_orders[:5]  # Get first 5 orders
-    recent_orders_data = []
-    for order in recent_orders:
-        # Calculate total amount for this order
-        total_amount = 0
-        for item in order.order_items:
-            if item.final_price is not None:
-                total_amount += float(item.quantity) * float(item.final_price)
-            elif item.branch_product and item.branch_product.sellingprice is not None:
-                total_amount += float(item.quantity) * float(item.branch_product.sellingprice)
-        
-        recent_orders_data.append({
-            'id': order.id,
-            'customer_name': f"{order.user.firstname} {order.user.lastname}",
-            'status': 'Approved' if order.approvalstatus else 'Pending',
-            'created_at': order.created_at.strftime('%Y-%m-%d %H:%M'),
-            'total_amount': total_amount
-        })
+    # Summary statistics and recent orders for the user's walk-in orders,
+    # aggregated in SQL so the page cost does not grow with sales history
+    stats = DashboardService.get_walk_in_stats(current_user.id)
+    recent_orders_data = DashboardService.get_recent_orders(current_user.id, limit=5)
     
     return render_template('dashboard.html', 
                          user=current_user, 
@@ -161,25 +134,8 @@ def orders_page():
     status = request.args.get('status', '')
     per_page = 20
 
-    # Only show walk-in orders for the current user
-    query = Order.query.join(OrderType).filter(
-        OrderType.name.ilike('%walk%'),
-        Order.userid == current_user.id
-    )
-    
-    # Apply status filters - be explicit about which table we're filtering
-    if status == 'pending':
-        query = query.filter(Order.approvalstatus == False)
-    elif status == 'approved':
-        query = query.filter(Order.approvalstatus == True)
-    
-    # Manual pagination for walk-in orders
-    total = query.count()
-    pages = (total + per_page - 1) // per_page
-    start = (page - 1) * per_page
-    end = start + per_page
-    orders_list = query.order_by(Order.created_at.desc()).offset(start).limit(per_page).all()
-    
+    use_keyset, cursor, with_total, approximate_total = keyset_options(request.args)
+
     class Pagination:
         def __init__(self, items, page, per_page, total, pages):
             self.items = items
@@ -194,45 +150,17 @@ def orders_page():
         def iter_pages(self):
             return range(1, self.pages + 1)
     
-    orders = Pagination(orders_list, page, per_page, total, pages)
-
-    orders_data = []
-    for order in orders_list:
-        order_items = []
-        for item in order.order_items:
-            # Get product name - use product_name field if available, otherwise fall back to product.name
-            if item.product_name:
-                product_name = item.product_name
-            elif item.branch_productid and item.branch_product:
-                product_name = item.branch_product.catalog_product.name
-            else:
-                product_name = "Manual Item"
-            
-            # Get product price - use original_price if available, otherwise fall back to product.sellingprice
-            if item.original_price is not None:
-                product_price = item.original_price
-            elif item.branch_productid and item.branch_product and item.branch_product.sellingprice is not None:
-                product_price = item.branch_product.sellingprice
-            else:
-                product_price = 0.0
-            
-            order_items.append({
-                'id': item.id,
-                'product_name': product_name,
-                'quantity': item.quantity,
-                'price': product_price
-            })
-        orders_data.append({
-            'id': order.id,
-            'customer_name': f"{order.user.firstname} {order.user.lastname}",
-            'order_type': order.ordertype.name,
-            'branch': order.branch.name,
-            'status': 'Approved' if order.approvalstatus else 'Pending',
-            'created_at': order.created_at.strftime('%Y-%m-%d %H:%M'),
-            'approved_at': order.approved_at.strftime('%Y-%m-%d %H:%M') if order.approved_at else None,
-            'items': order_items,
-            'created_by_me': order.userid == current_user.id
-        })
+    # Only show walk-in orders for the current user; relationships are eagerly
+    # loaded so a page costs a fixed number of queries
+    if use_keyset:
+        orders = OrderListingService.get_walk_in_orders_keyset_page(
+            current_user.id, status, cursor, per_page, with_total, approximate_total
+        )
+        orders_data = orders.items
+    else:
+        orders_data, total = OrderListingService.get_walk_in_orders_page(current_user.id, status, page, per_page)
+        pages = (total + per_page - 1) // per_page
+        orders = Pagination(orders_data, page, per_page, total, pages)
 
     # Get filter options
     order_types = OrderType.query.filter(OrderType.name.ilike('%walk%')).all()
@@ -244,141 +172,49 @@ def orders_page():
                          pagination=orders,
                          order_types=order_types,
                          branches=branches,
-                         current_status=status)
+                         current_status=status,
+                         current_total=request.args.get('total'))
 
 @app.route("/orders/<int:order_id>")
 @login_required
 def order_detail(order_id):
-    order = Order.query.get_or_404(order_id)
+    order = load_invoice_order(order_id)
     
     # Only allow access to walk-in orders created by current user
     if not order.ordertype.name.lower().startswith('walk') or order.userid != current_user.id:
         flash('Access denied. You can only view your own walk-in orders.', 'danger')
         return redirect(url_for('orders_page'))
     
+    invoice = build_invoice(order)
     order_data = {
         'id': order.id,
-        'customer_name': f"{order.user.firstname} {order.user.lastname}",
-        'customer_email': order.user.email,
+        'customer_name': invoice.customer_name,
+        'customer_email': invoice.customer_email,
         'order_type': order.ordertype.name,
-        'branch': order.branch.name,
+        'branch': invoice.branch,
         'status': 'Approved' if order.approvalstatus else 'Pending',
         'created_at': order.created_at.strftime('%Y-%m-%d %H:%M'),
         'approved_at': order.approved_at.strftime('%Y-%m-%d %H:%M') if order.approved_at else None,
-        'order_items': []
+        'order_items': invoice.order_items,
+        'total_amount': invoice.subtotal
     }
     
-    total_amount = 0
-    for item in order.order_items:
-        # Use final_price for calculations (includes negotiated prices)
-        if item.final_price is not None:
-            final_price = float(item.final_price)
-        elif item.branch_product and item.branch_product.sellingprice is not None:
-            final_price = float(item.branch_product.sellingprice)
-        else:
-            final_price = 0.0  # Fallback to zero if no price available
-        item_total = float(item.quantity) * final_price
-        total_amount += item_total
-        
-        # Handle original price
-        if item.original_price is not None:
-            original_price = float(item.original_price)
-        elif item.branch_product and item.branch_product.sellingprice is not None:
-            original_price = float(item.branch_product.sellingprice)
-        else:
-            original_price = 0.0
-        
-        # Handle final price for display
-        if item.final_price is not None:
-            display_final_price = float(item.final_price)
-        elif item.branch_productid and item.branch_product and item.branch_product.sellingprice is not None:
-            display_final_price = float(item.branch_product.sellingprice)
-        else:
-            display_final_price = 0.0
-        
-        # Get product name - use product_name field if available, otherwise fall back to product.name
-        if item.product_name:
-            product_name = item.product_name
-        elif item.branch_productid and item.branch_product:
-            product_name = item.branch_product.catalog_product.name
-        else:
-            product_name = "Manual Item"
-        
-        order_data['order_items'].append({
-            'id': item.id,
-            'product_name': product_name,
-            'quantity': item.quantity,
-            'original_price': original_price,
-            'negotiated_price': float(item.negotiated_price) if item.negotiated_price else None,
-            'final_price': display_final_price,
-            'total': item_total
-        })
-    
-    order_data['total_amount'] = total_amount
-    
     return render_template('order_detail.html', 
                           user=current_user, 
                           order=order_data)
 
-@app.route("/orders/<int:order_id>/invoice")
-@login_required
-def view_order_invoice(order_id):
-    """Generate PDF invoice for a specific order"""
-    from app.pdf_utils import create_receipt_pdf, generate_receipt_filename
-    from datetime import datetime
-    import tempfile
-    import os
+def send_order_invoice(order_id, download=False):
+    """A4 invoice PDF of one of the current user's walk-in orders, as an attachment if download is set"""
+    from app.pdf_utils import create_invoice_pdf_a4
     
-    order = Order.query.get_or_404(order_id)
+    order = load_invoice_order(order_id)
     
     # Only allow access to walk-in orders created by current user
     if not order.ordertype.name.lower().startswith('walk') or order.userid != current_user.id:
         flash('Access denied. You can only view invoices for your own walk-in orders.', 'danger')
         return redirect(url_for('orders_page'))
     
-    # Prepare invoice data
-    invoice_data = {
-        'invoice_number': f"INV-{order.id:06d}",
-        'order_id': order.id,
-        'customer_name': f"{order.user.firstname} {order.user.lastname}",
-        'customer_email': order.user.email,
-        'customer_phone': order.user.phone if hasattr(order.user, 'phone') else 'N/A',
-        'branch': order.branch.name,
-        'order_date': order.created_at.strftime('%B %d, %Y'),
-        'order_time': order.created_at.strftime('%I:%M %p'),
-        'order_items': [],
-        'subtotal': 0
-    }
-    
-    # Calculate totals and prepare items
-    for item in order.order_items:
-        # Use final_price for calculations (includes negotiated prices)
-        if item.final_price is not None:
-            final_price = float(item.final_price)
-        elif item.branch_productid and item.branch_product and item.branch_product.sellingprice is not None:
-            final_price = float(item.branch_product.sellingprice)
-        else:
-            final_price = 0.0
-        
-        item_total = float(item.quantity) * final_price
-        invoice_data['subtotal'] += item_total
-        
-        # Get product name - use product_name field if available, otherwise fall back to product.name
-        if item.product_name:
-            product_name = item.product_name
-        elif item.branch_productid and item.branch_product:
-            product_name = item.branch_product.catalog_product.name
-        else:
-            product_name = "Manual Item"
-        
-        invoice_data['order_items'].append({
-            'product_name': product_name,
-            'quantity': item.quantity,
-            'unit_price': final_price,
-            'total': item_total
-        })
-    
-    # Prepare user data
+    invoice = build_invoice(order)
     user_data = {
         'firstname': current_user.firstname,
         'lastname': current_user.lastname,
@@ -386,121 +222,29 @@ def view_order_invoice(order_id):
     }
     
     try:
-        # Create temporary file for PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            pdf_path = tmp_file.name
-        
-        # Generate PDF using dedicated invoice function
-        from app.pdf_utils import create_invoice_pdf_a4
-        
-        create_invoice_pdf_a4(invoice_data, user_data, pdf_path)
-        
-        # Return PDF file
-        return send_file(
-            pdf_path,
-            as_attachment=True,
-            download_name=f"invoice_INV-{order.id:06d}.pdf",
-            mimetype='application/pdf'
+        # Generate PDF once per distinct invoice content
+        pdf_data, etag = pdf_cache.get_or_render(
+            'invoice', order.id, {'invoice': invoice, 'user': user_data},
+            lambda buffer: create_invoice_pdf_a4(invoice, user_data, buffer)
         )
+        download_name = f"invoice_{invoice.invoice_number}.pdf" if download else None
+        return send_pdf(pdf_data, etag, download_name=download_name)
         
     except Exception as e:
         flash(f'Error generating PDF: {str(e)}', 'danger')
         return redirect(url_for('orders_page'))
-    
-    finally:
-        # Clean up temporary file
-        if 'pdf_path' in locals() and os.path.exists(pdf_path):
-            try:
-                os.unlink(pdf_path)
-            except:
-                pass
+
+@app.route("/orders/<int:order_id>/invoice")
+@login_required
+def view_order_invoice(order_id):
+    """Download the PDF invoice for a specific order"""
+    return send_order_invoice(order_id, download=True)
 
 @app.route("/orders/<int:order_id>/invoice/view")
 @login_required
 def view_order_invoice_browser(order_id):
     """View PDF invoice in browser for a specific order"""
-    from app.pdf_utils import create_receipt_pdf
-    import tempfile
-    import os
-    
-    order = Order.query.get_or_404(order_id)
-    
-    # Only allow access to walk-in orders created by current user
-    if not order.ordertype.name.lower().startswith('walk') or order.userid != current_user.id:
-        flash('Access denied. You can only view invoices for your own walk-in orders.', 'danger')
-        return redirect(url_for('orders_page'))
-    
-    # Prepare invoice data
-    invoice_data = {
-        'invoice_number': f"INV-{order.id:06d}",
-        'order_id': order.id,
-        'customer_name': f"{order.user.firstname} {order.user.lastname}",
-        'customer_email': order.user.email,
-        'customer_phone': order.user.phone if hasattr(order.user, 'phone') else 'N/A',
-        'branch': order.branch.name,
-        'order_date': order.created_at.strftime('%B %d, %Y'),
-        'order_time': order.created_at.strftime('%I:%M %p'),
-        'order_items': [],
-        'subtotal': 0
-    }
-    
-    # Calculate totals and prepare items
-    for item in order.order_items:
-        # Use final_price for calculations (includes negotiated prices)
-        if item.final_price is not None:
-            final_price = float(item.final_price)
-        elif item.original_price is not None:
-            final_price = float(item.original_price)
-        elif item.branch_product and item.branch_product.sellingprice is not None:
-            final_price = float(item.branch_product.sellingprice)
-        else:
-            final_price = 0.0
-        
-        item_total = float(item.quantity) * final_price
-        invoice_data['subtotal'] += item_total
-        
-        invoice_data['order_items'].append({
-            'product_name': item.product_name if item.product_name else (item.branch_product.catalog_product.name if item.branch_product else 'Manual Item'),
-            'quantity': item.quantity,
-            'unit_price': final_price,
-            'total': item_total
-        })
-    
-    # Prepare user data
-    user_data = {
-        'firstname': current_user.firstname,
-        'lastname': current_user.lastname,
-        'email': current_user.email
-    }
-    
-    try:
-        # Create temporary file for PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            pdf_path = tmp_file.name
-        
-        # Generate PDF using dedicated invoice function
-        from app.pdf_utils import create_invoice_pdf_a4
-        
-        create_invoice_pdf_a4(invoice_data, user_data, pdf_path)
-        
-        # Return PDF file for browser viewing
-        return send_file(
-            pdf_path,
-            as_attachment=False,
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        flash(f'Error generating PDF: {str(e)}', 'danger')
-        return redirect(url_for('orders_page'))
-    
-    finally:
-        # Clean up temporary file
-        if 'pdf_path' in locals() and os.path.exists(pdf_path):
-            try:
-                os.unlink(pdf_path)
-            except:
-                pass
+    return send_order_invoice(order_id)
 
 # Order Creation
 @app.route("/orders/create", methods=['GET', 'POST'])
@@ -562,16 +306,14 @@ def create_order():
         flash('Walk-in order type not found. Please contact administrator.', 'danger')
         return redirect(url_for('orders_page'))
     
+    # Products are fetched per branch from /api/products, not embedded in the page
     branches = Branch.query.all()
-    from app.models import BranchProduct, ProductCatalog
-    products = BranchProduct.query.join(ProductCatalog).filter(BranchProduct.display == True).all()
-    subcategories = SubCategory.query.all()
+    subcategories = SubCategory.query.options(db.joinedload(SubCategory.category)).all()
     
     return render_template('create_order.html',
                          user=current_user,
                          walk_in_order_type_id=walk_in_order_type.id,
                          branches=branches,
-                         products=products,
                          subcategories=subcategories)
 
 @app.route("/orders/<int:order_id>/edit", methods=['GET', 'POST'])
@@ -669,16 +411,14 @@ def edit_order(order_id):
             'negotiation_notes': item.negotiation_notes
         })
     
+    # Products are fetched per branch from /api/products, not embedded in the page
     branches = Branch.query.all()
-    from app.models import BranchProduct, ProductCatalog
-    products = BranchProduct.query.join(ProductCatalog).filter(BranchProduct.display == True).all()
-    subcategories = SubCategory.query.all()
+    subcategories = SubCategory.query.options(db.joinedload(SubCategory.category)).all()
     
     return render_template('edit_order.html',
                          user=current_user,
                          order=order_data,
                          branches=branches,
-                         products=products,
                          subcategories=subcategories)
 
 @app.route("/orders/<int:order_id>/delete", methods=['POST'])
@@ -737,6 +477,88 @@ def delete_order(order_id):
         flash(f'Error deleting order: {str(e)}', 'danger')
         return redirect(url_for('orders_page'))
 
+def parse_id(value):
+    """An integer id from JSON, or None for anything else (booleans, floats, non-numeric strings)"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+@app.route("/orders/bulk-approve", methods=['POST'])
+@login_required
+def bulk_approve_orders():
+    """Approve many orders at once; online orders need {order_id: {item_id: branch_id}} selections"""
+    # Approval deducts stock and emails invoices, so it is for admins and only in their branches
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Access denied. Admin role required.'}), 403
+    
+    try:
+        data = request.get_json(silent=True)
+        order_ids = (data.get('order_ids') if isinstance(data, dict) else None) or []
+        if not isinstance(order_ids, list) or not order_ids:
+            return jsonify({'success': False, 'message': 'No orders selected'}), 400
+        order_ids = [parse_id(order_id) for order_id in order_ids]
+        if None in order_ids:
+            return jsonify({'success': False, 'message': 'Order ids must be integers'}), 400
+        
+        branch_selections = data.get('branch_selections') or {}
+        if not isinstance(branch_selections, dict) or not all(
+            parse_id(order_id) is not None and isinstance(selections, dict)
+            and all(parse_id(item_id) is not None and parse_id(branch_id) is not None
+                    for item_id, branch_id in selections.items())
+            for order_id, selections in branch_selections.items()
+        ):
+            return jsonify({'success': False, 'message': 'Invalid branch selections'}), 400
+        branch_selections = {parse_id(order_id): {item_id: parse_id(branch_id) for item_id, branch_id in selections.items()}
+                             for order_id, selections in branch_selections.items()}
+        
+        # Orders outside the caller's branches, or drawing stock from them, are left alone
+        denied = set()
+        for order_id, branch_id in db.session.query(Order.id, Order.branchid).filter(Order.id.in_(order_ids)):
+            selected_branches = (branch_selections.get(order_id) or {}).values()
+            if not all(current_user.has_branch_access(branch) for branch in [branch_id, *selected_branches]):
+                denied.add(order_id)
+        
+        results = OrderService.bulk_approve_orders([order_id for order_id in order_ids if order_id not in denied],
+                                                   current_user, branch_selections)
+        results.update({order_id: (False, 'Access denied', None) for order_id in denied})
+        approved = [order_id for order_id, (success, _, _) in results.items() if success]
+        
+        return jsonify({
+            'success': len(approved) > 0,
+            'message': f'Approved {len(approved)} of {len(results)} orders',
+            'results': [{'order_id': order_id, 'success': success, 'message': message, 'job_id': job_id}
+                        for order_id, (success, message, job_id) in sorted(results.items())]
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route("/jobs/<int:job_id>")
+@login_required
+def job_status(job_id):
+    """Poll a background job, e.g. the invoice email queued by an approval"""
+    job = Job.query.get_or_404(job_id)
+    # Errors can name customer addresses, so only the user who queued the job sees it
+    if job_owner_id(job) != current_user.id:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({
+        'success': True,
+        'job': {
+            'id': job.id,
+            'kind': job.kind,
+            'status': job.status,
+            'attempts': job.attempts,
+            'max_attempts': job.max_attempts,
+            'last_error': job.last_error,
+            'run_at': job.run_at.isoformat() if job.run_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None
+        }
+    })
+
 # Product Management Routes
 @app.route("/products")
 @login_required
@@ -746,51 +568,40 @@ def products_page():
     branch = request.args.get('branch', '')
     search = request.args.get('search', '')
     
-    from app.models import BranchProduct, ProductCatalog, SubCategory, Category
-    query = BranchProduct.query.join(ProductCatalog)
-    
-    if category:
-        query = query.join(SubCategory).join(Category).filter(Category.name == category)
-    if branch:
-        query = query.join(Branch).filter(Branch.name == branch)
-    if search:
-        from sqlalchemy import or_
-        # More flexible search across multiple columns
-        search_filter = or_(
-            ProductCatalog.name.ilike(f'%{search}%'),
-            ProductCatalog.productcode.ilike(f'%{search}%'),
-            BranchProduct.buyingprice.cast(db.String).ilike(f'%{search}%'),
-            BranchProduct.sellingprice.cast(db.String).ilike(f'%{search}%'),
-            BranchProduct.stock.cast(db.String).ilike(f'%{search}%')
+    # Catalog, category and branch names are resolved in one outer-joined query
+    query = ProductService.product_rows_query(category=category, branch=branch, search=search)
+    
+    use_keyset, cursor, with_total, approximate_total = keyset_options(request.args)
+    if use_keyset:
+        products = keyset_paginate(
+            query,
+            (ProductCatalog.name, BranchProduct.id),
+            key=lambda row: (row.name, row.id),
+            cursor=cursor,
+            per_page=20,
+            with_total=with_total,
+            approximate_total=approximate_total
         )
-        query = query.filter(search_filter)
-    
-    products = query.paginate(page=page, per_page=20, error_out=False)
+    else:
+        products = query.order_by(ProductCatalog.name.asc(), BranchProduct.id.asc()).paginate(page=page, per_page=20, error_out=False)
     
     products_data = []
-    for branch_product in products.items:
-        # Get category name through catalog -> subcategory -> category relationship
-        category_name = 'Uncategorized'
-        if branch_product.catalog_product.subcategory_id:
-            subcategory = SubCategory.query.get(branch_product.catalog_product.subcategory_id)
-            if subcategory and subcategory.category:
-                category_name = subcategory.category.name
-        
+    for row in products.items:
         products_data.append({
-            'id': branch_product.id,
-            'name': branch_product.catalog_product.name,
-            'category': category_name,
-            'branch': branch_product.branch.name,
-            'buying_price': branch_product.buyingprice,
-            'selling_price': branch_product.sellingprice,
-            'stock': branch_product.stock,
-            'product_code': branch_product.catalog_product.productcode,
-            'display': branch_product.display,
-            'image_url': branch_product.catalog_product.image_url
+            'id': row.id,
+            'name': row.name,
+            'category': row.category_name,
+            'branch': row.branch_name,
+            'buying_price': row.buyingprice,
+            'selling_price': row.sellingprice,
+            'stock': row.stock,
+            'product_code': row.productcode,
+            'display': row.display,
+            'image_url': row.image_url
         })
     
     # Get filter options
-    subcategories = SubCategory.query.all()
+    subcategories = SubCategory.query.options(db.joinedload(SubCategory.category)).all()
     branches = Branch.query.all()
     
     return render_template('products.html', 
@@ -801,102 +612,59 @@ def products_page():
                          branches=branches,
                          current_category=category,
                          current_branch=branch,
-                         current_search=search)
+                         current_search=search,
+                         current_total=request.args.get('total'))
 
 @app.route("/products/export")
 @login_required
 def export_products():
-    """Export products to CSV"""
-    import csv
-    from io import StringIO
+    """Export products to CSV or TSV, streamed in chunks (optionally gzip-compressed)"""
+    from app.utils import iter_delimited_chunks, iter_gzip_chunks
     
     # Get filter parameters
     category = request.args.get('category', '')
     branch = request.args.get('branch', '')
     search = request.args.get('search', '')
-    
-    # Build query with same filters as products page
-    from app.models import BranchProduct, ProductCatalog
-    query = BranchProduct.query.join(ProductCatalog)
-    
-    if category:
-        query = query.join(SubCategory).join(Category).filter(Category.name == category)
-    if branch:
-        query = query.join(Branch).filter(Branch.name == branch)
-    if search:
-        from sqlalchemy import or_
-        # More flexible search across multiple columns
-        search_filter = or_(
-            ProductCatalog.name.ilike(f'%{search}%'),
-            ProductCatalog.productcode.ilike(f'%{search}%'),
-            BranchProduct.buyingprice.cast(db.String).ilike(f'%{search}%'),
-            BranchProduct.sellingprice.cast(db.String).ilike(f'%{search}%'),
-            BranchProduct.stock.cast(db.String).ilike(f'%{search}%')
-        )
-        query = query.filter(search_filter)
-    
-    # Get all products (no pagination for export)
-    products = query.all()
-    
-    # Create CSV data
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['ID', 'Name', 'Product Code', 'Category', 'Branch', 'Buying Price', 'Selling Price', 'Stock', 'Status'])
-    
-    # Write data rows
-    for branch_product in products:
-        category_name = 'Uncategorized'
-        if branch_product.catalog_product.subcategory_id:
-            from app.models import SubCategory, Category
-            subcategory = SubCategory.query.get(branch_product.catalog_product.subcategory_id)
-            if subcategory and subcategory.category:
-                category_name = subcategory.category.name
-        status = 'Active' if branch_product.display else 'Hidden'
-        
-        writer.writerow([
-            branch_product.id,
-            branch_product.catalog_product.name,
-            branch_product.catalog_product.productcode or '',
-            category_name,
-            branch_product.branch.name,
-            branch_product.buyingprice or 0,
-            branch_product.sellingprice or 0,
-            branch_product.stock or 0,
-            status
-        ])
-    
-    # Prepare response
-    output.seek(0)
+    export_format = 'tsv' if request.args.get('format') == 'tsv' else 'csv'
+    compress = request.args.get('compress') == 'gzip'
+    
+    # Build query with same filters as products page; rows are fetched in
+    # batches through a server-side cursor instead of loading them all
+    query = ProductService.product_rows_query(category=category, branch=branch, search=search)
+    rows = query.order_by(ProductCatalog.name.asc(), BranchProduct.id.asc()).yield_per(1000)
+    
+    def export_rows():
+        for row in rows:
+            yield [
+                row.id,
+                row.name,
+                row.productcode or '',
+                row.category_name,
+                row.branch_name,
+                row.buyingprice or 0,
+                row.sellingprice or 0,
+                row.stock or 0,
+                'Active' if row.display else 'Hidden'
+            ]
+    
+    header = ['ID', 'Name', 'Product Code', 'Category', 'Branch', 'Buying Price', 'Selling Price', 'Stock', 'Status']
+    chunks = iter_delimited_chunks(header, export_rows(), delimiter='\t' if export_format == 'tsv' else ',')
     
     # Generate filename with timestamp
-    from datetime import datetime
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"products_export_{timestamp}.csv"
-    
-    # Create temporary file
-    import tempfile
-    import os
-    
-    try:
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8') as tmp_file:
-            tmp_file.write(output.getvalue())
-            tmp_file_path = tmp_file.name
-        
-        return send_file(
-            tmp_file_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='text/csv'
-        )
-    finally:
-        # Clean up temporary file after sending
-        if 'tmp_file_path' in locals() and os.path.exists(tmp_file_path):
-            try:
-                os.unlink(tmp_file_path)
-            except:
-                pass
+    filename = f"products_export_{timestamp}.{export_format}"
+    mimetype = 'text/tab-separated-values' if export_format == 'tsv' else 'text/csv'
+    
+    if compress:
+        chunks = iter_gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
 @app.route("/products/<int:product_id>/edit", methods=['GET', 'POST'])
 @login_required
@@ -921,6 +689,8 @@ def edit_product(product_id):
             branch_product.updated_at = datetime.utcnow()
             
             db.session.commit()
+            # Catalog names and categories are shared by every branch
+            invalidate_product_listings()
             flash('Product updated successfully!', 'success')
             return redirect(url_for('products_page'))
             
@@ -943,41 +713,33 @@ def stock_page():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
     
-    from app.models import BranchProduct, ProductCatalog, SubCategory, Category
-    query = BranchProduct.query.join(ProductCatalog)
-    
-    if search:
-        from sqlalchemy import or_
-        # More flexible search across multiple columns
-        search_filter = or_(
-            ProductCatalog.name.ilike(f'%{search}%'),
-            ProductCatalog.productcode.ilike(f'%{search}%'),
-            BranchProduct.buyingprice.cast(db.String).ilike(f'%{search}%'),
-            BranchProduct.sellingprice.cast(db.String).ilike(f'%{search}%'),
-            BranchProduct.stock.cast(db.String).ilike(f'%{search}%')
+    query = ProductService.product_rows_query(search=search)
+    
+    use_keyset, cursor, with_total, approximate_total = keyset_options(request.args)
+    if use_keyset:
+        products = keyset_paginate(
+            query,
+            (ProductCatalog.name, BranchProduct.id),
+            key=lambda row: (row.name, row.id),
+            cursor=cursor,
+            per_page=20,
+            with_total=with_total,
+            approximate_total=approximate_total
         )
-        query = query.filter(search_filter)
-    
-    products = query.paginate(page=page, per_page=20, error_out=False)
+    else:
+        products = query.order_by(ProductCatalog.name.asc(), BranchProduct.id.asc()).paginate(page=page, per_page=20, error_out=False)
     
     # Process products data to match template expectations
     products_data = []
-    for branch_product in products.items:
-        # Get category name through catalog -> subcategory -> category relationship
-        category_name = 'Uncategorized'
-        if branch_product.catalog_product.subcategory_id:
-            subcategory = SubCategory.query.get(branch_product.catalog_product.subcategory_id)
-            if subcategory and subcategory.category:
-                category_name = subcategory.category.name
-        
+    for row in products.items:
         products_data.append({
-            'id': branch_product.id,
-            'name': branch_product.catalog_product.name,
-            'productcode': branch_product.catalog_product.productcode,
-            'stock': branch_product.stock,
+            'id': row.id,
+            'name': row.name,
+            'productcode': row.productcode,
+            'stock': row.stock,
             'sub_category': {
                 'category': {
-                    'name': category_name
+                    'name': row.category_name
                 }
             }
         })
@@ -986,7 +748,8 @@ def stock_page():
                          user=current_user, 
                          products=products_data,
                          pagination=products,
-                         current_search=search)
+                         current_search=search,
+                         current_total=request.args.get('total'))
 
 @app.route("/stock/add", methods=['POST'])
 @login_required
@@ -999,7 +762,7 @@ def add_stock():
         
         success, new_stock = StockService.add_stock(
             int(data['product_id']),
-            int(data['quantity']),
+            StockService.parse_quantity(data['quantity']),
             current_user,
             data.get('notes')
         )
@@ -1033,7 +796,7 @@ def remove_stock():
         
         success, new_stock = StockService.remove_stock(
             int(data['product_id']),
-            int(data['quantity']),
+            StockService.parse_quantity(data['quantity']),
             current_user,
             data.get('notes')
         )
@@ -1056,16 +819,67 @@ def remove_stock():
         flash(f'Error removing stock: {str(e)}', 'danger')
         return redirect(url_for('stock_page'))
 
+@app.route("/stock/bulk", methods=['POST'])
+@login_required
+def bulk_adjust_stock():
+    """Apply many stock additions/removals in one transaction from JSON lines or a CSV upload"""
+    try:
+        if request.is_json:
+            data = request.get_json()
+            # Accept either a bare array of lines or {"lines": [...], "notes": "..."}
+            if isinstance(data, list):
+                lines, notes = data, None
+            else:
+                lines, notes = data.get('lines', []), data.get('notes')
+        elif 'file' in request.files:
+            # CSV columns: product_id, quantity, action (add/remove), notes
+            import csv
+            from io import StringIO
+            content = request.files['file'].read().decode('utf-8-sig')
+            lines = list(csv.DictReader(StringIO(content)))
+            notes = request.form.get('notes')
+        else:
+            return jsonify({'success': False, 'message': 'Send a JSON array of lines or a CSV file'}), 400
+        
+        if not isinstance(lines, list) or not lines:
+            return jsonify({'success': False, 'message': 'No stock lines provided'}), 400
+        
+        success, results = StockService.bulk_adjust(lines, current_user, notes)
+        
+        if success:
+            message = f'Applied {len(results)} stock adjustments'
+        else:
+            failed = len([result for result in results if not result['success']])
+            message = f'No stock was changed: {failed} of {len(results)} lines failed'
+        
+        return jsonify({'success': success, 'message': message, 'results': results})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 # API Routes for AJAX
 @app.route("/api/products")
 @login_required
 def api_products():
     try:
         category_id = request.args.get('category_id', type=int)
+        subcategory_id = request.args.get('subcategory_id', type=int)
         branch_id = request.args.get('branch_id', type=int)
         search = request.args.get('search', '').strip()
-        # Cache key for simple request caching
-        cache_key = f"products_{branch_id}_{category_id}_{search}"
+        # Optional paging for forms that fetch products on demand
+        limit = request.args.get('limit', type=int)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        if limit is not None:
+            limit = min(max(limit, 1), 500)
+        
+        # Repeated searches are answered from the product listing cache
+        cache_key = product_listing_cache_key(branch_id, category_id, search, subcategory_id, limit, offset)
+        cached = product_listing_cache.get(cache_key)
+        if cached is not None:
+            etag, body = cached
+            return conditional_json_response(body=body, etag=etag)
+        # A stock change during the query makes this listing stale; it is then not cached
+        generation = product_listing_generation(branch_id)
     
         # Start with base query - optimized for performance
         from app.models import BranchProduct, ProductCatalog
@@ -1096,22 +910,19 @@ def api_products():
             subcategory_ids = select(SubCategory.id).where(SubCategory.category_id == category_id)
             catalog_ids = select(ProductCatalog.id).where(ProductCatalog.subcategory_id.in_(subcategory_ids))
             query = query.filter(BranchProduct.catalog_id.in_(catalog_ids))
+        if subcategory_id:
+            query = query.filter(ProductCatalog.subcategory_id == subcategory_id)
     
-        # Apply search if provided
-        if search:
-            from sqlalchemy import or_
-            # More flexible search across multiple columns
-            search_filter = or_(
-                ProductCatalog.name.ilike(f'%{search}%'),
-                ProductCatalog.productcode.ilike(f'%{search}%'),
-                BranchProduct.buyingprice.cast(db.String).ilike(f'%{search}%'),
-                BranchProduct.sellingprice.cast(db.String).ilike(f'%{search}%'),
-                BranchProduct.stock.cast(db.String).ilike(f'%{search}%')
-            )
-            query = query.filter(search_filter)
+        # Apply search if provided; matches come back best first
+        search_filter = product_search_filter(search)
+        if search_filter is not None:
+            query = query.filter(search_filter).order_by(product_search_rank(search).desc())
         
         # Execute query with ordering
-        products = query.order_by(ProductCatalog.name.asc()).all()
+        query = query.order_by(ProductCatalog.name.asc(), BranchProduct.id.asc())
+        if limit is not None:
+            query = query.offset(offset).limit(limit)
+        products = query.all()
     
         # Convert to JSON-serializable format (optimized for selected fields)
         result = []
@@ -1125,12 +936,33 @@ def api_products():
                 'product_code': product.productcode or ''
             })
         
-        return jsonify(result)
+        body = json.dumps(result)
+        etag = json_etag(body)
+        cache_product_listing(cache_key, generation, (etag, body))
+        return conditional_json_response(body=body, etag=etag)
         
     except Exception as e:
         app.logger.error(f"Error in api_products: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route("/api/products/cache-stats")
+@login_required
+def api_products_cache_stats():
+    """Hit/miss counters of the product listing cache for monitoring"""
+    return jsonify(product_listing_cache.stats())
+
+@app.route("/api/pdf-cache/stats")
+@login_required
+def api_pdf_cache_stats():
+    """Hit/miss counters and disk usage of the rendered PDF cache"""
+    return jsonify(pdf_cache.stats())
+
+@app.route("/api/background/stats")
+@login_required
+def api_background_stats():
+    """Queue depth, latency and failure counters of the background email pool"""
+    return jsonify(email_executor.stats())
+
 @app.route("/api/quotation/<int:quotation_id>/items")
 @login_required
 def api_quotation_items(quotation_id):
@@ -1151,7 +983,7 @@ def api_quotation_items(quotation_id):
                 'unit_price': float(item.unit_price)
             })
         
-        return jsonify({
+        return conditional_json_response({
             'success': True,
             'items': items
         })
@@ -1164,31 +996,31 @@ def api_quotation_items(quotation_id):
 @app.route("/categories")
 @login_required
 def get_categories():
-    categories = Category.query.all()
-    return jsonify([{
+    categories = Category.query.order_by(Category.id).all()
+    return conditional_json_response([{
         'id': cat.id,
         'name': cat.name,
         'description': cat.description
-    } for cat in categories])
+    } for cat in categories], max_age=300)
 
 @app.route("/branches")
 @login_required
 def get_branches():
-    branches = Branch.query.all()
-    return jsonify([{
+    branches = Branch.query.order_by(Branch.id).all()
+    return conditional_json_response([{
         'id': branch.id,
         'name': branch.name,
         'location': branch.location
-    } for branch in branches])
+    } for branch in branches], max_age=300)
 
 @app.route("/order-types")
 @login_required
 def get_order_types():
-    order_types = OrderType.query.all()
-    return jsonify([{
+    order_types = OrderType.query.order_by(OrderType.id).all()
+    return conditional_json_response([{
         'id': ot.id,
         'name': ot.name
-    } for ot in order_types])
+    } for ot in order_types], max_age=300)
 
 @app.route("/")
 def index():
@@ -1216,14 +1048,28 @@ def quotations_page():
     if current_user.role != 'admin':
         query = query.filter_by(created_by=current_user.id)
     
-    quotations = query.order_by(Quotation.created_at.desc()).paginate(page=page, per_page=20, error_out=False)
+    use_keyset, cursor, with_total, approximate_total = keyset_options(request.args)
+    if use_keyset:
+        quotations = keyset_paginate(
+            query,
+            (Quotation.created_at, Quotation.id),
+            key=lambda quotation: (quotation.created_at, quotation.id),
+            cursor=cursor,
+            per_page=20,
+            descending=True,
+            with_total=with_total,
+            approximate_total=approximate_total
+        )
+    else:
+        quotations = query.order_by(Quotation.created_at.desc()).paginate(page=page, per_page=20, error_out=False)
     
     return render_template('quotations.html',
                          user=current_user,
                          quotations=quotations.items,
                          pagination=quotations,
                          current_status=status,
-                         current_search=search)
+                         current_search=search,
+                         current_total=request.args.get('total'))
 
 @app.route("/quotations/create", methods=['GET', 'POST'])
 @login_required
@@ -1279,15 +1125,13 @@ def create_quotation():
             return redirect(url_for('create_quotation'))
     
     # GET request - show form
+    # Products are fetched per branch from /api/products, not embedded in the page
     branches = Branch.query.all()
-    from app.models import BranchProduct, ProductCatalog
-    products = BranchProduct.query.join(ProductCatalog).filter(BranchProduct.display == True).all()
-    subcategories = SubCategory.query.all()
+    subcategories = SubCategory.query.options(db.joinedload(SubCategory.category)).all()
     
     return render_template('create_quotation.html',
                          user=current_user,
                          branches=branches,
-                         products=products,
                          subcategories=subcategories)
 
 @app.route("/quotations/<int:quotation_id>")
@@ -1316,37 +1160,21 @@ def view_quotation_pdf(quotation_id):
         flash('Access denied', 'danger')
         return redirect(url_for('quotations_page'))
     
-    # Generate PDF for quotation
+    # Generate PDF for quotation, once per distinct quotation content
     from app.pdf_utils import create_quotation_pdf_a4
-    import tempfile
-    import os
     
     try:
-        # Create temporary file for PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            pdf_path = tmp_file.name
-        
-        # Generate PDF
-        create_quotation_pdf_a4(quotation, current_user, pdf_path)
+        pdf_data, etag = pdf_cache.get_or_render(
+            'quotation', quotation.id, quotation_pdf_inputs(quotation, current_user),
+            lambda buffer: create_quotation_pdf_a4(quotation, current_user, buffer)
+        )
         
         # Return PDF file for browser viewing
-        return send_file(
-            pdf_path,
-            as_attachment=False,
-            mimetype='application/pdf'
-        )
+        return send_pdf(pdf_data, etag)
         
     except Exception as e:
         flash(f'Error generating PDF: {str(e)}', 'danger')
         return redirect(url_for('quotation_detail', quotation_id=quotation_id))
-    
-    finally:
-        # Clean up temporary file
-        if 'pdf_path' in locals() and os.path.exists(pdf_path):
-            try:
-                os.unlink(pdf_path)
-            except:
-                pass
 
 @app.route("/quotations/<int:quotation_id>/pdf/download")
 @login_required
@@ -1359,38 +1187,80 @@ def download_quotation_pdf(quotation_id):
         flash('Access denied', 'danger')
         return redirect(url_for('quotations_page'))
     
-    # Generate PDF for quotation
+    # Generate PDF for quotation, once per distinct quotation content
     from app.pdf_utils import create_quotation_pdf_a4
-    import tempfile
-    import os
     
     try:
-        # Create temporary file for PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            pdf_path = tmp_file.name
-        
-        # Generate PDF
-        create_quotation_pdf_a4(quotation, current_user, pdf_path)
+        pdf_data, etag = pdf_cache.get_or_render(
+            'quotation', quotation.id, quotation_pdf_inputs(quotation, current_user),
+            lambda buffer: create_quotation_pdf_a4(quotation, current_user, buffer)
+        )
         
         # Return PDF file for download
-        return send_file(
-            pdf_path,
-            as_attachment=True,
-            download_name=f"quotation_{quotation.quotation_number}.pdf",
-            mimetype='application/pdf'
-        )
+        return send_pdf(pdf_data, etag, download_name=f"quotation_{quotation.quotation_number}.pdf")
         
     except Exception as e:
         flash(f'Error generating PDF: {str(e)}', 'danger')
         return redirect(url_for('quotation_detail', quotation_id=quotation_id))
+
+@app.route("/exports/pdf")
+@login_required
+def export_pdfs():
+    """
+    Export invoices or quotations as a ZIP of PDFs or one merged PDF
+    
+    Filters: kind (invoices/quotations), start and end (YYYY-MM-DD, inclusive)
+    and branch_id. ZIP archives are streamed while the PDFs are rendered in a
+    process pool; X-Export-Documents tells the client how many files to expect.
+    """
+    from app.pdf_export import (EXPORT_KINDS, EXPORT_FORMATS, parse_export_date, export_query, iter_documents,
+                                render_documents, iter_zip_chunks, with_progress, merged_pdf, pdf_render_pool)
+    
+    kind = request.args.get('kind', 'invoices')
+    export_format = request.args.get('format', 'zip')
+    if kind not in EXPORT_KINDS or export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': 'kind must be invoices or quotations and format zip or merged'}), 400
+    try:
+        start_date = parse_export_date(request.args.get('start'))
+        end_date = parse_export_date(request.args.get('end'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    query = export_query(kind, start_date, end_date, request.args.get('branch_id', type=int), current_user)
+    total = query.order_by(None).count()
+    if not total:
+        return jsonify({'success': False, 'message': f'No {kind} match the filters'}), 404
     
-    finally:
-        # Clean up temporary file
-        if 'pdf_path' in locals() and os.path.exists(pdf_path):
-            try:
-                os.unlink(pdf_path)
-            except:
-                pass
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if export_format == 'merged':
+        if total > app.config['PDF_EXPORT_MAX_MERGED']:
+            return jsonify({'success': False, 'message': f"A merged PDF can hold at most "
+                                                         f"{app.config['PDF_EXPORT_MAX_MERGED']} documents, "
+                                                         f"{total} match; narrow the filters or export a ZIP"}), 400
+        return send_pdf(merged_pdf(iter_documents(kind, query)), download_name=f"{kind}_{timestamp}.pdf")
+    
+    # The render processes are shared by the whole web process, one export at a time
+    if not pdf_render_pool.acquire():
+        return jsonify({'success': False, 'message': 'Another PDF export is running; try again shortly'}), 503
+    
+    user_id = current_user.id
+    
+    def log_progress(done, total):
+        print(f"PDF export of {kind} by user {user_id}: {done}/{total}")
+    
+    files = render_documents(iter_documents(kind, query), pool=pdf_render_pool)
+    chunks = iter_zip_chunks(with_progress(files, total, log_progress, every=50))
+    response = Response(
+        stream_with_context(chunks),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="{kind}_{timestamp}.zip"',
+            'X-Export-Documents': str(total)
+        }
+    )
+    # Released when the response is closed, whether or not it was read to the end
+    response.call_on_close(pdf_render_pool.release)
+    return response
 
 @app.route("/quotations/<int:quotation_id>/status", methods=['POST'])
 @login_required
@@ -1446,120 +1316,15 @@ def edit_quotation(quotation_id):
             from decimal import Decimal
             quotation.discount_percentage = Decimal(str(request.form.get('discount_percentage', 0))) if request.form.get('discount_percentage') else Decimal('0.00')
             quotation.include_vat = request.form.get('include_vat') in ['true', 'True', True, 'on']
-            quotation.vat_rate = float(request.form.get('vat_rate', 16.00))
+            quotation.vat_rate = Decimal(str(request.form.get('vat_rate', 16.00)))
             quotation.show_quantity_in_pdf = request.form.get('show_quantity_in_pdf') in ['true', 'True', True, 'on']
             quotation.updated_at = datetime.utcnow()
             
-            # Update items
-            item_ids = request.form.getlist('item_id[]')
-            item_names = request.form.getlist('item_name[]')
-            quantities = request.form.getlist('quantity[]')
-            units = request.form.getlist('unit[]')
-            unit_prices = request.form.getlist('unit_price[]')
-            price_units = request.form.getlist('price_unit[]')
-            notes = request.form.getlist('notes[]')
-            
-            # Debug logging
-            print(f"DEBUG: item_ids: {item_ids}")
-            print(f"DEBUG: item_names: {item_names}")
-            print(f"DEBUG: quantities: {quantities}")
-            print(f"DEBUG: unit_prices: {unit_prices}")
-            print(f"DEBUG: notes: {notes}")
-            
-            # Check if arrays are properly aligned
-            if len(item_ids) != len(quantities) or len(item_names) != len(quantities):
-                print(f"WARNING: Array length mismatch detected!")
-                print(f"All arrays should have the same length as quantities: {len(quantities)}")
-                print(f"item_ids length: {len(item_ids)}")
-                print(f"item_names length: {len(item_names)}")
-                print(f"notes length: {len(notes)}")
-            
-            # Also check the raw form data to see what's actually being sent
-            print(f"DEBUG: Raw form data keys: {list(request.form.keys())}")
-            print(f"DEBUG: All item_id[] values: {request.form.getlist('item_id[]')}")
-            print(f"DEBUG: All item_name[] values: {request.form.getlist('item_name[]')}")
-            print(f"DEBUG: All quantity[] values: {request.form.getlist('quantity[]')}")
-            print(f"DEBUG: All unit_price[] values: {request.form.getlist('unit_price[]')}")
-            print(f"DEBUG: All notes[] values: {request.form.getlist('notes[]')}")
-            
-            # Clear existing items
-            for item in quotation.items:
-                db.session.delete(item)
-            
-            # Add updated items
-            from decimal import Decimal
-            
-            # Create a more robust approach by processing each item individually
-            # and finding the corresponding data from the form arrays
-            for i in range(len(quantities)):
-                if quantities[i] and unit_prices[i]:
-                    quantity = Decimal(str(quantities[i]))
-                    unit_price = Decimal(str(unit_prices[i]))
-                    total_price = quantity * unit_price
-                    
-                    # Safely get values with bounds checking
-                    item_id = item_ids[i] if i < len(item_ids) else ''
-                    item_name = item_names[i] if i < len(item_names) else ''
-                    unit = units[i] if i < len(units) else ''
-                    price_unit = price_units[i] if i < len(price_units) else ''
-                    note = notes[i] if i < len(notes) else ''
-                    
-                    # Debug logging for each item
-                    print(f"DEBUG Item {i}: item_id='{item_id}', item_name='{item_name}', quantity='{quantity}', unit='{unit}', unit_price='{unit_price}', price_unit='{price_unit}'")
-                    
-                    # Check if it's a regular product or manual item
-                    if item_id and item_id.strip() and item_id != '':  # Regular product
-                        print(f"DEBUG: Creating REGULAR PRODUCT with product_id={item_id}")
-                        item = QuotationItem(
-                            quotation_id=quotation.id,
-                            product_id=int(item_id),
-                            product_name=None,  # Will get name from product relationship
-                            quantity=quantity,
-                            unit=unit if unit else None,
-                            unit_price=unit_price,
-                            price_unit=price_unit if price_unit else None,
-                            total_price=total_price,
-                            notes=note if note else None
-                        )
-                    else:  # Manual item
-                        print(f"DEBUG: Processing MANUAL ITEM at index {i}")
-                        print(f"DEBUG: item_name from form: '{item_name}'")
-                        print(f"DEBUG: item_name type: {type(item_name)}")
-                        print(f"DEBUG: item_name length: {len(item_name) if item_name else 'None'}")
-                        
-                        # Use the item_name if available, otherwise fallback to 'Manual Item'
-                        manual_item_name = item_name if item_name and item_name.strip() else 'Manual Item'
-                        print(f"DEBUG: Creating MANUAL ITEM with product_name='{manual_item_name}' (original item_name='{item_name}')")
-                        
-                        # Additional check: if item_name is empty or just whitespace, try to find it from the form
-                        if not manual_item_name or manual_item_name.strip() == '':
-                            print(f"WARNING: item_name is empty for manual item at index {i}")
-                            print(f"Available item_names: {item_names}")
-                            # Try to find a non-empty item_name in the array
-                            for j, name in enumerate(item_names):
-                                if name and name.strip() and name.strip() != '':
-                                    print(f"Found non-empty item_name at index {j}: '{name}'")
-                                    manual_item_name = name.strip()
-                                    break
-                        
-                        item = QuotationItem(
-                            quotation_id=quotation.id,
-                            product_id=None,  # No product ID for manual items
-                            product_name=manual_item_name,
-                            quantity=quantity,
-                            unit=unit if unit else None,
-                            unit_price=unit_price,
-                            price_unit=price_unit if price_unit else None,
-                            total_price=total_price,
-                            notes=note if note else None
-                        )
-                    
-                    db.session.add(item)
-            
-            # Update quotation totals using the model's calculate_totals method
-            quotation.calculate_totals()
+            # Insert, update and delete only the items that changed; totals move by the difference
+            QuotationService.update_quotation_items(quotation, QuotationService.item_lines_from_form(request.form))
             
             db.session.commit()
+            pdf_cache.invalidate('quotation', quotation.id)
             flash('Quotation updated successfully!', 'success')
             return redirect(url_for('quotation_detail', quotation_id=quotation.id))
             
@@ -1568,16 +1333,22 @@ def edit_quotation(quotation_id):
             flash(f'Error updating quotation: {str(e)}', 'danger')
     
     # GET request - show edit form
+    # Products are fetched for the quotation's branch from /api/products, not embedded in the page
     branches = Branch.query.all()
-    from app.models import BranchProduct, ProductCatalog
-    products = BranchProduct.query.join(ProductCatalog).options(db.joinedload(BranchProduct.catalog_product)).filter(BranchProduct.display == True).all()
-    subcategories = SubCategory.query.all()
+    subcategories = SubCategory.query.options(db.joinedload(SubCategory.category)).all()
+    
+    # Labels of the items' selected products; product_id holds the branch product id,
+    # and older items never had branch_productid set, so look them up in one query
+    product_ids = {item.product_id for item in quotation.items if item.product_id}
+    item_products = {product.id: product for product in BranchProduct.query.options(
+        db.joinedload(BranchProduct.catalog_product)
+    ).filter(BranchProduct.id.in_(product_ids))} if product_ids else {}
     
     return render_template('edit_quotation.html',
                          user=current_user,
                          quotation=quotation,
+                         item_products=item_products,
                          branches=branches,
-                         products=products,
                          subcategories=subcategories)
 
 @app.route("/quotations/<int:quotation_id>/delete", methods=['POST'])
@@ -1598,6 +1369,7 @@ def delete_quotation(quotation_id):
         # Delete the quotation
         db.session.delete(quotation)
         db.session.commit()
+        pdf_cache.invalidate('quotation', quotation_id)
         
         return jsonify({'success': True, 'message': 'Quotation deleted successfully'})
         
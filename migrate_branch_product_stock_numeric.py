@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Database migration script to store fractional stock quantities.
+This script will:
+1. Change branch_products.stock from INTEGER to NUMERIC(10, 3) (PostgreSQL)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app import db
+from sqlalchemy import text
+
+def migrate_branch_product_stock_numeric():
+    """Allow fractional quantities in branch_products.stock"""
+
+    with app.app_context():
+        try:
+            print("Starting branch product stock migration...")
+
+            columns = {column['name']: column for column in db.inspect(db.engine).get_columns('branch_products')}
+            stock_type = str(columns['stock']['type']).upper()
+
+            if db.engine.dialect.name == 'sqlite':
+                print("SQLite stores decimals in any numeric column; nothing to change.")
+            elif stock_type.startswith('NUMERIC'):
+                print("branch_products.stock is already NUMERIC.")
+            else:
+                print(f"Changing branch_products.stock from {stock_type} to NUMERIC(10, 3)...")
+                db.session.execute(text("""
+                    ALTER TABLE branch_products
+                    ALTER COLUMN stock TYPE NUMERIC(10, 3) USING stock::NUMERIC(10, 3)
+                """))
+
+            db.session.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            print(f"Migration failed: {str(e)}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    migrate_branch_product_stock_numeric()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add materialized totals to the orders table.
+This script will:
+1. Add total_amount and item_count columns to the orders table
+2. Backfill both columns from the existing order items
+3. Verify that every order total matches its items
+
+Run with --check to only report orders whose totals are out of sync.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app import db
+from app.services import OrderService
+from sqlalchemy import text
+
+def migrate_order_totals():
+    """Add and backfill materialized order totals"""
+
+    with app.app_context():
+        try:
+            print("Starting order totals migration...")
+
+            # Check which columns already exist
+            inspector = db.inspect(db.engine)
+            existing_columns = [col['name'] for col in inspector.get_columns('orders')]
+
+            if 'total_amount' not in existing_columns:
+                print("Adding total_amount column to orders table...")
+                db.session.execute(text("""
+                    ALTER TABLE orders
+                    ADD COLUMN total_amount DECIMAL(10,2) NOT NULL DEFAULT 0.00
+                """))
+
+            if 'item_count' not in existing_columns:
+                print("Adding item_count column to orders table...")
+                db.session.execute(text("""
+                    ALTER TABLE orders
+                    ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0
+                """))
+
+            db.session.commit()
+
+            # Backfill totals from order items
+            print("Backfilling order totals...")
+            updated_count = OrderService.backfill_order_totals()
+            print(f"Updated totals for {updated_count} orders.")
+
+            check_order_totals()
+
+        except Exception as e:
+            print(f"Migration failed: {str(e)}")
+            db.session.rollback()
+            raise
+
+def check_order_totals():
+    """Report orders whose materialized totals differ from their items"""
+
+    with app.app_context():
+        mismatches = OrderService.find_inconsistent_order_totals()
+
+        if not mismatches:
+            print("All order totals are consistent with their items.")
+            return True
+
+        print(f"Found {len(mismatches)} order(s) with inconsistent totals:")
+        for mismatch in mismatches:
+            print(f"  Order #{mismatch['order_id']}: "
+                  f"stored {mismatch['total_amount']:.2f} ({mismatch['item_count']} items), "
+                  f"computed {mismatch['computed_total']:.2f} ({mismatch['computed_count']} items)")
+        return False
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--check':
+        consistent = check_order_totals()
+        sys.exit(0 if consistent else 1)
+    migrate_order_totals()
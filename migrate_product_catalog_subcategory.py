@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Database migration script to link product_catalog.subcategory_id to sub_category.
+This script will:
+1. List products whose subcategory_id points to a missing subcategory and stop,
+   or clear those subcategory_ids when run with --clear-orphans
+2. Add an index on product_catalog.subcategory_id
+3. Add the foreign key constraint to sub_category.id (PostgreSQL)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app import db
+from sqlalchemy import bindparam, text
+
+def find_orphaned_subcategory_products():
+    """Products whose subcategory_id refers to a subcategory that does not exist"""
+    return db.session.execute(text("""
+        SELECT id, name, subcategory_id
+        FROM product_catalog
+        WHERE subcategory_id IS NOT NULL
+          AND subcategory_id NOT IN (SELECT id FROM sub_category)
+        ORDER BY id
+    """)).all()
+
+def migrate_product_catalog_subcategory(clear_orphans=False):
+    """
+    Add the product_catalog -> sub_category foreign key and index
+
+    Orphaned subcategory references would make the constraint fail. They are
+    listed and the migration stops without changes, unless clear_orphans is
+    set, in which case the listed products lose their subcategory. Returns
+    True if the migration ran.
+    """
+
+    with app.app_context():
+        try:
+            print("Starting product catalog subcategory migration...")
+
+            orphans = find_orphaned_subcategory_products()
+            if orphans:
+                print(f"Found {len(orphans)} product(s) referring to missing subcategories:")
+                for product in orphans:
+                    print(f"  Product #{product.id} {product.name!r}: subcategory_id {product.subcategory_id}")
+                if not clear_orphans:
+                    print("Migration aborted. Fix these subcategories, or rerun with --clear-orphans "
+                          "to set them to NULL.")
+                    return False
+
+                print("Clearing references to missing subcategories...")
+                db.session.execute(text("""
+                    UPDATE product_catalog
+                    SET subcategory_id = NULL
+                    WHERE id IN :product_ids
+                """).bindparams(bindparam('product_ids', expanding=True)),
+                    {'product_ids': [product.id for product in orphans]})
+                print(f"Cleared the subcategory of products {', '.join(str(product.id) for product in orphans)}.")
+
+            # Inspect on the session's connection so the pending UPDATE stays in its transaction
+            inspector = db.inspect(db.session.connection())
+            existing_indexes = [index['name'] for index in inspector.get_indexes('product_catalog')]
+
+            if 'ix_product_catalog_subcategory_id' not in existing_indexes:
+                print("Adding index on product_catalog.subcategory_id...")
+                db.session.execute(text("""
+                    CREATE INDEX ix_product_catalog_subcategory_id
+                    ON product_catalog (subcategory_id)
+                """))
+
+            existing_foreign_keys = [fk['referred_table'] for fk in inspector.get_foreign_keys('product_catalog')]
+
+            if 'sub_category' in existing_foreign_keys:
+                print("Foreign key already exists.")
+            elif db.engine.dialect.name == 'sqlite':
+                print("SQLite cannot add foreign keys to an existing table; skipping constraint.")
+            else:
+                print("Adding foreign key product_catalog.subcategory_id -> sub_category.id...")
+                db.session.execute(text("""
+                    ALTER TABLE product_catalog
+                    ADD CONSTRAINT product_catalog_subcategory_id_fkey
+                    FOREIGN KEY (subcategory_id) REFERENCES sub_category (id)
+                """))
+
+            db.session.commit()
+            print("Migration completed successfully!")
+            return True
+
+        except Exception as e:
+            print(f"Migration failed: {str(e)}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    migrated = migrate_product_catalog_subcategory(clear_orphans='--clear-orphans' in sys.argv[1:])
+    sys.exit(0 if migrated else 1)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded background email pool
+"""
+
+import sys
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app import db
+from app.models import User, PasswordReset
+from app.executor import BackgroundExecutor, email_executor
+from app.services import AuthService
+
+
+def test_queue_is_bounded():
+    """Tasks beyond the queue bound are rejected instead of piling up"""
+    executor = BackgroundExecutor(max_workers=1, max_queue=1, submit_timeout=0.01, name='test-bounded')
+    executor.init_app(app)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    assert executor.submit(blocker)
+    started.wait(5)
+    assert executor.submit(lambda: None)
+    assert not executor.submit(lambda: None)
+    assert executor.stats()['queue_depth'] == 1
+
+    release.set()
+    assert executor.shutdown(timeout=5)
+    stats = executor.stats()
+    assert stats['completed'] == 2
+    assert stats['rejected'] == 1
+    assert stats['queue_depth'] == 0
+    assert not executor.submit(lambda: None)
+
+
+def test_tasks_use_their_own_session():
+    """Tasks load what they need by id in their own app context; failures are counted"""
+    with app.app_context():
+        db.create_all()
+        user = User(email=f'pool-{uuid.uuid4().hex}@example.com', firstname='Pool', lastname='Tester',
+                    password='x', role='sales')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    executor = BackgroundExecutor(max_workers=2, max_queue=10, name='test-session')
+    executor.init_app(app)
+    loaded = []
+    executor.submit(lambda: loaded.append(db.session.get(User, user_id).firstname))
+    executor.submit(lambda: 1 / 0)
+    assert executor.shutdown(timeout=5)
+
+    assert loaded == ['Pool']
+    stats = executor.stats()
+    assert stats['completed'] == 1
+    assert stats['failed'] == 1
+
+
+def test_password_reset_alert_runs_in_background():
+    """Resetting a password returns before the alert email is sent"""
+    with app.app_context():
+        db.create_all()
+        user = User(email=f'reset-{uuid.uuid4().hex}@example.com', firstname='Reset', lastname='Tester',
+                    password='x', role='sales')
+        db.session.add(user)
+        db.session.flush()
+        token = PasswordReset.generate_token()
+        db.session.add(PasswordReset(user_id=user.id, token=token, expires_at=datetime.utcnow() + timedelta(hours=1)))
+        db.session.commit()
+
+        submitted = email_executor.stats()['submitted']
+        assert AuthService.reset_password(token, 'new-password') == (True, 'Password reset successfully')
+        assert email_executor.stats()['submitted'] == submitted + 1
+        assert email_executor.drain(timeout=5)
+        assert email_executor.stats()['failed'] == 0
+
+
+if __name__ == "__main__":
+    test_queue_is_bounded()
+    test_tasks_use_their_own_session()
+    test_password_reset_alert_runs_in_background()
+    print("✅ Background email pool is bounded, isolates sessions and drains")
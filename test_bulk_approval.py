@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Test script for bulk order approval
+"""
+
+import sys
+import os
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app import db
+from app.models import (Branch, OrderType, User, Order, OrderItem, ProductCatalog, BranchProduct, StockTransaction, Invoice,
+                        Job, DocumentCounter)
+from app.services import OrderService
+
+
+ORDERS = 60
+
+
+def remove_invoices(order_ids, counter_name, counter_value):
+    """
+    Delete the invoices and invoice email jobs of order_ids and put the invoice counter back
+
+    Other tests number today's invoices in the same database, so none of
+    these may be left behind.
+    """
+    db.session.rollback()
+    invoice_ids = [invoice_id for (invoice_id,) in
+                   db.session.query(Invoice.id).filter(Invoice.orderid.in_(order_ids))]
+    for job in Job.query.filter_by(kind='invoice_email'):
+        if job.payload.get('invoice_id') in invoice_ids:
+            db.session.delete(job)
+    Invoice.query.filter(Invoice.id.in_(invoice_ids)).delete(synchronize_session=False)
+    counter = db.session.get(DocumentCounter, counter_name)
+    if counter is not None and counter_value is None:
+        db.session.delete(counter)
+    elif counter is not None:
+        counter.value = counter_value
+    db.session.commit()
+
+
+def test_bulk_approval_deducts_stock_once_per_item():
+    """Walk-in and online orders are approved together with one consistent ledger per product"""
+    with app.app_context():
+        db.create_all()
+        counter_name = f"INV-{datetime.utcnow().strftime('%Y%m%d')}"
+        counter = db.session.get(DocumentCounter, counter_name)
+        counter_value = counter.value if counter else None
+        main_branch = Branch(name='Bulk Main', location='Nairobi')
+        other_branch = Branch(name='Bulk Other', location='Mombasa')
+        walk_in = OrderType(name='Walk-in')
+        online = OrderType(name='Online')
+        user = User(email=f'approve-{uuid.uuid4().hex}@example.com', firstname='Bulk', lastname='Approver',
+                    password='x', role='sales')
+        db.session.add_all([main_branch, other_branch, walk_in, online, user])
+        db.session.flush()
+
+        products, other_products = [], []
+        for index in range(3):
+            catalog = ProductCatalog(name=f'Approval Product {index}', productcode=f'APR-{index}')
+            db.session.add(catalog)
+            db.session.flush()
+            products.append(BranchProduct(branchid=main_branch.id, catalog_id=catalog.id, stock=100, sellingprice=50))
+            other_products.append(BranchProduct(branchid=other_branch.id, catalog_id=catalog.id, stock=20, sellingprice=50))
+        db.session.add_all(products + other_products)
+        db.session.flush()
+
+        order_ids = []
+        for index in range(ORDERS):
+            order = Order(userid=user.id, ordertypeid=walk_in.id, branchid=main_branch.id)
+            db.session.add(order)
+            db.session.flush()
+            for product in products:
+                db.session.add(OrderItem(orderid=order.id, branch_productid=product.id, quantity=1,
+                                         original_price=50, final_price=50))
+            order_ids.append(order.id)
+
+        online_order = Order(userid=user.id, ordertypeid=online.id, branchid=main_branch.id)
+        db.session.add(online_order)
+        db.session.flush()
+        online_item = OrderItem(orderid=online_order.id, branch_productid=products[0].id, quantity=Decimal('2.5'),
+                                original_price=50, final_price=50)
+        db.session.add(online_item)
+        db.session.commit()
+
+        product_ids = [product.id for product in products]
+        other_product_id = other_products[0].id
+        selections = {online_order.id: {str(online_item.id): other_branch.id}}
+
+        try:
+            started = time.perf_counter()
+            results = OrderService.bulk_approve_orders(order_ids + [online_order.id, 999999], user, selections)
+            elapsed = time.perf_counter() - started
+            print(f"Approved {ORDERS + 1} orders in {elapsed:.2f}s")
+
+            assert all(results[order_id][0] for order_id in order_ids + [online_order.id])
+            assert results[999999] == (False, 'Order not found', None)
+
+            for product_id in product_ids:
+                assert db.session.get(BranchProduct, product_id).stock == 100 - ORDERS
+                ledger = StockTransaction.query.filter_by(productid=product_id).order_by(StockTransaction.id).all()
+                assert len(ledger) == ORDERS
+                assert ledger[0].previous_stock == 100
+                assert all(earlier.new_stock == later.previous_stock for earlier, later in zip(ledger, ledger[1:]))
+            assert db.session.get(BranchProduct, other_product_id).stock == Decimal('17.5')
+
+            assert Invoice.query.filter(Invoice.orderid.in_(order_ids + [online_order.id])).count() == ORDERS + 1
+            job_ids = [results[order_id][2] for order_id in order_ids + [online_order.id]]
+            assert Job.query.filter(Job.id.in_(job_ids), Job.kind == 'invoice_email').count() == ORDERS + 1
+
+            # Approving again changes nothing
+            results = OrderService.bulk_approve_orders(order_ids[:5], user)
+            assert all(message == 'Order is already approved.' for _, message, _ in results.values())
+            assert db.session.get(BranchProduct, product_ids[0]).stock == 100 - ORDERS
+        finally:
+            remove_invoices(order_ids + [online_order.id], counter_name, counter_value)
+
+
+def test_bulk_approve_route_is_for_admins_in_their_branches():
+    """Only admins may bulk approve, malformed ids are rejected, and orders outside their branches are left alone"""
+    with app.app_context():
+        db.create_all()
+        counter_name = f"INV-{datetime.utcnow().strftime('%Y%m%d')}"
+        counter = db.session.get(DocumentCounter, counter_name)
+        counter_value = counter.value if counter else None
+        tag = uuid.uuid4().hex[:6]
+        own_branch = Branch(name=f'Route Own {tag}', location='Nairobi')
+        other_branch = Branch(name=f'Route Other {tag}', location='Kisumu')
+        walk_in = OrderType(name='Walk-in')
+        seller = User(email=f'route-seller-{tag}@example.com', firstname='Sam', lastname='Seller', password='x',
+                      role='sales')
+        admin = User(email=f'route-admin-{tag}@example.com', firstname='Ada', lastname='Admin', password='x',
+                     role='admin')
+        db.session.add_all([own_branch, other_branch, walk_in, seller, admin])
+        db.session.flush()
+        admin.accessible_branch_ids = [own_branch.id]
+        catalog = ProductCatalog(name=f'Route Product {tag}', productcode=f'RT-{tag}')
+        db.session.add(catalog)
+        db.session.flush()
+        products = [BranchProduct(branchid=branch.id, catalog_id=catalog.id, stock=10, sellingprice=50)
+                    for branch in (own_branch, other_branch)]
+        db.session.add_all(products)
+        db.session.flush()
+        orders = [Order(userid=seller.id, ordertypeid=walk_in.id, branchid=product.branchid) for product in products]
+        db.session.add_all(orders)
+        db.session.flush()
+        db.session.add_all([OrderItem(orderid=order.id, branch_productid=product.id, quantity=1, original_price=50,
+                                      final_price=50) for order, product in zip(orders, products)])
+        db.session.commit()
+        own_id, other_id = [order.id for order in orders]
+        seller_id, admin_id = seller.id, admin.id
+        product_ids = [product.id for product in products]
+
+    client = app.test_client()
+    try:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(seller_id)
+        response = client.post('/orders/bulk-approve', json={'order_ids': [own_id, other_id]})
+        assert response.status_code == 403
+
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin_id)
+        for body in ({'order_ids': [own_id, 'abc']}, {'order_ids': [1.5]}, {'order_ids': [True]},
+                     {'order_ids': [own_id], 'branch_selections': {str(own_id): {'1': 'x'}}},
+                     {'order_ids': [own_id], 'branch_selections': ['x']}, ['x']):
+            assert client.post('/orders/bulk-approve', json=body).status_code == 400, body
+
+        response = client.post('/orders/bulk-approve', json={'order_ids': [str(own_id), other_id]}).get_json()
+        assert [(result['order_id'], result['success'], result['message']) for result in response['results']] == [
+            (own_id, True, 'Order approved successfully!'), (other_id, False, 'Access denied')
+        ]
+        with app.app_context():
+            assert [db.session.get(BranchProduct, product_id).stock for product_id in product_ids] == [9, 10]
+            assert not db.session.get(Order, other_id).approvalstatus
+    finally:
+        with app.app_context():
+            remove_invoices([own_id, other_id], counter_name, counter_value)
+
+
+if __name__ == "__main__":
+    test_bulk_approval_deducts_stock_once_per_item()
+    test_bulk_approve_route_is_for_admins_in_their_branches()
+    print("✅ Bulk approval deducts stock once per item and queues every invoice")
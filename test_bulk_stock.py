@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for batched stock adjustments
+"""
+
+import sys
+import os
+import io
+import uuid
+from decimal import Decimal
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app import db
+from app.models import Branch, User, ProductCatalog, BranchProduct, StockTransaction
+from app.services import StockService
+
+
+def seed_products(stocks):
+    """Create a user and branch products with the given stock levels; returns the user and product ids"""
+    branch = Branch(name='Bulk Branch', location='Nairobi')
+    user = User(email=f'bulk-{uuid.uuid4().hex}@example.com', firstname='Bulk', lastname='Tester',
+                password='x', role='sales')
+    db.session.add_all([branch, user])
+    db.session.flush()
+
+    product_ids = []
+    for index, stock in enumerate(stocks):
+        catalog = ProductCatalog(name=f'Bulk Product {index}', productcode=f'BLK-{index}')
+        db.session.add(catalog)
+        db.session.flush()
+        branch_product = BranchProduct(branchid=branch.id, catalog_id=catalog.id, stock=stock)
+        db.session.add(branch_product)
+        db.session.flush()
+        product_ids.append(branch_product.id)
+    db.session.commit()
+    return user, product_ids
+
+
+def test_bulk_adjust_applies_all_lines():
+    """Fractional and repeated lines are applied together with a consistent ledger"""
+    with app.app_context():
+        db.create_all()
+        user, (first_id, second_id) = seed_products([10, 5])
+
+        success, results = StockService.bulk_adjust([
+            {'product_id': first_id, 'quantity': '2.5'},
+            {'product_id': second_id, 'quantity': 1, 'action': 'remove'},
+            {'product_id': first_id, 'quantity': '0.25', 'action': 'remove'},
+        ], user, notes='Delivery 42')
+
+        assert success, results
+        assert [result['success'] for result in results] == [True, True, True]
+        assert db.session.get(BranchProduct, first_id).stock == Decimal('12.25')
+        assert db.session.get(BranchProduct, second_id).stock == Decimal('4')
+
+        ledger = StockTransaction.query.filter_by(productid=first_id).order_by(StockTransaction.id).all()
+        assert [(t.previous_stock, t.new_stock) for t in ledger] == [
+            (Decimal('10'), Decimal('12.5')), (Decimal('12.5'), Decimal('12.25'))
+        ]
+        assert ledger[0].notes == 'Delivery 42'
+
+
+def test_bulk_adjust_is_all_or_nothing():
+    """One failing line leaves every product unchanged and is reported per line"""
+    with app.app_context():
+        db.create_all()
+        user, (first_id, second_id) = seed_products([10, 1])
+
+        success, results = StockService.bulk_adjust([
+            {'product_id': first_id, 'quantity': 3},
+            {'product_id': second_id, 'quantity': 2, 'action': 'remove'},
+        ], user)
+        assert not success
+        assert results[0]['success'] is False and 'error' not in results[0]
+        assert results[1]['error'] == 'Insufficient stock'
+        assert db.session.get(BranchProduct, first_id).stock == 10
+
+        success, results = StockService.bulk_adjust([
+            {'product_id': first_id, 'quantity': 'abc'},
+            {'product_id': 999999, 'quantity': 1},
+            {'product_id': first_id, 'quantity': 1, 'action': 'move'},
+        ], user)
+        assert not success
+        assert [result['error'] for result in results] == [
+            'Invalid quantity: abc', 'Product not found', "Unknown action 'move'"
+        ]
+        assert StockTransaction.query.filter_by(productid=first_id).count() == 0
+
+
+def test_bulk_stock_csv_upload():
+    """The bulk endpoint accepts a CSV upload"""
+    with app.app_context():
+        db.create_all()
+        user, (product_id,) = seed_products([4])
+        user_id = user.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+    csv_content = f'product_id,quantity,action,notes\n{product_id},1.5,add,Recount\n{product_id},0.5,remove,\n'
+    response = client.post('/stock/bulk', data={'file': (io.BytesIO(csv_content.encode()), 'stock.csv')},
+                           content_type='multipart/form-data')
+    data = response.get_json()
+    assert data['success'], data
+    assert [result['new_stock'] for result in data['results']] == [5.5, 5.0]
+
+
+if __name__ == "__main__":
+    test_bulk_adjust_applies_all_lines()
+    test_bulk_adjust_is_all_or_nothing()
+    test_bulk_stock_csv_upload()
+    print("✅ Bulk stock adjustments are validated and applied in one transaction")
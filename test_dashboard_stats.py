@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the dashboard statistics aggregated in SQL
+"""
+
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from main import app
+from app import db
+from app.models import Branch, OrderType, User, Order
+from app.services import DashboardService
+
+
+def create_orders():
+    """
+    Walk-in orders of one user across two branches, plus orders the dashboard must ignore
+
+    Returns the user id, the id of a user without orders and the expected
+    recent order ids, newest first.
+    """
+    with app.app_context():
+        db.create_all()
+        tag = uuid.uuid4().hex[:6]
+        branches = [Branch(name=f'Dashboard Branch {tag} {index}', location='Nairobi') for index in range(2)]
+        walk_in = OrderType(name=f'Walk-in {tag}')
+        online = OrderType(name=f'Online {tag}')
+        users = [User(email=f'dashboard-{name}-{tag}@example.com', firstname=name.title(), lastname='Seller',
+                      password='x', role='sales') for name in ('dana', 'other', 'empty')]
+        db.session.add_all(branches + users + [walk_in, online])
+        db.session.flush()
+        user, other, empty = users
+
+        start = datetime(2026, 1, 1, 9, 0)
+        orders = [
+            Order(userid=user.id, ordertypeid=walk_in.id, branchid=branch.id, total_amount=total,
+                  approvalstatus=approved, created_at=start + timedelta(hours=index))
+            for index, (branch, total, approved) in enumerate([
+                (branches[0], Decimal('100.50'), True),
+                (branches[0], Decimal('40'), False),
+                (branches[1], Decimal('250'), True),
+                (branches[1], Decimal('75.25'), False),
+                (branches[1], Decimal('10'), True),
+                (branches[0], Decimal('999'), False),
+            ])
+        ]
+        # Another user's walk-in order and this user's online order are not on the dashboard
+        orders += [
+            Order(userid=other.id, ordertypeid=walk_in.id, branchid=branches[0].id, total_amount=500,
+                  approvalstatus=True, created_at=start + timedelta(days=1)),
+            Order(userid=user.id, ordertypeid=online.id, branchid=branches[0].id, total_amount=700,
+                  approvalstatus=True, created_at=start + timedelta(days=1)),
+        ]
+        db.session.add_all(orders)
+        db.session.commit()
+        recent = [order.id for order in reversed(orders[1:6])]
+        return user.id, empty.id, recent
+
+
+def test_walk_in_stats():
+    """Counts and approved revenue cover the user's walk-in orders in every branch, in one query"""
+    user_id, empty_id, recent = create_orders()
+    with app.app_context():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            stats = DashboardService.get_walk_in_stats(user_id)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        assert len(statements) == 1
+        assert stats == {'total_orders': 6, 'pending_orders': 3, 'total_revenue': 360.5, 'completed_orders': 3}
+
+        assert DashboardService.get_walk_in_stats(empty_id) == {
+            'total_orders': 0, 'pending_orders': 0, 'total_revenue': 0.0, 'completed_orders': 0
+        }
+
+
+def test_recent_orders():
+    """The newest walk-in orders come back with their totals and status"""
+    user_id, empty_id, recent = create_orders()
+    with app.app_context():
+        orders = DashboardService.get_recent_orders(user_id, limit=5)
+        assert [order['id'] for order in orders] == recent
+        assert orders[0] == {'id': recent[0], 'customer_name': 'Dana Seller', 'status': 'Pending',
+                             'created_at': '2026-01-01 14:00', 'total_amount': 999.0}
+        assert [order['status'] for order in orders[1:]] == ['Approved', 'Pending', 'Approved', 'Pending']
+        assert DashboardService.get_recent_orders(user_id, limit=2) == orders[:2]
+        assert DashboardService.get_recent_orders(empty_id) == []
+
+
+if __name__ == "__main__":
+    test_walk_in_stats()
+    test_recent_orders()
+    print("✅ Dashboard statistics are aggregated in SQL per user")
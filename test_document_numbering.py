@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Stress test for concurrent invoice and receipt number allocation
+"""
+
+import sys
+import os
+import tempfile
+import threading
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import db
+from app.models import DocumentCounter, Invoice
+from app.numbering import allocate_number
+from app.utils import generate_invoice_number
+from config import config
+
+
+THREADS = 8
+NUMBERS_PER_THREAD = 500
+
+
+def test_parallel_allocation_has_no_duplicates_or_gaps():
+    """Threads with their own connections allocate numbers from one counter without collisions"""
+    # Each thread needs its own connection to a shared database, so use a file
+    # instead of the per-connection in-memory database
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'numbering.db')}",
+                               connect_args={'timeout': 60})
+        DocumentCounter.__table__.create(engine)
+        Session = sessionmaker(bind=engine)
+
+        allocated = []
+        errors = []
+        lock = threading.Lock()
+
+        def allocate_many():
+            session = Session()
+            numbers = []
+            try:
+                for _ in range(NUMBERS_PER_THREAD):
+                    numbers.append(allocate_number('INV-STRESS', session=session))
+                    session.commit()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                session.close()
+            with lock:
+                allocated.extend(numbers)
+
+        threads = [threading.Thread(target=allocate_many) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+        total = THREADS * NUMBERS_PER_THREAD
+        print(f"Allocated {len(allocated)} numbers from {THREADS} threads")
+        assert not errors, errors
+        assert len(allocated) == total
+        assert sorted(allocated) == list(range(1, total + 1))
+
+
+def create_numbering_app():
+    """An app with a private in-memory database, so no other test's invoices or counters are in it"""
+    numbering_app = Flask(__name__)
+    numbering_app.config.from_object(config['testing'])
+    numbering_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(numbering_app)
+    return numbering_app
+
+
+def test_counter_continues_after_existing_invoices():
+    """A new day's counter starts after invoices that were numbered before it existed"""
+    with create_numbering_app().app_context():
+        db.create_all()
+        number = generate_invoice_number()
+        prefix = number.rsplit('-', 1)[0]
+        db.session.rollback()
+
+        DocumentCounter.query.filter_by(name=prefix).delete()
+        db.session.add(Invoice(orderid=1, invoice_number=f'{prefix}-0007', total_amount=0, subtotal=0))
+        db.session.commit()
+
+        assert generate_invoice_number() == f'{prefix}-0008'
+        assert generate_invoice_number() == f'{prefix}-0009'
+        db.session.rollback()
+
+        # The rolled back numbers are handed out again
+        assert generate_invoice_number() == f'{prefix}-0008'
+        db.session.rollback()
+
+
+if __name__ == "__main__":
+    test_parallel_allocation_has_no_duplicates_or_gaps()
+    test_counter_continues_after_existing_invoices()
+    print("✅ Document numbers are unique and gapless under concurrency")
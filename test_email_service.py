@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for the Brevo email service against a local stub server
+"""
+
+import sys
+import os
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from email_service import BrevoEmailService, BATCH_SIZE
+
+
+class StubBrevo(BaseHTTPRequestHandler):
+    """Answers /smtp/email with the queued (status, delay) responses, then 201"""
+    responses = []
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        StubBrevo.requests.append(body)
+        status, delay = StubBrevo.responses.pop(0) if StubBrevo.responses else (201, 0)
+        time.sleep(delay)
+        payload = {'messageId': f'<{len(StubBrevo.requests)}@stub>'}
+        if 'messageVersions' in body:
+            payload = {'messageIds': [f'<{len(StubBrevo.requests)}-{index}@stub>'
+                                      for index in range(len(body['messageVersions']))]}
+        content = json.dumps(payload if status == 201 else {'message': 'try later'}).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting for a slow response
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def stub_service(**options):
+    """Start a stub server and return it with a service pointed at it"""
+    StubBrevo.responses = []
+    StubBrevo.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubBrevo)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    service = BrevoEmailService('test-key', base_url=f'http://127.0.0.1:{server.server_port}',
+                                backoff_factor=0.01, **options)
+    return server, service
+
+
+def test_retries_rate_limits_and_server_errors():
+    """429 and 5xx responses are retried; the attachment is sent base64 encoded"""
+    server, service = stub_service()
+    try:
+        StubBrevo.responses = [(429, 0), (503, 0)]
+        result = service.send_invoice_email('a@example.com', 'A', 1, 'INV-1', pdf_attachment=b'%PDF-1.4')
+        assert result['success'], result
+        assert len(StubBrevo.requests) == 3
+        assert StubBrevo.requests[-1]['attachment'] == [{'name': 'invoice_INV-1.pdf', 'content': 'JVBERi0xLjQ='}]
+
+        StubBrevo.requests = []
+        StubBrevo.responses = [(500, 0)] * 10
+        result = service.send_password_change_alert('a@example.com', 'A', 'now')
+        assert not result['success']
+        assert len(StubBrevo.requests) == 4
+    finally:
+        server.shutdown()
+
+
+def test_slow_api_times_out():
+    """A hanging API fails after the read timeout instead of blocking the worker"""
+    server, service = stub_service(read_timeout=0.2)
+    try:
+        StubBrevo.responses = [(201, 1)]
+        started = time.perf_counter()
+        result = service.send_password_change_alert('a@example.com', 'A', 'now')
+        assert not result['success']
+        assert time.perf_counter() - started < 1
+        # Read timeouts are not retried, the email may have been accepted
+        assert len(StubBrevo.requests) == 1
+    finally:
+        server.shutdown()
+
+
+def test_batch_send_uses_message_versions():
+    """Bulk mail goes out in requests of up to BATCH_SIZE recipients"""
+    server, service = stub_service()
+    try:
+        recipients = [{'email': f'user{index}@example.com', 'name': f'User {index}', 'params': {'index': index}}
+                      for index in range(BATCH_SIZE + 5)]
+        result = service.send_batch_email('Price list', '<p>Hi {{ params.index }}</p>', 'Hi', recipients)
+        assert result['success'], result
+        assert len(result['message_ids']) == BATCH_SIZE + 5
+        assert [len(body['messageVersions']) for body in StubBrevo.requests] == [BATCH_SIZE, 5]
+        assert StubBrevo.requests[1]['messageVersions'][0] == {
+            'to': [{'email': f'user{BATCH_SIZE}@example.com', 'name': f'User {BATCH_SIZE}'}],
+            'params': {'index': BATCH_SIZE}
+        }
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_retries_rate_limits_and_server_errors()
+    test_slow_api_times_out()
+    test_batch_send_uses_message_versions()
+    print("✅ Email service retries, times out and batches against a stub server")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the email templates
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from email_service import BrevoEmailService, EMAIL_TEMPLATES, email_templates, render_email_template
+
+
+def test_every_email_renders():
+    """Each email renders its fields in HTML and text, escaping user input in HTML only"""
+    service = BrevoEmailService('test-key', base_url='http://127.0.0.1:9')
+    user = 'Ann <O\'Neil>'
+
+    html = service._get_invoice_email_html(user, 42, 'INV-20240101-0001')
+    text = service._get_invoice_email_text(user, 42, 'INV-20240101-0001')
+    assert '<title>Invoice #INV-20240101-0001</title>' in html
+    assert 'Ann &lt;O&#39;Neil&gt;' in html and "<O'Neil>" not in html
+    assert text.startswith("Dear Ann <O'Neil>,")
+    assert 'Order Number: #42' in text
+
+    assert 'KSh1234.50' in service._get_receipt_email_html('Ann', 7, 'RCP-1', 1234.5)
+    assert 'KSh1234.50' in service._get_receipt_email_text('Ann', 7, 'RCP-1', 1234.5)
+    assert 'href="https://example.com/reset?token=a&amp;b"' in service._get_password_reset_html(
+        'https://example.com/reset?token=a&b', 'Ann')
+    assert 'Change Time: 10:00' in service._get_password_change_alert_text('Ann', '10:00')
+    assert 'Login to your account: https://example.com' in service._get_welcome_text('Ann', 'https://example.com')
+
+    # Every page shares the base layout
+    for name in EMAIL_TEMPLATES:
+        if name.endswith('.html'):
+            assert '<h1>ABZ Hardware</h1>' in render_email_template(
+                name, user_name='Ann', reset_url='', login_url='', change_time='', order_id=1,
+                invoice_number='', receipt_number='', payment_amount=0)
+
+
+def test_templates_are_compiled_once():
+    """Emails render from the templates compiled at import, without going back to the files"""
+    context = {'user_name': 'Ann', 'order_id': 42, 'invoice_number': 'INV-20240101-0001'}
+    first = render_email_template('invoice.html', **context)
+
+    def no_source(environment, name):
+        raise AssertionError(f'{name} was loaded again')
+
+    loader_get_source = email_templates.loader.get_source
+    email_templates.loader.get_source = no_source
+    try:
+        assert render_email_template('invoice.html', **context) == first
+        for name, template in EMAIL_TEMPLATES.items():
+            assert email_templates.get_template(name) is template
+    finally:
+        email_templates.loader.get_source = loader_get_source
+
+
+if __name__ == "__main__":
+    test_every_email_renders()
+    test_templates_are_compiled_once()
+    print("✅ Email templates render from the compiled cache")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared invoice model built from an order
+"""
+
+import sys
+import os
+import pickle
+import uuid
+from decimal import Decimal
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from main import app
+from app import db
+from app.models import Branch, OrderType, User, Order, OrderItem, Invoice, ProductCatalog, BranchProduct
+from app.invoices import InvoiceData, load_invoice_order, build_invoice
+from app.pdf_utils import render_pdf, create_receipt_pdf, create_invoice_pdf_a4, generate_invoice_pdf
+from app.pdf_export import invoice_document
+
+
+def create_order():
+    """A walk-in order with a negotiated, an original-price-only, a catalog-priced and an unpriced item"""
+    with app.app_context():
+        db.create_all()
+        tag = uuid.uuid4().hex[:6]
+        branch = Branch(name=f'Invoice Branch {tag}', location='Nairobi')
+        walk_in = OrderType(name='Walk-in')
+        user = User(email=f'invoice-{tag}@example.com', firstname='Ivy', lastname='Invoicer', password='x',
+                    role='sales', phone='0700000000')
+        catalog = ProductCatalog(name=f'Cement {tag}', productcode=f'INV-{tag}')
+        db.session.add_all([branch, walk_in, user, catalog])
+        db.session.flush()
+        product = BranchProduct(branchid=branch.id, catalog_id=catalog.id, stock=10, sellingprice=700)
+        db.session.add(product)
+        db.session.flush()
+        order = Order(userid=user.id, ordertypeid=walk_in.id, branchid=branch.id, total_amount=0)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all([
+            OrderItem(orderid=order.id, quantity=2, product_name='Nails', original_price=100, negotiated_price=90,
+                      final_price=90),
+            OrderItem(orderid=order.id, quantity=Decimal('1.5'), product_name='Wire', original_price=40),
+            OrderItem(orderid=order.id, quantity=3, branch_productid=product.id),
+            OrderItem(orderid=order.id, quantity=1),
+        ])
+        invoice = Invoice(orderid=order.id, invoice_number=f'INV-{tag}', total_amount=2340, subtotal=2340)
+        db.session.add(invoice)
+        db.session.commit()
+        return tag, user.id, order.id, invoice.id
+
+
+def test_build_invoice_from_one_query():
+    """The order, items, products, user and branch load in one statement and give the same prices everywhere"""
+    tag, user_id, order_id, invoice_id = create_order()
+    with app.app_context():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            invoice = build_invoice(load_invoice_order(order_id))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        assert len(statements) == 1
+
+        assert invoice.invoice_number == f'INV-{order_id:06d}'
+        assert invoice.customer_name == 'Ivy Invoicer'
+        assert invoice.customer_phone == '0700000000'
+        assert invoice.branch == f'Invoice Branch {tag}'
+        assert [(line.product_name, line.unit_price, line.total) for line in invoice.order_items] == [
+            ('Nails', Decimal('90'), Decimal('180')),
+            ('Wire', Decimal('40'), Decimal('60.0')),
+            (f'Cement {tag}', Decimal('700'), Decimal('2100')),
+            ('Manual Item', Decimal('0.00'), Decimal('0.00')),
+        ]
+        assert invoice.order_items[0].original_price == Decimal('100')
+        assert invoice.order_items[0].negotiated_price == Decimal('90')
+        assert invoice.subtotal == Decimal('2340')
+        # Matches the total OrderService keeps on the order
+        order = load_invoice_order(order_id)
+        order.calculate_totals()
+        assert invoice.subtotal == order.total_amount
+
+
+def test_invoice_is_immutable_and_portable():
+    """The model has no instance dict, rejects changes and survives pickling for the export workers"""
+    tag, user_id, order_id, invoice_id = create_order()
+    with app.app_context():
+        invoice = build_invoice(load_invoice_order(order_id), f'INV-{tag}')
+    assert not hasattr(invoice, '__dict__')
+    assert not hasattr(invoice.order_items[0], '__dict__')
+    for target, field in ((invoice, 'subtotal'), (invoice.order_items[0], 'total')):
+        try:
+            setattr(target, field, 0)
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError(f'{field} could be changed')
+    assert isinstance(invoice.order_items, tuple)
+    assert pickle.loads(pickle.dumps(invoice)) == invoice
+
+
+def test_every_renderer_uses_the_model():
+    """A4, thermal, email attachment, export and order page all render from the same model"""
+    tag, user_id, order_id, invoice_id = create_order()
+    user_data = {'firstname': 'Ivy', 'lastname': 'Invoicer', 'email': 'ivy@example.com'}
+    with app.app_context():
+        invoice = build_invoice(load_invoice_order(order_id))
+        assert isinstance(invoice, InvoiceData)
+        assert render_pdf(create_invoice_pdf_a4, invoice, user_data).startswith(b'%PDF')
+        assert render_pdf(create_receipt_pdf, invoice, user_data).startswith(b'%PDF')
+        # Fractional quantities used to fail here multiplying a Decimal by a float
+        assert generate_invoice_pdf(invoice_id).startswith(b'%PDF')
+
+        kind, exported, _ = invoice_document(db.session.get(Invoice, invoice_id))
+        assert exported.invoice_number == f'INV-{tag}'
+        assert exported.order_items == invoice.order_items
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    page = client.get(f'/orders/{order_id}').get_data(as_text=True)
+    assert f'Cement {tag}' in page and 'Manual Item' in page
+    assert '2,340' in page
+
+    response = client.get(f'/orders/{order_id}/invoice')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == f'attachment; filename=invoice_INV-{order_id:06d}.pdf'
+    response = client.get(f'/orders/{order_id}/invoice/view')
+    assert response.status_code == 200
+    assert 'Content-Disposition' not in response.headers
+    assert client.get('/orders/999999999/invoice/view').status_code == 404
+
+
+if __name__ == "__main__":
+    test_build_invoice_from_one_query()
+    test_invoice_is_immutable_and_portable()
+    test_every_renderer_uses_the_model()
+    print("✅ Invoices are built once per order and rendered from one immutable model")
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Test script for the background job queue
+"""
+
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+import email_service
+from main import app
+from app import db
+from app.models import Branch, OrderType, User, Order, OrderItem, ProductCatalog, BranchProduct, Invoice, Receipt, Job
+from app.services import OrderService, PaymentService
+from app.jobs import job_handler, enqueue_job, run_pending_jobs, claim_next_job, job_owner_id
+from config import config
+
+
+calls = []
+
+
+@job_handler('test_flaky')
+def flaky_job(payload):
+    calls.append(payload['name'])
+    if calls.count(payload['name']) <= payload['failures']:
+        raise RuntimeError(f"{payload['name']} failed")
+
+
+def create_queue_app():
+    """
+    An app with a private in-memory database
+
+    run_pending_jobs runs every due job in the database, so these tests must
+    not see the invoice and receipt jobs other tests queue.
+    """
+    queue_app = Flask(__name__)
+    queue_app.config.from_object(config['testing'])
+    queue_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(queue_app)
+    return queue_app
+
+
+class StubEmailService:
+    """Records the emails it is asked to send instead of calling Brevo"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_invoice_email(self, **email):
+        self.sent.append(('invoice', email))
+        return {'success': True}
+
+    def send_receipt_email(self, **email):
+        self.sent.append(('receipt', email))
+        return {'success': True}
+
+
+def run_jobs_with_stub_email():
+    """Run the due jobs with the stub as the email service; returns the stub"""
+    stub = StubEmailService()
+    previous, email_service.email_service = email_service.email_service, stub
+    try:
+        run_pending_jobs()
+    finally:
+        email_service.email_service = previous
+    return stub
+
+
+def create_order():
+    """A walk-in order with a fractional quantity; returns (user, order id)"""
+    branch = Branch(name='Email Branch', location='Nairobi')
+    walk_in = OrderType(name='Walk-in')
+    user = User(email=f'emails-{uuid.uuid4().hex}@example.com', firstname='Mail', lastname='Tester',
+                password='x', role='sales')
+    catalog = ProductCatalog(name='Emailed Cement', productcode='EC-1')
+    db.session.add_all([branch, walk_in, user, catalog])
+    db.session.flush()
+    branch_product = BranchProduct(branchid=branch.id, catalog_id=catalog.id, stock=10, sellingprice=100)
+    db.session.add(branch_product)
+    db.session.flush()
+    order = Order(userid=user.id, ordertypeid=walk_in.id, branchid=branch.id, total_amount=150)
+    db.session.add(order)
+    db.session.flush()
+    db.session.add(OrderItem(orderid=order.id, branch_productid=branch_product.id, quantity=Decimal('1.5'),
+                             original_price=100, final_price=100))
+    db.session.commit()
+    return user, order.id
+
+
+def make_due(job_id):
+    """Skip the backoff wait of a job"""
+    db.session.get(Job, job_id).run_at = datetime.utcnow()
+    db.session.commit()
+
+
+def test_failed_jobs_are_retried_with_backoff():
+    """A failing job waits, is retried, and completes once its handler succeeds"""
+    queue_app = create_queue_app()
+    with queue_app.app_context():
+        db.create_all()
+        job_id = enqueue_job('test_flaky', {'name': 'retry', 'failures': 2}).id
+
+        assert run_pending_jobs() == 1
+        job = db.session.get(Job, job_id)
+        assert job.status == 'pending'
+        assert job.attempts == 1
+        assert job.last_error == 'retry failed'
+        first_delay = job.run_at - datetime.utcnow()
+        assert first_delay > timedelta(seconds=queue_app.config['JOB_BACKOFF_SECONDS'] - 1)
+
+        # Not due yet, so the worker leaves it alone
+        assert run_pending_jobs() == 0
+
+        make_due(job_id)
+        assert run_pending_jobs() == 1
+        job = db.session.get(Job, job_id)
+        assert job.status == 'pending' and job.attempts == 2
+        assert job.run_at - datetime.utcnow() > first_delay
+
+        make_due(job_id)
+        assert run_pending_jobs() == 1
+        job = db.session.get(Job, job_id)
+        assert job.status == 'completed'
+        assert job.last_error is None
+        assert calls.count('retry') == 3
+
+
+def test_jobs_fail_after_max_attempts():
+    """A job that keeps failing is marked failed and no longer picked up"""
+    queue_app = create_queue_app()
+    with queue_app.app_context():
+        db.create_all()
+        job_id = enqueue_job('test_flaky', {'name': 'hopeless', 'failures': 99}, max_attempts=2).id
+        run_pending_jobs()
+        make_due(job_id)
+        run_pending_jobs()
+
+        job = db.session.get(Job, job_id)
+        assert job.status == 'failed'
+        assert job.attempts == 2
+        assert job.finished_at is not None
+        make_due(job_id)
+        assert run_pending_jobs() == 0
+
+
+def test_expired_lease_is_reclaimed():
+    """A job left running by a dead worker is picked up again once its lease expires"""
+    queue_app = create_queue_app()
+    with queue_app.app_context():
+        db.create_all()
+        job_id = enqueue_job('test_flaky', {'name': 'orphan', 'failures': 0}).id
+        assert claim_next_job('dead-worker').id == job_id
+        assert claim_next_job('live-worker') is None
+
+        db.session.get(Job, job_id).locked_at = datetime.utcnow() - timedelta(seconds=queue_app.config['JOB_LEASE_SECONDS'] + 1)
+        db.session.commit()
+        assert run_pending_jobs('live-worker') == 1
+        job = db.session.get(Job, job_id)
+        assert job.status == 'completed'
+        assert job.attempts == 2
+
+
+def test_approval_queues_invoice_job():
+    """Approving an order creates the invoice and returns a job id that can be polled"""
+    with app.app_context():
+        db.create_all()
+        branch = Branch(name='Job Branch', location='Nairobi')
+        walk_in = OrderType(name='Walk-in')
+        user = User(email=f'jobs-{uuid.uuid4().hex}@example.com', firstname='Job', lastname='Tester',
+                    password='x', role='sales')
+        catalog = ProductCatalog(name='Queued Cement', productcode='QC-1')
+        db.session.add_all([branch, walk_in, user, catalog])
+        db.session.flush()
+        branch_product = BranchProduct(branchid=branch.id, catalog_id=catalog.id, stock=10, sellingprice=100)
+        db.session.add(branch_product)
+        db.session.flush()
+        order = Order(userid=user.id, ordertypeid=walk_in.id, branchid=branch.id)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(OrderItem(orderid=order.id, branch_productid=branch_product.id, quantity=2,
+                                 original_price=100, final_price=100))
+        db.session.commit()
+        other = User(email=f'jobs-other-{uuid.uuid4().hex}@example.com', firstname='Nosy', lastname='Neighbour',
+                     password='x', role='sales')
+        db.session.add(other)
+        db.session.commit()
+        order_id, user_id, other_id = order.id, user.id, other.id
+
+        success, message, job_id = OrderService.approve_order(order_id, user)
+        assert success, message
+        job = db.session.get(Job, job_id)
+        invoice = Invoice.query.filter_by(orderid=order_id).one()
+        assert job.kind == 'invoice_email'
+        assert job.payload == {'invoice_id': invoice.id}
+        assert job.status == 'pending'
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    data = client.get(f'/jobs/{job_id}').get_json()
+    assert data['success']
+    assert data['job']['status'] == 'pending'
+    assert client.get('/jobs/999999').status_code == 404
+
+    # Other users can't see the job or its errors
+    with client.session_transaction() as session:
+        session['_user_id'] = str(other_id)
+    assert client.get(f'/jobs/{job_id}').status_code == 404
+
+
+def test_invoice_email_job_completes():
+    """An approved order's invoice_email job renders the invoice PDF and sends it"""
+    with create_queue_app().app_context():
+        db.create_all()
+        user, order_id = create_order()
+        success, message, job_id = OrderService.approve_order(order_id, user)
+        assert success, message
+
+        stub = run_jobs_with_stub_email()
+        job = db.session.get(Job, job_id)
+        # Decimal quantities times float prices used to fail every attempt here
+        assert job.status == 'completed', job.last_error
+        assert job.attempts == 1
+        invoice = Invoice.query.filter_by(orderid=order_id).one()
+        [(kind, email)] = stub.sent
+        assert kind == 'invoice'
+        assert email['invoice_number'] == invoice.invoice_number
+        assert email['pdf_attachment'].startswith(b'%PDF')
+
+
+def test_receipt_email_job_completes():
+    """A payment's receipt_email job renders the receipt PDF and sends it"""
+    with create_queue_app().app_context():
+        db.create_all()
+        user, order_id = create_order()
+        success, payment_id, reference_number, job_id = PaymentService.process_payment(
+            order_id, {'amount': '150', 'payment_method': 'cash'}, user)
+        assert success and job_id
+        assert job_owner_id(db.session.get(Job, job_id)) == user.id
+
+        stub = run_jobs_with_stub_email()
+        job = db.session.get(Job, job_id)
+        assert job.status == 'completed', job.last_error
+        assert job.attempts == 1
+        receipt = Receipt.query.filter_by(paymentid=payment_id).one()
+        [(kind, email)] = stub.sent
+        assert kind == 'receipt'
+        assert email['receipt_number'] == receipt.receipt_number
+        assert email['payment_amount'] == 150
+        assert email['pdf_attachment'].startswith(b'%PDF')
+
+
+if __name__ == "__main__":
+    test_failed_jobs_are_retried_with_backoff()
+    test_jobs_fail_after_max_attempts()
+    test_expired_lease_is_reclaimed()
+    test_approval_queues_invoice_job()
+    test_invoice_email_job_completes()
+    test_receipt_email_job_completes()
+    print("✅ Jobs are retried with backoff, reclaimed after a worker dies and can be polled")
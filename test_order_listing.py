@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for the eager-loaded order listing query
+"""
+
+import sys
+import os
+import uuid
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from main import app
+from app import db
+from app.models import Branch, OrderType, User, Order, OrderItem, ProductCatalog, BranchProduct
+from app.services import OrderListingService
+
+
+def seed_orders(orders_count, items_per_order):
+    """Create a walk-in user with orders that each hold several catalog items and return the user id"""
+    branch = Branch(name='Listing Branch', location='Nairobi')
+    order_type = OrderType(name='Walk-in')
+    user = User(email=f'listing-{uuid.uuid4().hex}@example.com', firstname='List', lastname='Tester',
+                password='x', role='sales')
+    db.session.add_all([branch, order_type, user])
+    db.session.flush()
+
+    for order_index in range(orders_count):
+        order = Order(userid=user.id, ordertypeid=order_type.id, branchid=branch.id)
+        db.session.add(order)
+        db.session.flush()
+        for item_index in range(items_per_order):
+            catalog = ProductCatalog(name=f'Product {order_index}-{item_index}', productcode=f'P{order_index}{item_index}')
+            db.session.add(catalog)
+            db.session.flush()
+            branch_product = BranchProduct(branchid=branch.id, catalog_id=catalog.id, sellingprice=100, stock=10)
+            db.session.add(branch_product)
+            db.session.flush()
+            db.session.add(OrderItem(orderid=order.id, branch_productid=branch_product.id,
+                                     quantity=1, original_price=100, final_price=100))
+    db.session.commit()
+    return user.id
+
+
+def count_listing_queries(user_id):
+    """Load the first page of orders and return the rows and number of statements issued"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.expunge_all()
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        rows, total = OrderListingService.get_walk_in_orders_page(user_id, '', page=1, per_page=20)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return rows, total, len(statements)
+
+
+def test_order_listing_query_count_is_bounded():
+    """A page of orders costs the same number of queries regardless of items per order"""
+    with app.app_context():
+        db.create_all()
+
+        few_items_user_id = seed_orders(orders_count=25, items_per_order=1)
+        many_items_user_id = seed_orders(orders_count=25, items_per_order=6)
+
+        rows, total, few_queries = count_listing_queries(few_items_user_id)
+        assert total == 25
+        assert len(rows) == 20
+
+        rows, total, many_queries = count_listing_queries(many_items_user_id)
+        assert total == 25
+        assert len(rows) == 20
+        assert all(len(row['items']) == 6 for row in rows)
+        assert rows[0]['items'][0]['product_name'].startswith('Product')
+
+        print(f"Queries per page: {few_queries} (1 item/order), {many_queries} (6 items/order)")
+        assert few_queries <= 5
+        assert many_queries <= 5
+        assert few_queries == many_queries
+
+
+if __name__ == "__main__":
+    test_order_listing_query_count_is_bounded()
+    print("✅ Order listing query count is bounded")
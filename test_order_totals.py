@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the materialized order totals and item counts
+"""
+
+import sys
+import os
+from decimal import Decimal
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from app import db
+from app.models import Branch, OrderType, User, Order, OrderItem, ProductCatalog, BranchProduct
+from app.services import OrderService
+from config import config
+
+
+def create_totals_app():
+    """
+    An app with a private in-memory database
+
+    backfill_order_totals and find_inconsistent_order_totals cover every
+    order in the database, so these tests must not see other tests' orders.
+    """
+    totals_app = Flask(__name__)
+    totals_app.config.from_object(config['testing'])
+    totals_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(totals_app)
+    return totals_app
+
+
+def create_orders():
+    """An order with stale totals, an empty order with a leftover total and a consistent order"""
+    db.create_all()
+    branch = Branch(name='Totals Branch', location='Nairobi')
+    walk_in = OrderType(name='Walk-in')
+    user = User(email='totals@example.com', firstname='Tom', lastname='Totals', password='x', role='sales')
+    catalog = ProductCatalog(name='Cement', productcode='TOT-001')
+    db.session.add_all([branch, walk_in, user, catalog])
+    db.session.flush()
+    product = BranchProduct(branchid=branch.id, catalog_id=catalog.id, stock=10, sellingprice=700)
+    db.session.add(product)
+    db.session.flush()
+
+    stale, empty, consistent = (Order(userid=user.id, ordertypeid=walk_in.id, branchid=branch.id, total_amount=total,
+                                      item_count=count) for total, count in ((0, 0), (50, 1), (10, 1)))
+    db.session.add_all([stale, empty, consistent])
+    db.session.flush()
+    db.session.add_all([
+        # Negotiated, original-price-only, catalog-priced and original price over catalog price
+        OrderItem(orderid=stale.id, quantity=2, original_price=100, negotiated_price=90, final_price=90),
+        OrderItem(orderid=stale.id, quantity=Decimal('1.5'), product_name='Wire', original_price=40),
+        OrderItem(orderid=stale.id, quantity=3, branch_productid=product.id),
+        OrderItem(orderid=stale.id, quantity=2, branch_productid=product.id, original_price=650),
+        OrderItem(orderid=consistent.id, quantity=1, product_name='Nails', original_price=10),
+    ])
+    db.session.commit()
+    return stale.id, empty.id, consistent.id
+
+
+def test_find_and_backfill_inconsistent_totals():
+    """Orders whose totals or counts differ from their items are listed, then fixed in one statement"""
+    totals_app = create_totals_app()
+    with totals_app.app_context():
+        stale_id, empty_id, consistent_id = create_orders()
+
+        assert OrderService.find_inconsistent_order_totals() == [
+            {'order_id': stale_id, 'total_amount': 0.0, 'item_count': 0, 'computed_total': 3640.0,
+             'computed_count': 4},
+            {'order_id': empty_id, 'total_amount': 50.0, 'item_count': 1, 'computed_total': 0.0,
+             'computed_count': 0},
+        ]
+
+        assert OrderService.backfill_order_totals() == 3
+        assert OrderService.find_inconsistent_order_totals() == []
+        totals = {order.id: (order.total_amount, order.item_count) for order in Order.query}
+        assert totals == {stale_id: (Decimal('3640'), 4), empty_id: (Decimal('0'), 0),
+                          consistent_id: (Decimal('10'), 1)}
+
+        # A total within the tolerance is not reported
+        db.session.get(Order, consistent_id).total_amount = Decimal('10.01')
+        db.session.commit()
+        assert OrderService.find_inconsistent_order_totals() == []
+        assert [row['order_id'] for row in OrderService.find_inconsistent_order_totals(tolerance=0)] == [consistent_id]
+
+
+def test_negotiation_keeps_totals_consistent():
+    """Negotiating starts from the item's unit price, so the running total matches its items"""
+    totals_app = create_totals_app()
+    with totals_app.app_context():
+        stale_id, empty_id, consistent_id = create_orders()
+        OrderService.backfill_order_totals()
+        items = OrderItem.query.filter_by(orderid=stale_id).order_by(OrderItem.id).all()
+
+        # Original price 650 is charged, not the catalog's 700
+        success, message = OrderService.negotiate_price(items[3].id, 600.0, '', None)
+        assert success, message
+        assert db.session.get(Order, stale_id).total_amount == Decimal('3540')
+        # Catalog priced item
+        success, message = OrderService.negotiate_price(items[2].id, 650.0, 'Bulk buyer', None)
+        assert success, message
+        assert message == 'Price negotiated successfully. New total: KSh3390.00'
+        assert OrderService.find_inconsistent_order_totals() == []
+
+        item = db.session.get(OrderItem, items[2].id)
+        assert item.final_price == Decimal('650') and item.negotiated_price == Decimal('650')
+        assert OrderService.negotiate_price(items[2].id, 650.004, 'Bulk buyer', None) == \
+            (True, 'No changes made to this item')
+
+        db.session.get(Order, stale_id).approvalstatus = True
+        db.session.commit()
+        assert OrderService.negotiate_price(items[0].id, 80.0, '', None) == \
+            (False, 'Cannot negotiate prices for approved orders')
+
+
+if __name__ == "__main__":
+    test_find_and_backfill_inconsistent_totals()
+    test_negotiation_keeps_totals_consistent()
+    print("✅ Order totals are found, backfilled and kept consistent by negotiation")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for cursor (keyset) pagination
+"""
+
+import sys
+import os
+import base64
+import json
+import re
+import uuid
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from main import app
+from app import db
+from app.models import Branch, OrderType, User, Order, ProductCatalog
+from app.pagination import encode_cursor, decode_cursor, keyset_paginate, keyset_options
+from config import config
+
+# Sort keys with ties: three products share 'Bolt' and two share 'Nut'
+NAMES = ['Anchor', 'Bolt', 'Bolt', 'Bolt', 'Clamp', 'Nut', 'Nut']
+
+
+def create_pagination_app():
+    """An app with a private in-memory database holding only the products being paged"""
+    pagination_app = Flask(__name__)
+    pagination_app.config.from_object(config['testing'])
+    pagination_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(pagination_app)
+    with pagination_app.app_context():
+        db.create_all()
+        db.session.add_all([ProductCatalog(name=name, productcode=f'PG-{index}') for index, name in enumerate(NAMES)])
+        db.session.commit()
+    return pagination_app
+
+
+def product_page(cursor=None, descending=False, **options):
+    """One page of two products ordered by name with the id breaking ties"""
+    return keyset_paginate(ProductCatalog.query, (ProductCatalog.name, ProductCatalog.id),
+                           key=lambda product: (product.name, product.id), cursor=cursor, per_page=2,
+                           descending=descending, **options)
+
+
+def page_ids(page):
+    """Ids of the products on a page"""
+    return [product.id for product in page.items]
+
+
+def test_next_and_prev_cursors_walk_every_row_once():
+    """Following next cursors visits every row once despite equal names, and prev cursors walk back"""
+    pagination_app = create_pagination_app()
+    with pagination_app.app_context():
+        expected = [product.id for product in ProductCatalog.query.order_by(ProductCatalog.name, ProductCatalog.id)]
+
+        pages = [product_page()]
+        assert not pages[0].has_prev
+        while pages[-1].has_next:
+            pages.append(product_page(pages[-1].next_cursor))
+        assert [page_ids(page) for page in pages] == [expected[0:2], expected[2:4], expected[4:6], expected[6:]]
+        # The ties on 'Bolt' and 'Nut' are split across pages without repeats or gaps
+        assert [product.name for product in pages[1].items] == ['Bolt', 'Bolt']
+        assert all(page.has_prev for page in pages[1:])
+
+        backwards = [pages[-1]]
+        while backwards[-1].has_prev:
+            backwards.append(product_page(backwards[-1].prev_cursor))
+        assert [page_ids(page) for page in backwards] == [page_ids(page) for page in reversed(pages)]
+        assert backwards[-1].has_next
+
+        descending = [product_page(descending=True)]
+        while descending[-1].has_next:
+            descending.append(product_page(descending[-1].next_cursor, descending=True))
+        assert sum((page_ids(page) for page in descending), []) == expected[::-1]
+
+
+def test_totals():
+    """The total is counted only when asked for; SQLite has no estimate so it is exact"""
+    pagination_app = create_pagination_app()
+    with pagination_app.app_context():
+        assert product_page().total is None
+        page = product_page(with_total=True, approximate_total=True)
+        assert page.total == len(NAMES)
+        assert not page.total_is_estimate
+
+    assert keyset_options({}) == (False, None, True, True)
+    assert keyset_options({'paging': 'cursor', 'total': 'exact'}) == (True, None, True, False)
+    assert keyset_options({'cursor': 'abc', 'total': 'none'}) == (True, 'abc', False, False)
+
+
+def test_tampered_cursors_start_from_the_first_page():
+    """Cursors that don't decode to sort key values are ignored instead of failing the query"""
+    def token(payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+    created = datetime(2026, 3, 1, 12, 30)
+    assert decode_cursor(encode_cursor([created, 'Bolt', 3], 'before')) == ('before', [created, 'Bolt', 3])
+
+    pagination_app = create_pagination_app()
+    with pagination_app.app_context():
+        first = page_ids(product_page())
+        tampered = [
+            'not a cursor',
+            'é',
+            token({'d': 'sideways', 'v': ['Bolt', 2]}),
+            token({'d': 'after', 'v': ['Bolt']}),
+            token({'d': 'after', 'v': 5}),
+            token({'d': 'after', 'v': [{'dt': 'yesterday'}, 2]}),
+            token({'d': 'after', 'v': [{'dec': 'many'}, 2]}),
+            token({'d': 'after', 'v': [{'name': 'Bolt'}, 2]}),
+            token({'d': 'after', 'v': [['Bolt'], 2]}),
+            token(['Bolt', 2]),
+        ]
+        for cursor in tampered:
+            page = product_page(cursor)
+            assert page_ids(page) == first, cursor
+            assert not page.has_prev
+
+
+def test_listing_links_keep_the_total_mode():
+    """The Previous and Next links of a cursor paginated listing keep ?total="""
+    with app.app_context():
+        db.create_all()
+        tag = uuid.uuid4().hex[:6]
+        branch = Branch(name=f'Paging Branch {tag}', location='Nairobi')
+        walk_in = OrderType(name='Walk-in')
+        user = User(email=f'paging-{tag}@example.com', firstname='Page', lastname='Turner', password='x',
+                    role='sales')
+        db.session.add_all([branch, walk_in, user])
+        db.session.flush()
+        db.session.add_all([Order(userid=user.id, ordertypeid=walk_in.id, branchid=branch.id) for _ in range(45)])
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+    def links(url):
+        """Query arguments of the Previous and Next links on a listing page"""
+        page = client.get(url).get_data(as_text=True)
+        return {label: parse_qs(urlparse(href.replace('&amp;', '&')).query)
+                for href, label in re.findall(r'<a class="page-link" href="([^"]+)">(Previous|Next)</a>', page)}
+
+    first = links('/orders?paging=cursor&total=exact')
+    assert first['Next']['total'] == ['exact']
+    second = links(f"/orders?paging=cursor&total=exact&cursor={first['Next']['cursor'][0]}")
+    assert second['Previous']['total'] == ['exact'] and second['Next']['total'] == ['exact']
+    assert 'total' not in links('/orders?paging=cursor')['Next']
+
+
+if __name__ == "__main__":
+    test_next_and_prev_cursors_walk_every_row_once()
+    test_totals()
+    test_tampered_cursors_start_from_the_first_page()
+    test_listing_links_keep_the_total_mode()
+    print("✅ Cursor pagination walks every row once and ignores tampered cursors")
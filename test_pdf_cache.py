@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the rendered PDF cache
+"""
+
+import sys
+import os
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app import db
+from app.models import Branch, OrderType, User, Order, OrderItem, Quotation, QuotationItem
+from app.pdf_cache import PDFCache, pdf_cache
+from app.services import OrderService
+
+
+def fake_render(size):
+    """Renderer writing size bytes and counting its calls"""
+    calls = []
+
+    def render(buffer):
+        calls.append(buffer)
+        buffer.write(b'%PDF' + b'0' * (size - 4))
+    return render, calls
+
+
+def test_renders_once_per_content_and_evicts_least_recent():
+    """Identical inputs reuse the PDF; the least recently used PDF is evicted when over the limit"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PDFCache(directory, max_bytes=2500)
+        render, calls = fake_render(1000)
+
+        first_data, first_etag = cache.get_or_render('invoice', 1, {'total': Decimal('10.50')}, render)
+        again_data, again_etag = cache.get_or_render('invoice', 1, {'total': Decimal('10.50')}, render)
+        assert (first_data, first_etag) == (again_data, again_etag)
+        assert len(first_data) == 1000
+        assert len(calls) == 1
+        first_path = os.path.join(directory, f'invoice-1-{first_etag}.pdf')
+
+        # An edit changes the content hash
+        edited_data, edited_etag = cache.get_or_render('invoice', 1, {'total': Decimal('12.00')}, render)
+        assert edited_etag != first_etag
+        edited_path = os.path.join(directory, f'invoice-1-{edited_etag}.pdf')
+        assert len(calls) == 2
+
+        # Reading the first PDF makes the edited one the least recently used
+        time.sleep(0.01)
+        cache.get_or_render('invoice', 1, {'total': Decimal('10.50')}, render)
+        time.sleep(0.01)
+        cache.get_or_render('quotation', 2, {'total': 1}, render)
+        assert os.path.exists(first_path)
+        assert not os.path.exists(edited_path)
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['hits'] == 2
+
+        assert cache.invalidate('invoice', 1) == 1
+        assert not os.path.exists(first_path)
+        assert not [name for name in os.listdir(directory) if name.endswith('.tmp')]
+
+
+def test_routes_serve_cached_pdfs_with_etags():
+    """Invoice and quotation PDFs render once, revalidate with 304, serve byte ranges and re-render after edits"""
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_cache.configure(directory=directory)
+        with app.app_context():
+            db.create_all()
+            branch = Branch(name='PDF Branch', location='Nairobi')
+            walk_in = OrderType(name='Walk-in')
+            user = User(email=f'pdf-{uuid.uuid4().hex}@example.com', firstname='Pdf', lastname='Tester',
+                        password='x', role='sales')
+            db.session.add_all([branch, walk_in, user])
+            db.session.flush()
+            order = Order(userid=user.id, ordertypeid=walk_in.id, branchid=branch.id, total_amount=300)
+            quotation = Quotation(quotation_number=f'QT-PDF-{uuid.uuid4().hex[:6]}', customer_name='Walk-in Customer',
+                                  created_by=user.id, branch_id=branch.id)
+            db.session.add_all([order, quotation])
+            db.session.flush()
+            item = OrderItem(orderid=order.id, quantity=3, product_name='Nails', original_price=100, final_price=100)
+            db.session.add_all([item, QuotationItem(quotation_id=quotation.id, quantity=2, unit_price=50,
+                                                    total_price=100, product_name='Paint')])
+            db.session.commit()
+            user_id, order_id, item_id, quotation_id = user.id, order.id, item.id, quotation.id
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        etags = {}
+        for url in (f'/orders/{order_id}/invoice/view', f'/quotations/{quotation_id}/pdf/download'):
+            misses = pdf_cache.stats()['misses']
+            first = client.get(url)
+            assert first.status_code == 200, url
+            assert first.data.startswith(b'%PDF')
+            assert first.headers['Content-Length'] == str(len(first.data))
+            assert first.headers['Accept-Ranges'] == 'bytes'
+            etag = etags[url] = first.headers['ETag']
+
+            second = client.get(url)
+            assert second.data == first.data
+            assert pdf_cache.stats()['misses'] == misses + 1
+            assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+            partial = client.get(url, headers={'Range': 'bytes=0-3'})
+            assert partial.status_code == 206
+            assert partial.data == b'%PDF'
+            assert partial.headers['Content-Range'] == f'bytes 0-3/{len(first.data)}'
+
+        # Negotiating a price drops the invoice's cached PDF and changes its ETag
+        with app.app_context():
+            OrderService.negotiate_price(item_id, 90, 'Regular customer', db.session.get(User, user_id))
+        assert not [name for name in os.listdir(directory) if name.startswith(f'invoice-{order_id}-')]
+        invoice_etag = etags[f'/orders/{order_id}/invoice/view']
+        response = client.get(f'/orders/{order_id}/invoice/view', headers={'If-None-Match': invoice_etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != invoice_etag
+
+
+if __name__ == "__main__":
+    test_renders_once_per_content_and_evicts_least_recent()
+    test_routes_serve_cached_pdfs_with_etags()
+    print("✅ PDFs are rendered in memory once per content, served with ranges and ETags and evicted by recency")
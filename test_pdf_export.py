@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Test script for batch invoice and quotation PDF exports
+"""
+
+import sys
+import os
+import re
+import tempfile
+import uuid
+import zipfile
+from datetime import date, datetime
+from io import BytesIO
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app import db
+from app.models import Branch, OrderType, User, Order, OrderItem, Invoice, Quotation, QuotationItem
+from app.pdf_export import (RenderPool, export_query, iter_documents, render_documents, iter_zip_chunks,
+                            with_progress, pdf_render_pool)
+
+
+def page_count(pdf):
+    return len(re.findall(rb'/Type /Page\b(?!s)', pdf))
+
+
+def create_documents():
+    """Invoices and quotations on two days in two branches, for an admin and a sales user"""
+    with app.app_context():
+        db.create_all()
+        tag = uuid.uuid4().hex[:6]
+        main_branch = Branch(name=f'Export Main {tag}', location='Nairobi')
+        other_branch = Branch(name=f'Export Other {tag}', location='Mombasa')
+        walk_in = OrderType(name='Walk-in')
+        admin = User(email=f'export-admin-{tag}@example.com', firstname='Ada', lastname='Admin', password='x', role='admin')
+        seller = User(email=f'export-sales-{tag}@example.com', firstname='Sam', lastname='Seller', password='x',
+                      role='sales')
+        db.session.add_all([main_branch, other_branch, walk_in, admin, seller])
+        db.session.flush()
+
+        days = [datetime(2031, 3, 1, 9), datetime(2031, 3, 2, 15)]
+        for index, (day, branch, user) in enumerate([
+            (days[0], main_branch, seller), (days[0], other_branch, admin),
+            (days[1], main_branch, seller), (days[1], main_branch, admin),
+        ]):
+            order = Order(userid=user.id, ordertypeid=walk_in.id, branchid=branch.id, total_amount=200,
+                          created_at=day)
+            db.session.add(order)
+            db.session.flush()
+            db.session.add(OrderItem(orderid=order.id, quantity=2, product_name=f'Nails {index}',
+                                     original_price=100, final_price=100))
+            db.session.add(Invoice(orderid=order.id, invoice_number=f'INV-{tag}-{index}', total_amount=200,
+                                   subtotal=200, created_at=day))
+            quotation = Quotation(quotation_number=f'QT-{tag}-{index}', customer_name='Walk-in Customer',
+                                  created_by=user.id, branch_id=branch.id, total_amount=100, created_at=day)
+            db.session.add(quotation)
+            db.session.flush()
+            db.session.add(QuotationItem(quotation_id=quotation.id, quantity=2, unit_price=50, total_price=100,
+                                         product_name=f'Paint {index}'))
+        db.session.commit()
+        return tag, main_branch.id, admin.id, seller.id
+
+
+def test_filters_and_parallel_rendering():
+    """Filters select by day, branch and owner; the process pool renders in order with a bounded window"""
+    tag, branch_id, admin_id, seller_id = create_documents()
+    with app.app_context():
+        admin, seller = db.session.get(User, admin_id), db.session.get(User, seller_id)
+        first_day = export_query('invoices', date(2031, 3, 1), date(2031, 3, 1), user=admin).all()
+        assert [invoice.invoice_number for invoice in first_day if tag in invoice.invoice_number] == [
+            f'INV-{tag}-0', f'INV-{tag}-1']
+        assert export_query('invoices', date(2031, 3, 1), date(2031, 3, 2), branch_id, admin).count() == 3
+        assert export_query('quotations', date(2031, 3, 1), date(2031, 3, 2), user=seller).count() == 2
+
+        query = export_query('quotations', date(2031, 3, 1), date(2031, 3, 2), branch_id, admin)
+        pulled = []
+
+        def documents():
+            for document in iter_documents('quotations', query):
+                pulled.append(document)
+                yield document
+
+        progress = []
+        consumed = 0
+        files = []
+        for filename, pdf in with_progress(render_documents(documents(), workers=2, window=2), 3,
+                                           lambda done, total: progress.append(done)):
+            consumed += 1
+            # Never more than window documents rendered ahead of the consumer
+            assert len(pulled) - consumed <= 2
+            files.append(filename)
+            assert pdf.startswith(b'%PDF')
+        assert files == [f'quotation_QT-{tag}-{index}.pdf' for index in (0, 2, 3)]
+        assert progress == [1, 2, 3]
+
+        # The same files come out of an in-process render
+        serial = [filename for filename, _ in render_documents(iter_documents('quotations', query), workers=1)]
+        assert serial == files
+
+
+def test_shared_pool_outlives_each_export():
+    """A RenderPool's spawned processes are kept for later exports, including after one is abandoned"""
+    tag, branch_id, admin_id, seller_id = create_documents()
+    pool = RenderPool(workers=2)
+    try:
+        with app.app_context():
+            query = export_query('quotations', date(2031, 3, 1), date(2031, 3, 2), branch_id)
+            expected = [f'quotation_QT-{tag}-{index}.pdf' for index in (0, 2, 3)]
+            executor = pool.executor()
+            assert executor._mp_context.get_start_method() == 'spawn'
+
+            # A client that disconnects after the first file
+            files = render_documents(iter_documents('quotations', query), pool=pool)
+            assert next(files)[0] == expected[0]
+            files.close()
+
+            for _ in range(2):
+                assert [filename for filename, _ in render_documents(iter_documents('quotations', query),
+                                                                     pool=pool)] == expected
+            assert pool.executor() is executor
+    finally:
+        pool.shutdown()
+
+
+def test_zip_stream_is_a_valid_archive():
+    """The streamed chunks form a ZIP with one PDF per file"""
+    files = [(f'doc_{index}.pdf', b'%PDF-1.4 ' + bytes([index]) * 1000) for index in range(3)]
+    chunks = list(iter_zip_chunks(iter(files)))
+    assert len(chunks) == 4
+    with zipfile.ZipFile(BytesIO(b''.join(chunks))) as archive:
+        assert archive.namelist() == [name for name, _ in files]
+        assert archive.read('doc_2.pdf') == files[2][1]
+
+
+def test_export_route():
+    """/exports/pdf streams a ZIP or returns one merged PDF, limited to the user's own documents"""
+    tag, branch_id, admin_id, seller_id = create_documents()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(seller_id)
+
+    response = client.get('/exports/pdf?kind=invoices&start=2031-03-01&end=2031-03-02', buffered=True)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    assert response.headers['X-Export-Documents'] == '2'
+    with zipfile.ZipFile(BytesIO(response.data)) as archive:
+        assert archive.namelist() == [f'invoice_INV-{tag}-0.pdf', f'invoice_INV-{tag}-2.pdf']
+        assert page_count(archive.read(f'invoice_INV-{tag}-0.pdf')) == 1
+
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin_id)
+    response = client.get(f'/exports/pdf?kind=quotations&format=merged&start=2031-03-01&end=2031-03-02'
+                          f'&branch_id={branch_id}')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert page_count(response.data) == 3
+    # One logo image and its mask for the whole document
+    assert response.data.count(b'/Subtype /Image') == 2
+
+    # One ZIP export at a time per process; the pool is handed back when the response closes
+    assert pdf_render_pool.acquire()
+    try:
+        response = client.get('/exports/pdf?kind=invoices&start=2031-03-01&end=2031-03-02')
+        assert response.status_code == 503
+    finally:
+        pdf_render_pool.release()
+    response = client.get('/exports/pdf?kind=invoices&start=2031-03-01&end=2031-03-02', buffered=False)
+    assert response.status_code == 200
+    next(iter(response.response))
+    assert not pdf_render_pool.acquire()
+    response.close()
+    assert pdf_render_pool.acquire()
+    pdf_render_pool.release()
+
+    assert client.get('/exports/pdf?kind=invoices&start=2031-13-01').status_code == 400
+    assert client.get('/exports/pdf?kind=receipts').status_code == 400
+    assert client.get('/exports/pdf?kind=invoices&start=2040-01-01').status_code == 404
+
+
+def test_export_command():
+    """export_pdfs.py writes the same exports to a file"""
+    import export_pdfs
+
+    tag, branch_id, admin_id, seller_id = create_documents()
+    with tempfile.TemporaryDirectory() as directory, app.app_context():
+        output = os.path.join(directory, 'invoices.zip')
+        args = export_pdfs.parse_args(['invoices', '--start', '2031-03-02', '--branch', str(branch_id),
+                                       '--workers', '2', '-o', output])
+        assert export_pdfs.export(args) == 2
+        with zipfile.ZipFile(output) as archive:
+            assert archive.namelist() == [f'invoice_INV-{tag}-2.pdf', f'invoice_INV-{tag}-3.pdf']
+
+        output = os.path.join(directory, 'quotations.pdf')
+        args = export_pdfs.parse_args(['quotations', '--branch', str(branch_id), '--format', 'merged', '-o', output])
+        assert export_pdfs.export(args) == 3
+        with open(output, 'rb') as f:
+            assert page_count(f.read()) == 3
+
+
+if __name__ == "__main__":
+    test_filters_and_parallel_rendering()
+    test_shared_pool_outlives_each_export()
+    test_zip_stream_is_a_valid_archive()
+    test_export_route()
+    test_export_command()
+    print("✅ Invoices and quotations export as streamed ZIPs or merged PDFs")
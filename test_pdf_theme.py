@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared PDF theme (styles and pre-encoded logo)
+"""
+
+import sys
+import os
+import re
+import base64
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.pdf_theme import LogoAsset, PDFTheme, pdf_theme
+from app.pdf_utils import (render_pdf, create_receipt_pdf, create_quotation_pdf,
+                           create_quotation_pdf_a4, create_invoice_pdf_a4)
+from benchmark_pdf_rendering import sample_invoice
+
+
+def page_content(pdf):
+    """Decoded text streams of a PDF, to look for rendered text"""
+    content = b''
+    for stream in re.findall(rb'/Filter \[ /ASCII85Decode /FlateDecode \] /Length \d+\s*>>\s*stream\r?\n(.*?)endstream',
+                             pdf, re.S):
+        content += zlib.decompress(base64.a85decode(stream.strip(), adobe=True))
+    return content
+
+
+def sample_quotation():
+    item = SimpleNamespace(product_name='Paint', branch_product=None, quantity=2, unit='L',
+                           unit_price=50, price_unit='')
+    return SimpleNamespace(items=[item], quotation_number='QT-THEME-1', customer_name='Walk-in Customer',
+                           created_at=datetime(2025, 1, 1), valid_until=None, branch=SimpleNamespace(name='Gikomba'),
+                           show_quantity_in_pdf=True, discount_percentage=0, include_vat=False, vat_rate=16,
+                           notes=None, total_amount=100)
+
+
+def test_every_renderer_embeds_the_prebuilt_logo():
+    """All renderers draw the logo from the shared, pre-encoded image"""
+    user = SimpleNamespace(firstname='Pdf', lastname='Tester')
+    user_data = {'firstname': 'Pdf', 'lastname': 'Tester'}
+    documents = [
+        render_pdf(create_receipt_pdf, sample_invoice(1), user_data),
+        render_pdf(create_invoice_pdf_a4, sample_invoice(1), user_data),
+        render_pdf(create_quotation_pdf, sample_quotation(), user),
+        render_pdf(create_quotation_pdf_a4, sample_quotation(), user),
+    ]
+    width = pdf_theme.logo.reader.getSize()[0]
+    for pdf in documents:
+        assert pdf.startswith(b'%PDF')
+        # The logo and its transparency mask, once each, at the pre-scaled size
+        assert pdf.count(b'/Subtype /Image') == 2
+        assert pdf.count(f'/Width {width}'.encode()) == 2
+        assert b'/SMask' in pdf
+
+    # Without a logo file the letterhead falls back to text
+    pdf = render_pdf(lambda *args: create_invoice_pdf_a4(*args, theme=PDFTheme(logo_path='/missing/logo.png')),
+                     sample_invoice(1), user_data)
+    assert b'/Subtype /Image' not in pdf
+    assert b'HARDWARE' in page_content(pdf)
+
+
+def test_shared_theme_is_safe_across_threads():
+    """Renders sharing one theme on several threads each get their own complete PDF"""
+    user_data = {'firstname': 'Pdf', 'lastname': 'Tester'}
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        documents = list(pool.map(lambda number: render_pdf(create_invoice_pdf_a4, sample_invoice(number), user_data),
+                                  range(12)))
+    for number, pdf in enumerate(documents):
+        assert pdf.rstrip().endswith(b'%%EOF')
+        assert f'INV-{number:06d}'.encode() in page_content(pdf)
+
+
+def test_logo_is_encoded_once():
+    """Documents rendered with the shared theme reuse its encoded logo instead of building another"""
+    user_data = {'firstname': 'Pdf', 'lastname': 'Tester'}
+    logo = pdf_theme.logo
+    built = []
+    logo_asset_init = LogoAsset.__init__
+
+    def counting_init(self, *args, **kwargs):
+        built.append(args)
+        logo_asset_init(self, *args, **kwargs)
+
+    LogoAsset.__init__ = counting_init
+    try:
+        documents = [render_pdf(create_invoice_pdf_a4, sample_invoice(number), user_data) for number in range(3)]
+    finally:
+        LogoAsset.__init__ = logo_asset_init
+
+    assert built == []
+    assert pdf_theme.logo is logo
+    # Every document carries the same pre-encoded image stream
+    streams = [re.search(rb'/Subtype /Image.*?stream\r?\n(.*?)endstream', pdf, re.S).group(1) for pdf in documents]
+    assert len(set(streams)) == 1
+
+
+if __name__ == "__main__":
+    test_every_renderer_embeds_the_prebuilt_logo()
+    test_shared_theme_is_safe_across_threads()
+    test_logo_is_encoded_once()
+    print("✅ PDF renderers share one prebuilt theme and logo")
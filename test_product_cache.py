@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for the product listing cache and conditional JSON responses
+"""
+
+import sys
+import os
+import time
+import uuid
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from main import app
+from app import db
+from app.models import Branch, User, ProductCatalog, BranchProduct
+from app.services import StockService
+from app.cache import (TTLCache, product_listing_cache, product_listing_cache_key, product_listing_generation,
+                       cache_product_listing, invalidate_product_listings)
+from app.utils import conditional_json_response
+
+
+def test_ttl_cache_eviction_and_expiry():
+    """Entries expire after their TTL and the least recently used entry is evicted first"""
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    time.sleep(0.06)
+    assert cache.get('c') is None
+
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 2
+    assert stats['evictions'] == 1
+
+
+def test_stock_changes_invalidate_branch_listings():
+    """Adding stock drops the cached listings of that branch only"""
+    with app.app_context():
+        db.create_all()
+        branch = Branch(name='Cache Branch', location='Nairobi')
+        other_branch = Branch(name='Other Branch', location='Mombasa')
+        user = User(email=f'cache-{uuid.uuid4().hex}@example.com', firstname='Cache', lastname='Tester',
+                    password='x', role='sales')
+        catalog = ProductCatalog(name='Cached Cement', productcode='CC-1')
+        db.session.add_all([branch, other_branch, user, catalog])
+        db.session.flush()
+        branch_product = BranchProduct(branchid=branch.id, catalog_id=catalog.id, sellingprice=100, stock=5)
+        db.session.add(branch_product)
+        db.session.commit()
+
+        product_listing_cache.invalidate()
+        branch_key = product_listing_cache_key(branch.id, None, 'Cement')
+        other_key = product_listing_cache_key(other_branch.id, None, 'cement')
+        product_listing_cache.set(branch_key, '[]')
+        product_listing_cache.set(other_key, '[]')
+
+        StockService.add_stock(branch_product.id, 3, user)
+
+        assert product_listing_cache.get(branch_key) is None
+        assert product_listing_cache.get(other_key) == '[]'
+
+
+def test_listing_invalidated_during_a_miss_is_not_cached():
+    """A listing computed while its branch is invalidated is served but not cached"""
+    key = product_listing_cache_key(9001, None, 'nails')
+    other_key = product_listing_cache_key(9002, None, 'nails')
+
+    # Invalidating another branch doesn't stop the listing from being cached
+    generation = product_listing_generation(9001)
+    invalidate_product_listings([9002])
+    assert cache_product_listing(key, generation, 'fresh')
+    assert product_listing_cache.get(key) == 'fresh'
+
+    # Invalidating its branch, or every branch, does
+    generation = product_listing_generation(9001)
+    invalidate_product_listings([9001])
+    assert not cache_product_listing(key, generation, 'stale')
+    assert product_listing_cache.get(key) is None
+
+    generation, other_generation = product_listing_generation(9001), product_listing_generation(9002)
+    invalidate_product_listings()
+    assert not cache_product_listing(key, generation, 'stale')
+    assert not cache_product_listing(other_key, other_generation, 'stale')
+    assert cache_product_listing(key, product_listing_generation(9001), 'fresh')
+
+    # A stock change committed while /api/products is querying
+    with app.app_context():
+        db.create_all()
+        branch = Branch(name=f'Race Branch {uuid.uuid4().hex[:6]}', location='Nairobi')
+        user = User(email=f'race-{uuid.uuid4().hex}@example.com', firstname='Race', lastname='Tester',
+                    password='x', role='sales')
+        catalog = ProductCatalog(name='Race Nails', productcode='RN-1')
+        db.session.add_all([branch, user, catalog])
+        db.session.flush()
+        db.session.add(BranchProduct(branchid=branch.id, catalog_id=catalog.id, sellingprice=10, stock=5))
+        db.session.commit()
+        branch_id, user_id = branch.id, user.id
+        engine = db.engine
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+    def stock_changes(conn, cursor, statement, parameters, context, executemany):
+        if 'product_catalog' in statement:
+            invalidate_product_listings([branch_id])
+
+    key = product_listing_cache_key(branch_id, None, '')
+    event.listen(engine, 'before_cursor_execute', stock_changes)
+    try:
+        response = client.get('/api/products', query_string={'branch_id': branch_id})
+    finally:
+        event.remove(engine, 'before_cursor_execute', stock_changes)
+    assert [product['name'] for product in response.get_json()] == ['Race Nails']
+    assert product_listing_cache.get(key) is None
+
+    client.get('/api/products', query_string={'branch_id': branch_id})
+    assert product_listing_cache.get(key) is not None
+
+
+def test_conditional_json_response():
+    """A matching If-None-Match gets 304 Not Modified"""
+    with app.test_request_context('/branches'):
+        response = conditional_json_response([{'id': 1, 'name': 'Main'}], max_age=300)
+        assert response.status_code == 200
+        assert response.cache_control.max_age == 300
+        etag = response.headers['ETag']
+
+    with app.test_request_context('/branches', headers={'If-None-Match': etag}):
+        assert conditional_json_response([{'id': 1, 'name': 'Main'}]).status_code == 304
+
+    with app.test_request_context('/branches', headers={'If-None-Match': etag}):
+        assert conditional_json_response([{'id': 1, 'name': 'Westlands'}]).status_code == 200
+
+
+if __name__ == "__main__":
+    test_ttl_cache_eviction_and_expiry()
+    test_stock_changes_invalidate_branch_listings()
+    test_listing_invalidated_during_a_miss_is_not_cached()
+    test_conditional_json_response()
+    print("✅ Product listing cache expires, evicts and invalidates; JSON responses revalidate with ETags")
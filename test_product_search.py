@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the indexed product search
+"""
+
+import sys
+import os
+import uuid
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app import db
+from app.models import Branch, User, ProductCatalog, BranchProduct
+from app.services import ProductService
+from app.search import ensure_product_search_index, parse_numeric_search, product_search_filter, product_search_rank
+
+
+def seed_products():
+    """Create a branch with a small catalog and return the branch id"""
+    branch = Branch(name=f'Search Branch {uuid.uuid4().hex[:6]}', location='Nairobi')
+    db.session.add(branch)
+    db.session.flush()
+
+    products = [
+        ('Cement 50kg', 'CEM-050', 750, 800, 12),
+        ('White Cement', 'WCM-001', 1200, 1350, 250),
+        ('Roofing Nails', '250-RN', 90, 120, 40),
+        ('Paint Brush 2"', 'BR-002', 250, 299.5, 7),
+    ]
+    for name, code, buying, selling, stock in products:
+        catalog = ProductCatalog(name=name, productcode=code)
+        db.session.add(catalog)
+        db.session.flush()
+        db.session.add(BranchProduct(branchid=branch.id, catalog_id=catalog.id,
+                                     buyingprice=buying, sellingprice=selling, stock=stock))
+    db.session.commit()
+    return branch.id
+
+
+def search_names(branch_id, search):
+    """Run a ranked product search within a branch and return the matching names in order"""
+    query = db.session.query(ProductCatalog.name).select_from(BranchProduct).join(
+        ProductCatalog, BranchProduct.catalog_id == ProductCatalog.id
+    ).filter(BranchProduct.branchid == branch_id, product_search_filter(search))
+    rows = query.order_by(product_search_rank(search).desc(), ProductCatalog.name.asc()).all()
+    return [row.name for row in rows]
+
+
+def test_parse_numeric_search():
+    """Numbers become ranges at the precision they were typed with"""
+    from decimal import Decimal
+    assert parse_numeric_search('250') == (Decimal('250'), Decimal('251'))
+    assert parse_numeric_search('99.5') == (Decimal('99.5'), Decimal('99.6'))
+    assert parse_numeric_search('200-100') == (Decimal('100'), Decimal('200.01'))
+    assert parse_numeric_search('cement') is None
+
+
+def test_product_search():
+    """Names match by word prefix, codes by prefix, and numbers by value"""
+    with app.app_context():
+        db.create_all()
+        ensure_product_search_index()
+        branch_id = seed_products()
+
+        assert search_names(branch_id, 'cem') == ['Cement 50kg', 'White Cement']
+        assert search_names(branch_id, 'CEM-0') == ['Cement 50kg']
+        assert search_names(branch_id, 'roof nail') == ['Roofing Nails']
+        assert search_names(branch_id, '100%') == []
+
+        # 250 is a code prefix, a buying price and a stock level; the code match ranks first
+        assert search_names(branch_id, '250') == ['Roofing Nails', 'Paint Brush 2"', 'White Cement']
+        assert search_names(branch_id, '299.5') == ['Paint Brush 2"']
+        assert search_names(branch_id, '1000-1300') == ['White Cement']
+
+        # Catalog edits are picked up by the index
+        catalog = ProductCatalog.query.filter_by(productcode='250-RN').first()
+        catalog.name = 'Wire Nails'
+        db.session.commit()
+        assert search_names(branch_id, 'roof') == []
+        assert search_names(branch_id, 'wire') == ['Wire Nails']
+
+        rows = ProductService.product_rows_query(search='cement').all()
+        assert {row.name for row in rows} >= {'Cement 50kg', 'White Cement'}
+
+
+def test_product_api_pages_through_search_results():
+    """The forms fetch searched products a page at a time with limit and offset"""
+    with app.app_context():
+        db.create_all()
+        ensure_product_search_index()
+        branch_id = seed_products()
+        user = User(email=f'search-{uuid.uuid4().hex[:6]}@example.com', firstname='Sam', lastname='Searcher',
+                    password='x', role='sales')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+    def names(**params):
+        response = client.get('/api/products', query_string={'branch_id': branch_id, **params})
+        assert response.status_code == 200
+        return [product['name'] for product in response.get_json()]
+
+    assert names(search='cem') == ['Cement 50kg', 'White Cement']
+    assert names(search='cem', limit=1) == ['Cement 50kg']
+    assert names(search='cem', limit=1, offset=1) == ['White Cement']
+    assert names(search='cem', limit=1, offset=2) == []
+    assert len(names(limit=3)) == 3
+    assert names(limit=3, offset=3) == ['White Cement']
+
+
+if __name__ == "__main__":
+    test_parse_numeric_search()
+    test_product_search()
+    test_product_api_pages_through_search_results()
+    print("✅ Product search matches names, codes and numeric values")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Test script for saving quotation edits as item diffs with incremental totals
+"""
+
+import sys
+import os
+import uuid
+from decimal import Decimal
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event, insert, select
+
+from main import app
+from app import db
+from app.models import Branch, User, Quotation, QuotationItem, ProductCatalog, BranchProduct
+
+
+def create_quotation(item_count):
+    """A contractor quotation with item_count manual lines, 10% discount and VAT"""
+    with app.app_context():
+        db.create_all()
+        tag = uuid.uuid4().hex[:6]
+        branch = Branch(name=f'Quotation Branch {tag}', location='Nairobi')
+        user = User(email=f'quotes-{tag}@example.com', firstname='Quinn', lastname='Quoter', password='x',
+                    role='sales')
+        db.session.add_all([branch, user])
+        db.session.flush()
+        quotation = Quotation(quotation_number=f'QT-EDIT-{tag}', customer_name='Contractor', created_by=user.id,
+                              branch_id=branch.id, discount_percentage=Decimal('10'), include_vat=True,
+                              vat_rate=Decimal('16'))
+        db.session.add(quotation)
+        db.session.flush()
+        db.session.execute(insert(QuotationItem), [{
+            'quotation_id': quotation.id,
+            'product_name': f'Line {index}',
+            'quantity': Decimal(index % 5 + 1),
+            'unit_price': Decimal('12.50'),
+            'total_price': Decimal(index % 5 + 1) * Decimal('12.50'),
+            'unit': 'pcs'
+        } for index in range(item_count)])
+        db.session.flush()
+        quotation.subtotal = sum(db.session.scalars(
+            select(QuotationItem.total_price).where(QuotationItem.quotation_id == quotation.id)))
+        quotation.total_amount = quotation.subtotal_after_discount + quotation.vat_amount
+        db.session.commit()
+        return user.id, quotation.id
+
+
+def edit_form(items, changed=None, removed=(), added=()):
+    """The edit form as the page posts it: one entry per row in each item array"""
+    changed = changed or {}
+    form = {
+        'customer_name': 'Contractor', 'discount_percentage': '10', 'include_vat': 'on', 'vat_rate': '16',
+        'show_quantity_in_pdf': 'on', 'line_id[]': [], 'item_id[]': [], 'item_name[]': [], 'quantity[]': [],
+        'unit[]': [], 'unit_price[]': [], 'price_unit[]': [], 'notes[]': []
+    }
+    rows = [(item.id, item.product_name, changed.get(item.id, item.quantity), item.unit_price)
+            for item in items if item.id not in removed]
+    rows += [('', name, quantity, price) for name, quantity, price in added]
+    for line_id, name, quantity, price in rows:
+        form['line_id[]'].append(str(line_id))
+        form['item_id[]'].append('')
+        form['item_name[]'].append(name)
+        form['quantity[]'].append(str(quantity))
+        form['unit[]'].append('pcs' if line_id else '')
+        form['unit_price[]'].append(str(price))
+        form['price_unit[]'].append('')
+        form['notes[]'].append('')
+    return form
+
+
+def test_edit_writes_only_changed_items():
+    """Saving a 300 line quotation updates, inserts and deletes only the edited lines, one statement each"""
+    user_id, quotation_id = create_quotation(300)
+    with app.app_context():
+        items = db.session.scalars(select(QuotationItem).where(QuotationItem.quotation_id == quotation_id)
+                                   .order_by(QuotationItem.id)).all()
+        changed = {item.id: item.quantity + 2 for item in items[:30]}
+        removed = {item.id for item in items[30:50]}
+        form = edit_form(items, changed, removed, added=[('Scaffolding', '3', '250.00'), ('Sand', '1.5', '80')])
+        untouched = {item.id: item.created_at for item in items[50:]}
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    page = client.get(f'/quotations/{quotation_id}/edit').get_data(as_text=True)
+    assert page.count('name="line_id[]"') >= 300
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = client.post(f'/quotations/{quotation_id}/edit', data=form)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 302, response.get_data(as_text=True)
+    item_writes = [statement.split()[0] for statement in statements
+                   if 'quotationitems' in statement and not statement.lstrip().startswith('SELECT')]
+    assert sorted(item_writes) == ['DELETE', 'INSERT', 'UPDATE'], item_writes
+
+    with app.app_context():
+        quotation = db.session.get(Quotation, quotation_id)
+        rows = {item.id: item for item in quotation.items}
+        assert len(rows) == 300 - 20 + 2
+        assert not removed & rows.keys()
+        assert all(rows[item_id].quantity == quantity for item_id, quantity in changed.items())
+        assert all(rows[item_id].created_at == created for item_id, created in untouched.items())
+        assert {item.product_name for item in rows.values() if item.id not in untouched and item.id not in changed} \
+            == {'Scaffolding', 'Sand'}
+
+        # Incremental totals agree with summing every item again
+        subtotal, total = quotation.subtotal, quotation.total_amount
+        quotation.calculate_totals()
+        assert subtotal == quotation.subtotal
+        assert abs(total - quotation.total_amount) < Decimal('0.01')
+
+
+def test_unchanged_edit_writes_no_items():
+    """Resaving without changes leaves every item row alone"""
+    user_id, quotation_id = create_quotation(5)
+    with app.app_context():
+        items = db.session.scalars(select(QuotationItem).where(QuotationItem.quotation_id == quotation_id)).all()
+        form = edit_form(items)
+        subtotal = db.session.get(Quotation, quotation_id).subtotal
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            assert client.post(f'/quotations/{quotation_id}/edit', data=form).status_code == 302
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        assert not [statement for statement in statements
+                    if 'quotationitems' in statement and not statement.lstrip().startswith('SELECT')]
+        assert db.session.get(Quotation, quotation_id).subtotal == subtotal
+
+
+def test_catalog_lines_show_their_product():
+    """Catalog lines saved with only product_id are labelled from the branch product and linked on the next save"""
+    user_id, quotation_id = create_quotation(2)
+    with app.app_context():
+        quotation = db.session.get(Quotation, quotation_id)
+        tag = quotation.quotation_number[-6:]
+        catalog = ProductCatalog(name=f'Roofing Sheet {tag}', productcode=f'RS-{tag}')
+        db.session.add(catalog)
+        db.session.flush()
+        product = BranchProduct(branchid=quotation.branch_id, catalog_id=catalog.id, stock=10, sellingprice=950)
+        db.session.add(product)
+        db.session.flush()
+        line = QuotationItem(quotation_id=quotation_id, product_id=product.id, quantity=2, unit_price=950,
+                             total_price=1900)
+        db.session.add(line)
+        db.session.commit()
+        product_id, line_id = product.id, line.id
+        items = db.session.scalars(select(QuotationItem).where(QuotationItem.quotation_id == quotation_id)
+                                   .order_by(QuotationItem.id)).all()
+        form = edit_form(items)
+        form['item_id[]'][-1] = str(product_id)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    page = client.get(f'/quotations/{quotation_id}/edit').get_data(as_text=True)
+    assert f'Roofing Sheet {tag} - RS-{tag}' in page
+    assert 'Unknown Product' not in page
+
+    assert client.post(f'/quotations/{quotation_id}/edit', data=form).status_code == 302
+    with app.app_context():
+        line = db.session.get(QuotationItem, line_id)
+        assert line.product_id == product_id
+        assert line.branch_productid == product_id
+        assert line.branch_product.catalog_product.name == f'Roofing Sheet {tag}'
+
+
+def test_derived_amounts_are_cached_until_inputs_change():
+    """Discount and VAT are computed once per subtotal and settings"""
+    quotation = Quotation(subtotal=Decimal('1000'), discount_percentage=Decimal('10'), include_vat=True,
+                          vat_rate=Decimal('16'))
+    vat = quotation.vat_amount
+    assert vat == Decimal('144')
+    assert quotation.vat_amount is vat
+    assert quotation.discount_amount == Decimal('100')
+
+    quotation.apply_items_delta(Decimal('500'))
+    assert quotation.subtotal == Decimal('1500')
+    assert quotation.vat_amount == Decimal('216')
+    assert quotation.total_amount == Decimal('1350') + Decimal('216')
+
+    quotation.include_vat = False
+    assert quotation.vat_amount == Decimal('0.00')
+    assert quotation.subtotal_after_discount == Decimal('1350')
+
+
+if __name__ == "__main__":
+    test_edit_writes_only_changed_items()
+    test_unchanged_edit_writes_no_items()
+    test_catalog_lines_show_their_product()
+    test_derived_amounts_are_cached_until_inputs_change()
+    print("✅ Quotation edits write only changed items and update totals incrementally")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for quotation number allocation
+"""
+
+import sys
+import os
+import uuid
+
+# Run against the in-memory testing database unless told otherwise
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event, insert
+from main import app
+from app import db
+from app.models import Quotation
+from app.numbering import permute_sequence, _feistel, _permute_below
+from app.services import QuotationService
+
+
+ALLOCATIONS = 50
+
+
+def test_permutation_is_a_bijection():
+    """On small domains the Feistel network and its cycle-walk hit every value exactly once"""
+    for half_bits in (3, 4, 5):
+        domain = range(1 << (2 * half_bits))
+        assert sorted(_feistel(value, half_bits) for value in domain) == list(domain)
+        for limit in (10, len(domain) // 2 + 1, len(domain) - 1):
+            assert sorted(_permute_below(value, limit, half_bits) for value in range(limit)) == list(range(limit))
+
+    # The quotation numbers are 7 digits wide and not in sequence
+    numbers = [permute_sequence(value) for value in range(1, 2001)]
+    assert len(set(numbers)) == len(numbers)
+    assert all(0 <= number < 10 ** 7 for number in numbers)
+    assert numbers[:5] != sorted(numbers[:5])
+    assert permute_sequence(10 ** 7) == 10 ** 7
+
+    # Numbers already handed out must never change
+    assert [permute_sequence(value) for value in (1, 2, 3, 12345)] == [1093642, 9389325, 7032302, 4908664]
+
+
+def test_allocation_is_one_statement():
+    """Each allocation is a single counter update and skips nothing already in use"""
+    with app.app_context():
+        db.create_all()
+        # Quotations numbered the old random 6-digit way stay unique beside the new numbers
+        legacy_numbers = [f'QT-{uuid.uuid4().int % 10 ** 6:06d}' for _ in range(20)]
+        db.session.execute(insert(Quotation), [{
+            'quotation_number': number,
+            'customer_name': 'Legacy',
+            'created_by': 1,
+            'branch_id': 1
+        } for number in set(legacy_numbers)])
+        QuotationService.generate_quotation_number()
+        db.session.commit()
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            numbers = [QuotationService.generate_quotation_number() for _ in range(ALLOCATIONS)]
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        db.session.commit()
+
+        assert len(statements) == ALLOCATIONS
+        assert len(set(numbers)) == len(numbers)
+        assert all(len(number) == len('QT-0000000') for number in numbers)
+        assert not set(numbers) & set(legacy_numbers)
+
+
+if __name__ == "__main__":
+    test_permutation_is_a_bijection()
+    test_allocation_is_one_statement()
+    print("✅ Quotation numbers are a one to one scramble and cost one statement each")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for atomic stock mutations
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import uuid
+
+os.environ.setdefault('FLASK_ENV', 'testing')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from app import db
+from app.models import Branch, User, ProductCatalog, BranchProduct, StockTransaction
+from app.services import StockService
+from config import config
+
+
+THREADS = 8
+CHANGES_PER_THREAD = 50
+INITIAL_STOCK = 300
+
+
+def create_stock_app(path):
+    """
+    An app of its own on a file database
+
+    Threads need separate connections to one database, which the shared
+    in-memory test database cannot give.
+    """
+    stock_app = Flask(__name__)
+    stock_app.config.from_object(config['testing'])
+    stock_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    stock_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 60}}
+    db.init_app(stock_app)
+    return stock_app
+
+
+def test_concurrent_stock_changes_keep_ledger_consistent():
+    """Many threads adding and removing stock of one SKU lose no updates"""
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_stock_app(os.path.join(directory, 'stock.db'))
+        try:
+            run_concurrent_stock_changes(app)
+        finally:
+            with app.app_context():
+                db.engine.dispose()
+
+
+def run_concurrent_stock_changes(app):
+    with app.app_context():
+        db.create_all()
+        branch = Branch(name='Concurrency Branch', location='Nairobi')
+        user = User(email=f'stock-{uuid.uuid4().hex}@example.com', firstname='Stock', lastname='Tester',
+                    password='x', role='sales')
+        catalog = ProductCatalog(name='Contended Cement', productcode='CC-LOCK')
+        db.session.add_all([branch, user, catalog])
+        db.session.flush()
+        branch_product = BranchProduct(branchid=branch.id, catalog_id=catalog.id, stock=INITIAL_STOCK)
+        db.session.add(branch_product)
+        db.session.commit()
+        product_id, user_id = branch_product.id, user.id
+
+    errors = []
+    # All threads make their n-th change together, so every round contends for
+    # the row but sellers can never get more than one round ahead of restocks
+    rounds = threading.Barrier(THREADS, timeout=60)
+
+    def change_stock(thread_index):
+        with app.app_context():
+            cashier = db.session.get(User, user_id)
+            try:
+                for change in range(CHANGES_PER_THREAD):
+                    rounds.wait()
+                    # Odd threads restock, even threads sell
+                    if thread_index % 2:
+                        StockService.add_stock(product_id, 2, cashier, notes='restock')
+                    else:
+                        StockService.remove_stock(product_id, 3, cashier, notes='sale')
+            except Exception as e:
+                errors.append(e)
+                rounds.abort()
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=change_stock, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        assert not errors, errors
+        final_stock = db.session.get(BranchProduct, product_id).stock
+        transactions = StockTransaction.query.filter_by(productid=product_id).order_by(StockTransaction.id).all()
+
+        added = sum(t.quantity for t in transactions if t.transaction_type == 'add')
+        removed = sum(t.quantity for t in transactions if t.transaction_type == 'remove')
+        expected = INITIAL_STOCK + (THREADS // 2) * CHANGES_PER_THREAD * (2 - 3)
+        print(f"Final stock {final_stock} after {len(transactions)} concurrent changes")
+
+        assert len(transactions) == THREADS * CHANGES_PER_THREAD
+        assert final_stock == expected
+        assert INITIAL_STOCK + added - removed == final_stock
+
+        # Every change starts from the stock the previous one left behind
+        stock = INITIAL_STOCK
+        for transaction in transactions:
+            delta = transaction.quantity if transaction.transaction_type == 'add' else -transaction.quantity
+            assert transaction.previous_stock == stock
+            assert transaction.new_stock == stock + delta
+            stock = transaction.new_stock
+
+if __name__ == "__main__":
+    test_concurrent_stock_changes_keep_ledger_consistent()
+    print("✅ Concurrent stock changes are atomic and the ledger matches the stock")
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Background job worker: renders and emails invoice and receipt PDFs
+
+Run one or more of these next to the web app; jobs are stored in the jobs
+table, so no separate broker is needed.
+
+    python worker.py          # process jobs until stopped
+    python worker.py --once   # process the jobs that are due, then exit
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from app.jobs import run_worker, run_pending_jobs
+from app import services  # registers the job handlers
+
+if __name__ == '__main__':
+    with app.app_context():
+        if '--once' in sys.argv:
+            print(f"Processed {run_pending_jobs()} jobs")
+        else:
+            run_worker()